@@ -1,18 +1,52 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import pymysql
+import logging
+from pymysql.constants import SERVER_STATUS
 import boto3
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 import os
 from dotenv import load_dotenv
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import uuid
+import decimal
+import dataclasses
 import google.generativeai as genai
 import PyPDF2
 import io
 import json
 import secrets
+import re
+import time
+import hashlib
+import math
+import sqlite3
+import tempfile
+import gzip
+import threading
+import queue
+import random
+import click
+import numpy as np
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache, partial, wraps
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from google.api_core import exceptions as google_exceptions
+
+# Optional speedups: orjson for JSON encoding, brotli for 'br' response compression
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # Load environment variables (for local dev; on EB use env vars from console)
 load_dotenv()
@@ -27,344 +61,3168 @@ DB_CONFIG = {
     'user': os.getenv('DB_USER'),
     'password': os.getenv('DB_PASSWORD'),
     'database': os.getenv('DB_NAME'),
-    'port': int(os.getenv('DB_PORT', 3306))
+    'port': int(os.getenv('DB_PORT', 3306)),
+    'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10)),
+    # TIMESTAMPs are read and written as UTC; per-user days are bucketed in Python
+    'init_command': "SET time_zone = '+00:00'"
 }
 
 # AWS S3 configuration
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION')
-)
+# Set S3_ENDPOINT_URL to use a local S3 stand-in such as MinIO or LocalStack
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None
+
+
+def make_s3_client(config=None):
+    return boto3.client(
+        's3',
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        region_name=os.getenv('AWS_REGION'),
+        endpoint_url=S3_ENDPOINT_URL,
+        config=config
+    )
+
+
+s3_client = make_s3_client()
 S3_BUCKET = os.getenv('S3_BUCKET_NAME')
 
 # Configure Gemini API
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+# Override for tests/benchmarks, e.g. the fake server in bench/fake_gemini.py
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')
 if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+    if GEMINI_API_ENDPOINT:
+        genai.configure(api_key=GEMINI_API_KEY, transport='rest',
+                        client_options={'api_endpoint': GEMINI_API_ENDPOINT})
+    else:
+        genai.configure(api_key=GEMINI_API_KEY)
+
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'models/gemini-2.5-flash')
+# Static prompt prefixes at least this long are sent through Gemini context caching
+GEMINI_CONTEXT_CACHE = os.getenv('GEMINI_CONTEXT_CACHE', 'true').lower() == 'true'
+GEMINI_CACHE_MIN_CHARS = int(os.getenv('GEMINI_CACHE_MIN_CHARS', 16000))
+GEMINI_CACHE_TTL = int(os.getenv('GEMINI_CACHE_TTL', 1800))
+
+# Gemini call policy: per-attempt timeout, overall deadline, retries and circuit breaker
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', 30))
+GEMINI_DEADLINE = float(os.getenv('GEMINI_DEADLINE', 60))
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', 2))
+GEMINI_BACKOFF_BASE = float(os.getenv('GEMINI_BACKOFF_BASE', 0.5))
+GEMINI_BACKOFF_MAX = float(os.getenv('GEMINI_BACKOFF_MAX', 4))
+# Send a second request when the first is slower than the observed p95
+GEMINI_HEDGE = os.getenv('GEMINI_HEDGE', 'false').lower() == 'true'
+GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv('GEMINI_HEDGE_MIN_SAMPLES', 20))
+GEMINI_BREAKER_FAILURES = int(os.getenv('GEMINI_BREAKER_FAILURES', 5))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv('GEMINI_BREAKER_COOLDOWN', 30))
+
+# Background recommendation precompute after problems are added or deleted
+RECOMMENDATION_PRECOMPUTE = os.getenv('RECOMMENDATION_PRECOMPUTE', 'true').lower() == 'true'
+RECOMMENDATION_DEBOUNCE_SECONDS = float(os.getenv('RECOMMENDATION_DEBOUNCE_SECONDS', 30))
+RECOMMENDATION_MAX_AGE_HOURS = int(os.getenv('RECOMMENDATION_MAX_AGE_HOURS', 24))
+# Topic-specific sets refreshed per user besides the general one
+RECOMMENDATION_MAX_TOPICS = int(os.getenv('RECOMMENDATION_MAX_TOPICS', 5))
+RECOMMENDATION_WORKERS = int(os.getenv('RECOMMENDATION_WORKERS', 2))
+# Solved numbers listed in recommendation prompts; older ones are only excluded locally
+RECOMMENDATION_PROMPT_MAX_NUMBERS = int(os.getenv('RECOMMENDATION_PROMPT_MAX_NUMBERS', 100))
+# Bulk refresh (flask refresh-recommendations): users per Gemini call and prompt size cap
+RECOMMENDATION_BATCH_SIZE = int(os.getenv('RECOMMENDATION_BATCH_SIZE', 20))
+RECOMMENDATION_BATCH_MAX_CHARS = int(os.getenv('RECOMMENDATION_BATCH_MAX_CHARS', 24000))
+# USD per million tokens, for the cost estimates in batch reports
+GEMINI_PRICE_INPUT_PER_M = float(os.getenv('GEMINI_PRICE_INPUT_PER_M', 0.30))
+GEMINI_PRICE_OUTPUT_PER_M = float(os.getenv('GEMINI_PRICE_OUTPUT_PER_M', 2.50))
+
+# Spaced repetition: first review this many days after logging a problem
+REVIEW_FIRST_INTERVAL_DAYS = int(os.getenv('REVIEW_FIRST_INTERVAL_DAYS', 1))
+REVIEW_MAX_BATCH = int(os.getenv('REVIEW_MAX_BATCH', 500))
+
+# Resume text is extracted once, in the background, right after upload
+RESUME_EXTRACT_WORKERS = int(os.getenv('RESUME_EXTRACT_WORKERS', 2))
+RESUME_MAX_BYTES = int(os.getenv('RESUME_MAX_BYTES', 10 * 1024 * 1024))
+# Unreferenced S3 objects are kept this long before the cleanup command deletes them
+RESUME_ORPHAN_GRACE_HOURS = int(os.getenv('RESUME_ORPHAN_GRACE_HOURS', 24))
+# Revisions re-review only changed sections unless more than this share of the text changed
+RESUME_PROMPT_MAX_CHARS = int(os.getenv('RESUME_PROMPT_MAX_CHARS', 15000))
+RESUME_INCREMENTAL_MAX_CHANGED = float(os.getenv('RESUME_INCREMENTAL_MAX_CHANGED', 0.6))
+
+# Points rules live in points_rules (versioned); these are version 1, used while none is active
+POINTS_BY_DIFFICULTY = {'Easy': 10, 'Medium': 25, 'Hard': 50}
+# Workers reload the active rules this often, so an activation takes effect within this window
+POINTS_RULES_CACHE_SECONDS = float(os.getenv('POINTS_RULES_CACHE_SECONDS', 60))
+# Bulk recompute (flask recompute-points): rows per UPDATE, pause between chunks, replica lag ceiling
+POINTS_RECOMPUTE_CHUNK = int(os.getenv('POINTS_RECOMPUTE_CHUNK', 2000))
+POINTS_RECOMPUTE_PAUSE = float(os.getenv('POINTS_RECOMPUTE_PAUSE', 0.1))
+POINTS_RECOMPUTE_MAX_LAG = float(os.getenv('POINTS_RECOMPUTE_MAX_LAG', 2))
+PROBLEM_BATCH_MAX = int(os.getenv('PROBLEM_BATCH_MAX', 1000))
+
+# Topic mastery: points x difficulty weight, halved every MASTERY_HALF_LIFE_DAYS since solving.
+# Changing the half-life or weights needs `flask compute-mastery` to rescore stored rows.
+MASTERY_HALF_LIFE_DAYS = float(os.getenv('MASTERY_HALF_LIFE_DAYS', 90))
+MASTERY_DIFFICULTY_WEIGHTS = {'Easy': 1.0, 'Medium': 1.5, 'Hard': 2.5}
+# Batch recompute works through users in id ranges of this size, one transaction each
+MASTERY_BATCH_USERS = int(os.getenv('MASTERY_BATCH_USERS', 5000))
+# Weakest practiced topics passed to general recommendation prompts
+MASTERY_WEAK_TOPICS = int(os.getenv('MASTERY_WEAK_TOPICS', 3))
+
+# Must match the server's innodb_ft_min_token_size
+SEARCH_MIN_TOKEN_SIZE = int(os.getenv('SEARCH_MIN_TOKEN_SIZE', 3))
+
+# Auth tokens
+SECRET_KEY = os.getenv('SECRET_KEY')
+if not SECRET_KEY:
+    print("SECRET_KEY not set; auth tokens will not survive a restart or work across workers")
+    SECRET_KEY = secrets.token_hex(32)
+app.config['SECRET_KEY'] = SECRET_KEY
+AUTH_TOKEN_MAX_AGE = int(os.getenv('AUTH_TOKEN_MAX_AGE', 7 * 24 * 3600))
+# Every non-public endpoint rejects requests without a valid token. Setting this to false opts
+# into the legacy mode where tokenless requests act as whatever user_id the client sends.
+AUTH_REQUIRED = os.getenv('AUTH_REQUIRED', 'true').lower() == 'true'
+if not AUTH_REQUIRED:
+    print("AUTH_REQUIRED=false: tokenless requests are trusted with their client-supplied user_id")
+# Any werkzeug method spec, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+PUBLIC_ENDPOINTS = {'register', 'login', 'health_check', 'readiness', 'rate_limit_metrics', 'llm_metrics'}
+# EventSource can't send headers, so these accept ?stream_token=: a short-lived token scoped to
+# one group (POST /api/groups/<id>/events/token), keeping the bearer token out of URLs and logs
+STREAM_ENDPOINTS = {'group_events'}
+STREAM_TOKEN_MAX_AGE = int(os.getenv('STREAM_TOKEN_MAX_AGE', 60))
+
+token_serializer = URLSafeTimedSerializer(
+    SECRET_KEY,
+    salt='auth-token',
+    signer_kwargs={'digest_method': hashlib.sha256}
+)
+stream_token_serializer = URLSafeTimedSerializer(
+    SECRET_KEY,
+    salt='group-stream-token',
+    signer_kwargs={'digest_method': hashlib.sha256}
+)
+
+# Rate limits for the Gemini-backed endpoints, as "<requests>/<seconds>" token buckets
+RATE_LIMITS = {
+    'analyze_resume': {
+        'user': os.getenv('RATE_LIMIT_ANALYZE_RESUME_USER', '5/60'),
+        'global': os.getenv('RATE_LIMIT_ANALYZE_RESUME_GLOBAL', '60/60'),
+    },
+    'suggest_problems': {
+        'user': os.getenv('RATE_LIMIT_SUGGEST_PROBLEMS_USER', '10/60'),
+        'global': os.getenv('RATE_LIMIT_SUGGEST_PROBLEMS_GLOBAL', '120/60'),
+    },
+    'solve_problem': {
+        'user': os.getenv('RATE_LIMIT_SOLVE_PROBLEM_USER', '30/60'),
+        'global': os.getenv('RATE_LIMIT_SOLVE_PROBLEM_GLOBAL', '300/60'),
+    },
+}
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# 'memory' (per process) or a SQLite file path shared by all workers on the host
+RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', 'memory')
+# Live group feed (SSE): a SQLite file path shared by all workers on the host, or 'memory' (per process).
+# Feed events are published by whichever process consumes the change event, so 'memory' only reaches
+# every subscriber with a single process (e.g. one ASGI worker and no separate `flask consume-changes`).
+GROUP_EVENTS_BROKER = os.getenv('GROUP_EVENTS_BROKER',
+                                os.path.join(tempfile.gettempdir(), 'algoaxis-group-events.sqlite3'))
+GROUP_EVENTS_QUEUE_SIZE = int(os.getenv('GROUP_EVENTS_QUEUE_SIZE', 64))
+GROUP_EVENTS_HEARTBEAT = float(os.getenv('GROUP_EVENTS_HEARTBEAT', 15))
+# Streams end after this long (the browser reconnects with Last-Event-ID), so a sync worker isn't held forever
+GROUP_EVENTS_MAX_SECONDS = float(os.getenv('GROUP_EVENTS_MAX_SECONDS', 300))
+GROUP_EVENTS_MAX_SUBSCRIBERS = int(os.getenv('GROUP_EVENTS_MAX_SUBSCRIBERS', 500))
+# Transactional outbox: writes record change events that a background consumer applies to
+# rollups, recommendation staleness, caches and the live group feed
+CHANGE_EVENTS_CONSUMER = os.getenv('CHANGE_EVENTS_CONSUMER', 'true').lower() == 'true'
+CHANGE_EVENTS_BATCH_SIZE = int(os.getenv('CHANGE_EVENTS_BATCH_SIZE', 100))
+CHANGE_EVENTS_POLL_SECONDS = float(os.getenv('CHANGE_EVENTS_POLL_SECONDS', 2))
+# Events that keep failing are parked (processed_at set, last_error kept) after this many tries
+CHANGE_EVENTS_MAX_ATTEMPTS = int(os.getenv('CHANGE_EVENTS_MAX_ATTEMPTS', 5))
+CHANGE_EVENTS_RETENTION_DAYS = int(os.getenv('CHANGE_EVENTS_RETENTION_DAYS', 7))
+if GROUP_EVENTS_BROKER == 'memory':
+    print("GROUP_EVENTS_BROKER=memory: live group feeds only reach streams on the process that consumes "
+          "change events; use a SQLite path (the default) when running several workers")
+LEADERBOARD_CACHE_SECONDS = float(os.getenv('LEADERBOARD_CACHE_SECONDS', 30))
+# Shed AI requests once this many are already in flight in this worker
+AI_MAX_INFLIGHT = int(os.getenv('AI_MAX_INFLIGHT', 16))
+AI_SHED_RETRY_AFTER = int(os.getenv('AI_SHED_RETRY_AFTER', 2))
+
+# Read replicas: comma-separated host[:port] list, same credentials as the primary.
+# Read-only handlers use a replica that is up and less than DB_REPLICA_MAX_LAG_SECONDS behind.
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5))
+DB_REPLICA_CONNECT_TIMEOUT = int(os.getenv('DB_REPLICA_CONNECT_TIMEOUT', 2))
+# After a user writes, their reads stay on the primary this long so they see their own change
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', 10))
+
+# Connection pool: idle connections kept per database server in each worker (0 disables reuse).
+# A connection idle longer than DB_POOL_PING_AFTER seconds is pinged before it is handed out.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', 30))
+
+# Readiness (/api/ready): results are reused for READY_CACHE_SECONDS; the database and S3 probes give up
+# after READY_PROBE_TIMEOUT seconds. Gemini is checked from configuration only.
+READY_CACHE_SECONDS = float(os.getenv('READY_CACHE_SECONDS', 5))
+READY_PROBE_TIMEOUT = float(os.getenv('READY_PROBE_TIMEOUT', 2))
+# Warm-up before a worker takes traffic: database connections opened up front
+WARMUP_CONNECTIONS = int(os.getenv('WARMUP_CONNECTIONS', 4))
+
+# Response encoding: 'orjson' (falls back to the stdlib encoder if not installed) or 'stdlib'
+JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+# Compress JSON/text bodies at least this large (gzip, or brotli when installed and accepted)
+COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+
+# SQL profiling (opt-in, for local debugging only)
+SQL_DEBUG = os.getenv('SQL_DEBUG', 'false').lower() == 'true'
+SQL_LOG_STATEMENTS = os.getenv('SQL_LOG_STATEMENTS', 'true').lower() == 'true'
+SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', 100))
+SQL_EXPLAIN_MS = float(os.getenv('SQL_EXPLAIN_MS', 250))
+SQL_MAX_QUERIES_PER_REQUEST = int(os.getenv('SQL_MAX_QUERIES_PER_REQUEST', 8))
+SQL_REPEAT_THRESHOLD = int(os.getenv('SQL_REPEAT_THRESHOLD', 3))
+if SQL_DEBUG:
+    app.logger.setLevel(logging.DEBUG)
+
+# ================== HELPERS ==================
+
+class ProfilingCursor(pymysql.cursors.DictCursor):
+    """DictCursor that times and logs every statement when SQL_DEBUG is on."""
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            record_query(self.connection, query, args, (time.perf_counter() - start) * 1000)
+
+
+def json_default(value):
+    """Encode what MySQL rows hold besides str/int/float: datetimes (stored as UTC), dates and Decimals."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+ORJSON_OPTIONS = (orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON for jsonify and request bodies, encoded with orjson when available.
+    Both encoders emit datetimes as ISO 8601 UTC ('...Z') and Decimals as numbers,
+    so responses look the same whichever one is in use.
+    """
+
+    sort_keys = False
+
+    def __init__(self, app, use_orjson=True):
+        super().__init__(app)
+        self.use_orjson = use_orjson and orjson is not None
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.dumps(obj, default=json_default, option=ORJSON_OPTIONS).decode()
+        kwargs.setdefault('default', json_default)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def encode(self, obj):
+        """Response body bytes."""
+        if self.use_orjson:
+            option = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if self._app.debug else 0)
+            return orjson.dumps(obj, default=json_default, option=option)
+        indent, separators = (2, None) if self._app.debug else (None, (',', ':'))
+        return json.dumps(obj, default=json_default, ensure_ascii=False,
+                          indent=indent, separators=separators).encode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj), mimetype=self.mimetype)
+
+
+app.json = FastJSONProvider(app, use_orjson=JSON_PROVIDER == 'orjson')
+
+
+def statement_shape(query):
+    """Collapse whitespace so the same statement issued twice compares equal."""
+    return re.sub(r'\s+', ' ', query).strip()
+
+
+def record_query(conn, query, args, elapsed_ms):
+    shape = statement_shape(query)
+    slow = elapsed_ms >= SQL_SLOW_QUERY_MS
+    # Only the parameterized statement and the number of bound values: the values are user
+    # data (notes, resume text, emails) and don't belong in logs
+    arg_count = len(args) if isinstance(args, (list, tuple, dict)) else int(args is not None)
+    if slow:
+        app.logger.warning("[sql] SLOW %.2fms %s | %d args", elapsed_ms, shape, arg_count)
+    elif SQL_LOG_STATEMENTS:
+        app.logger.debug("[sql] %.2fms %s | %d args", elapsed_ms, shape, arg_count)
+
+    if has_request_context():
+        g.setdefault('sql_queries', []).append((shape, elapsed_ms))
+
+    if elapsed_ms >= SQL_EXPLAIN_MS and shape.upper().startswith('SELECT'):
+        try:
+            # Plain cursor so the EXPLAIN itself isn't profiled
+            explain_cursor = conn.cursor(pymysql.cursors.DictCursor)
+            explain_cursor.execute(f"EXPLAIN {query}", args)
+            for row in explain_cursor.fetchall():
+                app.logger.debug("[sql] EXPLAIN %s", row)
+            explain_cursor.close()
+        except Exception as e:
+            app.logger.debug("[sql] EXPLAIN failed: %s", e)
+
+
+def replica_lag(config):
+    """Seconds the replica is behind its source, or None if replication is stopped."""
+    conn = pymysql.connect(**config, cursorclass=pymysql.cursors.DictCursor)
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+        except pymysql.err.ProgrammingError:
+            # MySQL before 8.0.22 and MariaDB
+            cursor.execute('SHOW SLAVE STATUS')
+        status = cursor.fetchone()
+        if status is None:
+            # Not replicating at all (e.g. a standalone copy used for testing): treat as current
+            return 0
+        return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    finally:
+        conn.close()
+
+
+class ReplicaRouter:
+    """Round-robin over read replicas that are up and caught up.
+
+    A background thread probes every replica each check_interval seconds; a
+    replica that fails a connect on the request path is skipped until it
+    probes healthy again. Replicas are unused until their first probe.
+    """
+
+    def __init__(self, hosts, max_lag, check_interval):
+        self.replicas = []
+        for host in hosts:
+            name, _, port = host.partition(':')
+            self.replicas.append({'host': name, 'port': int(port or DB_CONFIG['port']),
+                                  'healthy': False, 'lag': None, 'error': None})
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.next = 0
+        self.thread = None
+        self.stats = Counter()
+
+    def config(self, replica):
+        return {**DB_CONFIG, 'host': replica['host'], 'port': replica['port'],
+                'connect_timeout': DB_REPLICA_CONNECT_TIMEOUT}
+
+    def pick(self):
+        """The next usable replica, or None when all are down or too far behind."""
+        with self.lock:
+            # Started lazily so the thread exists in each forked Gunicorn worker
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._probe_loop, daemon=True, name='replica-probe')
+                self.thread.start()
+            for offset in range(len(self.replicas)):
+                index = (self.next + offset) % len(self.replicas)
+                replica = self.replicas[index]
+                if replica['healthy'] and replica['lag'] <= self.max_lag:
+                    self.next = index + 1
+                    return replica
+        return None
+
+    def mark_down(self, replica, error):
+        with self.lock:
+            replica['healthy'] = False
+            replica['error'] = str(error)
+
+    def probe(self, replica):
+        try:
+            lag = replica_lag(self.config(replica))
+            healthy, error = lag is not None, None if lag is not None else 'replication stopped'
+        except Exception as e:
+            lag, healthy, error = None, False, str(e)
+        with self.lock:
+            replica.update(healthy=healthy, lag=lag, error=error)
+
+    def _probe_loop(self):
+        while True:
+            for replica in self.replicas:
+                self.probe(replica)
+            time.sleep(self.check_interval)
+
+    def snapshot(self):
+        with self.lock:
+            return {'replicas': [dict(replica) for replica in self.replicas], **self.stats}
+
+
+replica_router = ReplicaRouter(DB_REPLICA_HOSTS, DB_REPLICA_MAX_LAG_SECONDS,
+                               DB_REPLICA_CHECK_INTERVAL) if DB_REPLICA_HOSTS else None
+_recent_writers = {}
+WRITE_COOKIE = 'db_write_at'
+
+
+def reads_pinned_to_primary():
+    """True for a short window after this client or user wrote, since replicas may not have it yet."""
+    if not has_request_context():
+        return False
+    try:
+        if time.time() - float(request.cookies.get(WRITE_COOKIE, 0)) < DB_READ_YOUR_WRITES_SECONDS:
+            return True
+    except ValueError:
+        pass
+    # Clients that don't keep cookies are still covered when they land on the same worker
+    deadline = _recent_writers.get(str(resolve_user_id(claimed_user_id())))
+    return deadline is not None and deadline > time.monotonic()
+
+
+class PooledConnection(pymysql.connections.Connection):
+    """Connection whose close() hands it back to its pool instead of disconnecting."""
+
+    pool = None
+    checked_out = False
+    released_at = 0.0
+
+    def close(self):
+        if self.pool is None:
+            return super().close()
+        if not self.checked_out:
+            raise pymysql.err.Error('Already closed')
+        self.checked_out = False
+        self.pool.release(self)
+
+    def disconnect(self):
+        self.pool = None
+        try:
+            super().close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Per-worker LIFO stack of idle connections to one server.
+
+    Only idle connections are capped: a checkout reuses the most recently returned
+    connection or opens a new one, so a handler that never closes its connection
+    (e.g. on an error path) costs a connection, not a pool slot.
+    """
+
+    def __init__(self, config, size, ping_after):
+        self.config = config
+        self.size = size
+        self.ping_after = ping_after
+        self.idle = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.stats = Counter()
+
+    def acquire(self, cursorclass):
+        while True:
+            with self.lock:
+                if self.pid != os.getpid():
+                    # Forked after connecting (e.g. gunicorn --preload): those sockets are the parent's
+                    self.idle, self.pid = [], os.getpid()
+                conn = self.idle.pop() if self.idle else None
+            if conn is None:
+                break
+            try:
+                if time.monotonic() - conn.released_at >= self.ping_after:
+                    conn.ping(reconnect=False)
+            except Exception:
+                self.stats['stale'] += 1
+                conn.disconnect()
+                continue
+            self.stats['reused'] += 1
+            conn.cursorclass = cursorclass
+            conn.checked_out = True
+            return conn
+
+        conn = PooledConnection(**self.config, cursorclass=cursorclass)
+        self.stats['opened'] += 1
+        conn.pool = self
+        conn.checked_out = True
+        return conn
+
+    def release(self, conn):
+        # Ending the open transaction drops its locks and its REPEATABLE READ snapshot,
+        # so the next user of the connection sees current data
+        if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                conn.rollback()
+            except Exception:
+                conn.disconnect()
+                return
+        conn.released_at = time.monotonic()
+        with self.lock:
+            if len(self.idle) < self.size and self.pid == os.getpid():
+                self.idle.append(conn)
+                return
+        conn.disconnect()
+
+    def snapshot(self):
+        with self.lock:
+            return {'idle': len(self.idle), **self.stats}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def connection_pool(config):
+    key = (config['host'], config['port'])
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(config, DB_POOL_SIZE, DB_POOL_PING_AFTER)
+        return _pools[key]
+
+
+def get_db_connection(readonly=False):
+    """Get a pooled DB connection (close() returns it); readonly=True may be served by a replica."""
+    cursorclass = ProfilingCursor if SQL_DEBUG else pymysql.cursors.DictCursor
+    if readonly and replica_router is not None:
+        if reads_pinned_to_primary():
+            replica_router.stats['read_your_writes'] += 1
+        else:
+            replica = replica_router.pick()
+            if replica is not None:
+                try:
+                    conn = connection_pool(replica_router.config(replica)).acquire(cursorclass)
+                    replica_router.stats['replica_reads'] += 1
+                    return conn
+                except pymysql.err.OperationalError as e:
+                    print(f"Replica {replica['host']}:{replica['port']} unavailable, using primary: {e}")
+                    replica_router.mark_down(replica, e)
+            replica_router.stats['primary_fallback'] += 1
+    return connection_pool(DB_CONFIG).acquire(cursorclass)
+
+def issue_auth_token(user_id):
+    return token_serializer.dumps({'uid': int(user_id)})
+
+
+def verify_auth_token(token):
+    """Return the user id a token was issued for; raises BadSignature if invalid/expired."""
+    return int(token_serializer.loads(token, max_age=AUTH_TOKEN_MAX_AGE)['uid'])
+
+
+def issue_stream_token(user_id, group_id):
+    return stream_token_serializer.dumps({'uid': int(user_id), 'gid': int(group_id)})
+
+
+def verify_stream_token(token, group_id):
+    """Return the user id a stream token was issued for; raises BadSignature if invalid/expired/another group's."""
+    data = stream_token_serializer.loads(token, max_age=STREAM_TOKEN_MAX_AGE)
+    if int(data['gid']) != int(group_id):
+        raise BadSignature('Stream token is for another group')
+    return int(data['uid'])
+
+
+def bearer_token(authorization):
+    if authorization and authorization.startswith('Bearer '):
+        return authorization[len('Bearer '):].strip()
+    return None
+
+
+def claimed_user_id():
+    """user_id the client sent in the query string, form or JSON body, if any."""
+    claimed = request.args.get('user_id') or request.form.get('user_id')
+    if claimed is None and request.is_json:
+        body = request.get_json(silent=True)
+        claimed = body.get('user_id') if isinstance(body, dict) else None
+    return claimed
+
+
+def is_json_int(value):
+    """True for a JSON integer; JSON true/false decode to bools, which isinstance(..., int) lets through."""
+    return type(value) is int
+
+
+def resolve_user_id(claimed):
+    """The token's user id when the request was authenticated, else the client's value."""
+    auth_user_id = g.get('auth_user_id')
+    return auth_user_id if auth_user_id is not None else claimed
+
+
+@lru_cache(maxsize=1)
+def password_hash_prefix():
+    # Expand e.g. 'scrypt' into the full 'scrypt:32768:8:1' spec werkzeug stores
+    return generate_password_hash('', method=PASSWORD_HASH_METHOD).split('$', 1)[0]
+
+
+def password_needs_rehash(stored_hash):
+    return stored_hash.split('$', 1)[0] != password_hash_prefix()
+
+
+def user_exists(cursor, user_id):
+    # Tokens are only issued for existing accounts, so skip the DB probe
+    if has_request_context() and g.get('auth_user_id') is not None \
+            and str(g.auth_user_id) == str(user_id):
+        return True
+    cursor.execute('SELECT id FROM users WHERE id = %s', (user_id,))
+    return cursor.fetchone() is not None
+
+
+def valid_timezone(name):
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def user_zone(cursor, user_id):
+    cursor.execute('SELECT timezone FROM users WHERE id = %s', (user_id,))
+    row = cursor.fetchone()
+    try:
+        return ZoneInfo(row['timezone']) if row and row['timezone'] else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def activity_day(created_at, zone):
+    """Local calendar day of a UTC TIMESTAMP read from MySQL."""
+    return created_at.replace(tzinfo=timezone.utc).astimezone(zone).date()
+
+
+def local_day_bounds(day, zone):
+    """UTC [start, end) of a local calendar day, as naive datetimes for MySQL."""
+    start = datetime(day.year, day.month, day.day, tzinfo=zone)
+    end = start + timedelta(days=1)
+    return (start.astimezone(timezone.utc).replace(tzinfo=None),
+            end.astimezone(timezone.utc).replace(tzinfo=None))
+
+
+def refresh_daily_activity(cursor, user_id, days, zone):
+    """Recompute the rollup for the given local days from problems (idempotent)."""
+    for day in set(days):
+        start, end = local_day_bounds(day, zone)
+        cursor.execute(
+            '''SELECT COUNT(*) AS problems_solved, COALESCE(SUM(points), 0) AS points
+               FROM problems
+               WHERE user_id = %s AND created_at >= %s AND created_at < %s''',
+            (user_id, start, end)
+        )
+        totals = cursor.fetchone()
+        if totals['problems_solved']:
+            cursor.execute(
+                '''INSERT INTO user_daily_activity (user_id, activity_date, problems_solved, points)
+                   VALUES (%s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE problems_solved = VALUES(problems_solved),
+                                           points = VALUES(points)''',
+                (user_id, day, totals['problems_solved'], int(totals['points']))
+            )
+        else:
+            cursor.execute(
+                'DELETE FROM user_daily_activity WHERE user_id = %s AND activity_date = %s',
+                (user_id, day)
+            )
+
+
+def rebuild_daily_activity(cursor, user_id, zone):
+    """Re-bucket a user's whole history, e.g. after a time zone change."""
+    cursor.execute('SELECT created_at, points FROM problems WHERE user_id = %s', (user_id,))
+    buckets = {}
+    for row in cursor.fetchall():
+        day = activity_day(row['created_at'], zone)
+        count, points = buckets.get(day, (0, 0))
+        buckets[day] = (count + 1, points + row['points'])
+
+    cursor.execute('DELETE FROM user_daily_activity WHERE user_id = %s', (user_id,))
+    if buckets:
+        cursor.executemany(
+            '''INSERT INTO user_daily_activity (user_id, activity_date, problems_solved, points)
+               VALUES (%s, %s, %s, %s)''',
+            [(user_id, day, count, points) for day, (count, points) in buckets.items()]
+        )
+
+
+def compute_streaks(active_days, today):
+    """
+    (current, longest) runs of consecutive days in sorted active_days.
+    The current streak is kept through today even before today's first problem.
+    """
+    longest = run = 0
+    previous = None
+    for day in active_days:
+        run = run + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    current = run if previous and today - previous <= timedelta(days=1) else 0
+    return current, longest
+
+
+def get_user_group_count(cursor, user_id):
+    cursor.execute('SELECT COUNT(*) as count FROM group_members WHERE user_id = %s', (user_id,))
+    result = cursor.fetchone()
+    return result['count'] if result else 0
+
+
+def generate_invite_code(cursor, length=12, max_attempts=5):
+    for _ in range(max_attempts):
+        code = secrets.token_urlsafe(length)[:20]
+        cursor.execute('SELECT id FROM groups WHERE invite_code = %s', (code,))
+        if not cursor.fetchone():
+            return code
+    return None
+
+
+def read_pdf(pdf_file):
+    """Return (text, page count) from a PDF file-like object; text is None if unreadable."""
+    try:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        text = ""
+        for page in pdf_reader.pages:
+            text += page.extract_text()
+        return text, len(pdf_reader.pages)
+    except Exception as e:
+        print(f"Error extracting PDF text: {e}")
+        return None, 0
+
+
+def extract_text_from_pdf(pdf_file):
+    """Extract raw text from a PDF file-like object."""
+    return read_pdf(pdf_file)[0]
+
+
+def read_upload(stream, max_bytes, chunk_size=64 * 1024):
+    """Read an upload in chunks, hashing as it streams; returns (bytes, sha256 hex) or None if too large."""
+    digest = hashlib.sha256()
+    data = bytearray()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        data += chunk
+        if len(data) > max_bytes:
+            return None
+    return bytes(data), digest.hexdigest()
+
+
+RESUME_OBJECT_LOOKUP_SQL = 'SELECT id, s3_key FROM resume_objects WHERE user_id = %s AND content_hash = %s'
+RESUME_OBJECT_ACQUIRE_SQL = 'UPDATE resume_objects SET ref_count = ref_count + 1, orphaned_at = NULL WHERE id = %s'
+RESUME_OBJECT_INSERT_SQL = '''
+    INSERT INTO resume_objects (s3_key, user_id, content_hash, size_bytes, ref_count)
+    VALUES (%s, %s, %s, %s, 1)
+    ON DUPLICATE KEY UPDATE ref_count = ref_count + 1, orphaned_at = NULL
+'''
+RESUME_OBJECT_RELEASE_SQL = '''
+    UPDATE resume_objects
+    SET ref_count = GREATEST(ref_count - 1, 0),
+        orphaned_at = IF(ref_count = 0, NOW(), NULL)
+    WHERE s3_key = %s
+'''
+INSERT_RESUME_SQL = '''
+    INSERT INTO resumes (user_id, filename, s3_key, file_url, content_hash, text_status)
+    VALUES (%s, %s, %s, %s, %s, 'pending')
+'''
+
+
+def acquire_resume_object(cursor, user_id, content_hash):
+    """Take a reference on the user's existing object with the same bytes; returns its key or None."""
+    cursor.execute(RESUME_OBJECT_LOOKUP_SQL, (user_id, content_hash))
+    existing = cursor.fetchone()
+    if not existing:
+        return None
+    cursor.execute(RESUME_OBJECT_ACQUIRE_SQL, (existing['id'],))
+    # 0 rows if the cleanup job removed it in between; the caller uploads afresh then
+    return existing['s3_key'] if cursor.rowcount else None
+
+
+def register_resume_object(cursor, user_id, content_hash, s3_key, size_bytes):
+    """Record a freshly uploaded object; returns the key to use (a concurrent identical upload may have won)."""
+    cursor.execute(RESUME_OBJECT_INSERT_SQL, (s3_key, user_id, content_hash, size_bytes))
+    if cursor.rowcount == 1:
+        return s3_key
+    cursor.execute(RESUME_OBJECT_LOOKUP_SQL, (user_id, content_hash))
+    return cursor.fetchone()['s3_key']
+
+
+resume_text_executor = ThreadPoolExecutor(max_workers=RESUME_EXTRACT_WORKERS,
+                                          thread_name_prefix='resume-text')
+
+
+def store_resume_text(resume_id, data, content_hash):
+    """
+    Extract and save a resume's text, page count and status; returns the text.
+    Text already extracted for an identical upload (same SHA-256) is reused.
+    """
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            '''SELECT extracted_text, page_count FROM resumes
+               WHERE content_hash = %s AND text_status = 'ready' AND id <> %s
+               LIMIT 1''',
+            (content_hash, resume_id)
+        )
+        existing = cursor.fetchone()
+        if existing:
+            text, page_count = existing['extracted_text'], existing['page_count']
+        else:
+            text, page_count = read_pdf(io.BytesIO(data))
+
+        cursor.execute(
+            '''UPDATE resumes SET extracted_text = %s, page_count = %s, text_status = %s
+               WHERE id = %s''',
+            (text, page_count, 'ready' if text else 'failed', resume_id)
+        )
+        conn.commit()
+
+        cursor.close()
+        conn.close()
+        return text
+
+    except Exception as e:
+        print(f"Error storing text for resume {resume_id}: {e}")
+        return None
+
+
+# ================== GEMINI CLIENTS ==================
+
+_models = {}
+_cached_models = {}
+_models_lock = threading.Lock()
+llm_stats = {}
+llm_events = Counter()  # retries, hedges, failures and breaker rejections per endpoint
+llm_stats_lock = threading.Lock()
+
+
+def get_model(system_instruction=None, model_name=None):
+    """Shared GenerativeModel per (model, system instruction) pair."""
+    key = (model_name or GEMINI_MODEL, system_instruction)
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(key[0], system_instruction=system_instruction)
+                _models[key] = model
+    return model
+
+
+def prefix_cacheable(prefix):
+    return GEMINI_CONTEXT_CACHE and prefix is not None and len(prefix) >= GEMINI_CACHE_MIN_CHARS
+
+
+def get_cached_model(system_instruction, prefix, model_name=None):
+    """Model bound to a Gemini context cache holding system instruction + prefix.
+
+    Returns None if the cache can't be created (e.g. below the API's minimum
+    token count); that outcome is remembered for the TTL so we don't retry
+    on every call.
+    """
+    model_name = model_name or GEMINI_MODEL
+    key = hashlib.sha256(f"{model_name}\0{system_instruction}\0{prefix}".encode()).hexdigest()
+    now = time.time()
+
+    entry = _cached_models.get(key)
+    if entry and entry[1] > now:
+        return entry[0]
+
+    model = None
+    try:
+        cache = genai.caching.CachedContent.create(
+            model=model_name,
+            system_instruction=system_instruction,
+            contents=[prefix],
+            ttl=timedelta(seconds=GEMINI_CACHE_TTL)
+        )
+        model = genai.GenerativeModel.from_cached_content(cached_content=cache)
+    except Exception as e:
+        print(f"Context cache unavailable, sending prefix inline: {e}")
+
+    with _models_lock:
+        # Expire a little early so we never call with a cache the API already dropped
+        _cached_models[key] = (model, now + GEMINI_CACHE_TTL - 60)
+        for stale in [k for k, (_, expires) in _cached_models.items() if expires <= now]:
+            del _cached_models[stale]
+    return model
+
+
+def model_for(system_instruction, prefix=None):
+    """Return (model, text still to send ahead of the prompt)."""
+    if prefix_cacheable(prefix):
+        cached = get_cached_model(system_instruction, prefix)
+        if cached is not None:
+            return cached, None
+    return get_model(system_instruction), prefix
+
+
+def prompt_contents(lead, prompt):
+    return f"{lead}\n\n{prompt}" if lead else prompt
+
+
+def record_llm_usage(label, response, elapsed):
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(usage, 'prompt_token_count', 0) or 0
+    cached_tokens = getattr(usage, 'cached_content_token_count', 0) or 0
+    with llm_stats_lock:
+        stats = llm_stats.setdefault(label, {'calls': 0, 'seconds': 0.0, 'prompt_tokens': 0, 'cached_tokens': 0})
+        stats['calls'] += 1
+        stats['seconds'] += elapsed
+        stats['prompt_tokens'] += prompt_tokens
+        stats['cached_tokens'] += cached_tokens
+
+
+class LLMUnavailable(Exception):
+    """Gemini failed, timed out or the circuit breaker is open; maps to a 503."""
+
+    def __init__(self, message, retry_after=GEMINI_BREAKER_COOLDOWN):
+        super().__init__(message)
+        self.retry_after = int(math.ceil(retry_after))
+
+
+def count_llm_event(label, event):
+    with llm_stats_lock:
+        llm_events[f'{label}.{event}'] += 1
+
+
+def llm_unavailable_response(error):
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one trial call through per cooldown."""
+
+    def __init__(self, failure_threshold, cooldown):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 0
+        return max(1, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per endpoint."""
+
+    def __init__(self, size=200):
+        self.size = size
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, label, seconds):
+        with self.lock:
+            self.samples.setdefault(label, deque(maxlen=self.size)).append(seconds)
+
+    def p95(self, label):
+        """Nearest-rank p95 (as bench.run.percentile), or None below GEMINI_HEDGE_MIN_SAMPLES.
+
+        >>> tracker = LatencyTracker()
+        >>> for ms in range(1, 21):
+        ...     tracker.add('solve', ms)
+        >>> tracker.p95('solve')
+        19
+        >>> tracker.add('solve', 21)
+        >>> tracker.p95('solve')
+        20
+        """
+        with self.lock:
+            samples = sorted(self.samples.get(label, ()))
+        if len(samples) < GEMINI_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(0.95 * len(samples)) - 1)]
+
+
+gemini_breaker = CircuitBreaker(GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_COOLDOWN)
+gemini_latency = LatencyTracker()
+hedge_executor = ThreadPoolExecutor(max_workers=int(os.getenv('GEMINI_HEDGE_WORKERS', 32)),
+                                    thread_name_prefix='gemini-hedge')
+
+TRANSIENT_LLM_ERRORS = (
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.GatewayTimeout,
+    OSError,  # connection failures and TimeoutError
+)
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry number (1-based)."""
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def hedged_call(label, call, timeout):
+    """Run call(timeout); if it outlives the endpoint's p95, race a second copy."""
+    threshold = gemini_latency.p95(label)
+    first = hedge_executor.submit(call, timeout)
+    if threshold is None or threshold >= timeout:
+        return first.result(timeout=timeout)
+
+    done, _ = wait([first], timeout=threshold)
+    if done:
+        return first.result()
+
+    count_llm_event(label, 'hedged')
+    remaining = timeout - threshold
+    pending = {first, hedge_executor.submit(call, remaining)}
+    error = TimeoutError(f'{label} exceeded {timeout:.1f}s')
+    deadline = time.monotonic() + remaining
+    while pending:
+        done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call_with_resilience(label, call):
+    """Run call(timeout) with deadline, jittered retries, optional hedging and the breaker."""
+    if not gemini_breaker.allow():
+        count_llm_event(label, 'rejected')
+        raise LLMUnavailable('AI service temporarily unavailable', gemini_breaker.retry_after())
+
+    deadline = time.monotonic() + GEMINI_DEADLINE
+    attempt = 0
+    while True:
+        timeout = min(GEMINI_TIMEOUT, deadline - time.monotonic())
+        start = time.perf_counter()
+        try:
+            response = hedged_call(label, call, timeout) if GEMINI_HEDGE else call(timeout)
+        except TRANSIENT_LLM_ERRORS as e:
+            gemini_breaker.record_failure()
+            attempt += 1
+            delay = backoff_delay(attempt)
+            if attempt > GEMINI_MAX_RETRIES or time.monotonic() + delay >= deadline \
+                    or not gemini_breaker.allow():
+                print(f"Gemini {label} failed after {attempt} attempt(s): {e}")
+                count_llm_event(label, 'failed')
+                raise LLMUnavailable('AI service temporarily unavailable', max(1, delay)) from e
+            count_llm_event(label, 'retried')
+            time.sleep(delay)
+            continue
+        except Exception:
+            # Bad requests etc. say nothing about upstream health
+            gemini_breaker.record_success()
+            raise
+
+        gemini_breaker.record_success()
+        gemini_latency.add(label, time.perf_counter() - start)
+        return response
+
+
+def gemini_request_options(timeout):
+    # retry=None: the SDK's own retries would multiply ours and ignore the deadline
+    return {'timeout': timeout, 'retry': None}
+
+
+def gemini_generate(label, system_instruction, prompt, prefix=None):
+    """Generate with a shared model; a long static prefix goes through the context cache."""
+    model, lead = model_for(system_instruction, prefix)
+    contents = prompt_contents(lead, prompt)
+    start = time.perf_counter()
+    response = call_with_resilience(
+        label,
+        lambda timeout: model.generate_content(contents, request_options=gemini_request_options(timeout))
+    )
+    record_llm_usage(label, response, time.perf_counter() - start)
+    return response
+
+
+NAME_SYSTEM_PROMPT = (
+    "From the resume excerpt you are given, extract ONLY the candidate's full name. "
+    "Return just the name, nothing else. If you cannot find a clear name, return \"Candidate\"."
+)
+
+RESUME_SYSTEM_PROMPT = """You are an expert career advisor reviewing resumes.
+
+The resume is given section by section, each under a "## <Section>" heading.
+
+Respond in Markdown:
+- For each section you are given, a "## <Section>" heading with the same name, followed by feedback on
+  that section only: what works, what to improve, action verbs and restructuring tips.
+- Then a final "## Overall" heading with:
+  1. A short summary (2–3 lines) of their professional profile.
+  2. 3–5 strengths and 3–5 areas to improve.
+  3. Keyword optimizations for ATS systems.
+
+Use no other "## " headings."""
+
+RECOMMENDER_SYSTEM_PROMPT = """You are an expert DSA tutor helping users improve coding problem coverage.
+
+Never recommend a problem that appears in the user's solved list.
+
+Format your response STRICTLY as a JSON array (no markdown, no extra text):
+[
+  {"problem_name": "Two Sum", "topic": "Arrays", "difficulty": "Easy", "reason": "Classic problem for hash maps"},
+  {"problem_name": "...", "topic": "...", "difficulty": "...", "reason": "..."}
+]"""
+
+BATCH_RECOMMENDER_SYSTEM_PROMPT = """You are an expert DSA tutor refreshing problem recommendations for many users at once.
+
+Each user is given as a key followed by a summary of what they have solved. For every user recommend 5 problems:
+- 3 problems similar to what they solved (slightly harder or related)
+- 2 problems from new topics relevant to their learning curve
+Never recommend a problem whose number appears in that user's solved numbers.
+
+Format your response STRICTLY as one JSON object keyed by user key (no markdown, no extra text):
+{
+  "u12": [{"problem_name": "Two Sum", "topic": "Arrays", "difficulty": "Easy", "reason": "Classic problem for hash maps"}, ...],
+  "u15": [...]
+}"""
+
+
+def build_name_prompt(text):
+    """Prompt asking Gemini for the candidate name, or None if the text is empty."""
+    lines = text.strip().split('\n')
+    first_lines = [line.strip() for line in lines[:5] if line.strip()]
+
+    if not first_lines:
+        return None
+
+    return f"Resume excerpt:\n{chr(10).join(first_lines[:3])}"
+
+
+def clean_candidate_name(name):
+    # Simple validation
+    name = name.strip()
+    words = name.split()
+    if 1 <= len(words) <= 4 and len(name) < 50:
+        return name
+    return "the candidate"
+
+
+def extract_candidate_name(text):
+    """
+    Extract candidate name from resume text using heuristics + Gemini.
+    Assumes name is in the first few lines of the resume.
+    """
+    try:
+        name_prompt = build_name_prompt(text)
+        if not name_prompt:
+            return "the candidate"
+
+        response = gemini_generate('candidate_name', NAME_SYSTEM_PROMPT, name_prompt)
+        return clean_candidate_name(response.text)
+
+    except Exception as e:
+        print(f"Error extracting name: {e}")
+        return "the candidate"
+
+
+def pdf_upload_error(file):
+    """Validation message for an uploaded resume, or None if it looks usable."""
+    if file is None:
+        return 'No file provided'
+    if file.filename == '':
+        return 'No file selected'
+    if not file.filename.lower().endswith('.pdf'):
+        return 'Only PDF files allowed'
+    return None
+
+
+def pdf_content_error(upload):
+    """Validation message for read_upload's result (None when over the limit), or None if it is a PDF."""
+    if upload is None:
+        return f'File larger than {RESUME_MAX_BYTES // (1024 * 1024)}MB'
+    # Readers accept the header anywhere in the first KB, after stray bytes
+    if b'%PDF-' not in upload[0][:1024]:
+        return 'File is not a PDF'
+    return None
+
+
+def new_resume_key(user_id, filename):
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    return f"resumes/{user_id}_{uuid.uuid4()}.{file_extension}"
+
+
+RESUME_SECTION_ALIASES = {
+    'Summary': ('summary', 'professional summary', 'profile', 'objective', 'career objective', 'about me'),
+    'Experience': ('experience', 'work experience', 'professional experience', 'employment',
+                   'employment history', 'work history', 'internships', 'internship experience'),
+    'Education': ('education', 'academic background', 'academics'),
+    'Skills': ('skills', 'technical skills', 'core skills', 'key skills', 'skills & tools', 'technologies'),
+    'Projects': ('projects', 'personal projects', 'academic projects', 'key projects', 'selected projects'),
+    'Certifications': ('certifications', 'certificates', 'licenses & certifications', 'courses'),
+    'Achievements': ('achievements', 'awards', 'honors', 'honors & awards', 'accomplishments'),
+    'Publications': ('publications', 'research'),
+    'Activities': ('activities', 'leadership', 'extracurricular activities', 'volunteering',
+                   'volunteer experience'),
+}
+RESUME_SECTION_HEADINGS = {alias: name for name, aliases in RESUME_SECTION_ALIASES.items()
+                           for alias in aliases}
+RESUME_ANALYSIS_MODES = ('auto', 'full', 'incremental')
+RESUME_OVERALL_SECTION = 'Overall'
+
+LATEST_RESUME_ANALYSIS_SQL = '''
+    SELECT id, candidate_name, sections, overall, analysis
+    FROM resume_analyses WHERE user_id = %s
+    ORDER BY id DESC LIMIT 1
+'''
+INSERT_RESUME_ANALYSIS_SQL = '''
+    INSERT INTO resume_analyses
+        (user_id, resume_id, candidate_name, sections, overall, analysis, mode, prompt_chars)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+'''
+
+
+def resume_section_heading(line):
+    """Canonical section name if the line is a known resume heading, else None."""
+    if len(line) > 60:
+        return None
+    key = re.sub(r'\s+', ' ', line.strip().rstrip(':').lower()).replace(' and ', ' & ')
+    return RESUME_SECTION_HEADINGS.get(key)
+
+
+def split_resume_sections(text):
+    """
+    Split resume text into [(section, text)] in document order.
+    Lines before the first heading form 'Header'; repeated headings are merged.
+    """
+    sections = {}
+    current = 'Header'
+    for line in text.splitlines():
+        heading = resume_section_heading(line)
+        if heading:
+            current = heading
+            sections.setdefault(current, [])
+        else:
+            sections.setdefault(current, []).append(line)
+
+    sections = [(name, '\n'.join(lines).strip()) for name, lines in sections.items()]
+    sections = [(name, body) for name, body in sections if body]
+    if len(sections) == 1:
+        # No recognisable headings: the whole resume is one section
+        return [('Resume', sections[0][1])]
+    return sections
+
+
+def section_hash(body):
+    """Whitespace-insensitive fingerprint of a section's text."""
+    return hashlib.sha256(' '.join(body.split()).encode()).hexdigest()[:16]
+
+
+def plan_resume_analysis(sections, previous, mode='auto'):
+    """
+    Compare sections with the user's previous analysis.
+    Returns (mode, sections to review, {section: reused feedback}); mode is 'full',
+    'incremental' or 'cached' (nothing changed, no Gemini call needed).
+    """
+    if mode == 'full' or not previous:
+        return 'full', sections, {}
+
+    cached = {entry['name']: entry for entry in json.loads(previous['sections'])}
+    reused = {name: cached[name]['feedback'] for name, body in sections
+              if name in cached and cached[name]['feedback'] and cached[name]['hash'] == section_hash(body)}
+    changed = [(name, body) for name, body in sections if name not in reused]
+
+    if not changed:
+        if set(reused) == set(cached) and previous['overall']:
+            return 'cached', [], reused
+        # Only removals: the overall assessment needs a fresh look
+        return 'full', sections, {}
+
+    changed_chars = sum(len(body) for _, body in changed)
+    total_chars = sum(len(body) for _, body in sections)
+    if mode == 'auto' and changed_chars > total_chars * RESUME_INCREMENTAL_MAX_CHANGED:
+        return 'full', sections, {}
+    return 'incremental', changed, reused
+
+
+def format_resume_sections(sections, max_chars=RESUME_PROMPT_MAX_CHARS):
+    parts, used = [], 0
+    for name, body in sections:
+        if used >= max_chars:
+            break
+        body = body[:max_chars - used]
+        used += len(body)
+        parts.append(f"## {name}\n{body}")
+    return '\n\n'.join(parts)
+
+
+def build_resume_prompt(candidate_name, sections, unchanged=(), previous_overall=None):
+    """Review prompt for the given sections; a revision also names the unchanged ones."""
+    if not unchanged:
+        return f"""Review this resume for {candidate_name} carefully.
+
+{format_resume_sections(sections)}
+"""
+
+    return f"""This is a revision of a resume for {candidate_name} that you reviewed before.
+Unchanged sections (already reviewed, give no feedback on them): {', '.join(unchanged)}
+
+Your previous overall assessment:
+{previous_overall or '(none)'}
+
+Review only the changed sections below, then give an updated Overall for the whole resume.
+
+{format_resume_sections(sections)}
+"""
+
+
+def parse_resume_feedback(analysis):
+    """{lower-cased section name: feedback} from a response with '## <Section>' headings."""
+    feedback = {}
+    current = None
+    for line in analysis.splitlines():
+        match = re.match(r'^##\s+(.+?)\s*$', line)
+        if match:
+            current = match.group(1).strip('*# ').lower()
+            feedback.setdefault(current, [])
+        elif current:
+            feedback[current].append(line)
+    return {name: '\n'.join(lines).strip() for name, lines in feedback.items()}
+
+
+def merge_resume_analysis(sections, response_text, reused, previous_overall=None):
+    """
+    Combine fresh feedback with reused feedback for unchanged sections.
+    Returns (analysis markdown, overall, [{'name', 'hash', 'feedback'}] to store).
+    """
+    feedback = parse_resume_feedback(response_text)
+    overall = feedback.get(RESUME_OVERALL_SECTION.lower()) or previous_overall or ''
+
+    stored = [{'name': name, 'hash': section_hash(body),
+               'feedback': reused.get(name) or feedback.get(name.lower(), '')}
+              for name, body in sections]
+
+    if not any(entry['feedback'] for entry in stored) and not reused:
+        # Gemini ignored the section format: show its answer as-is, cache nothing
+        return response_text, overall, stored
+
+    parts = [f"## {RESUME_OVERALL_SECTION}\n{overall}"] if overall else []
+    parts += [f"## {entry['name']}\n{entry['feedback']}" for entry in stored if entry['feedback']]
+    return '\n\n'.join(parts), overall, stored
+
+
+def build_recommendation_prompt(solved_problems, topic, weak_topics=()):
+    """Return (solved-history summary prefix, topic-specific request)."""
+    focus = topic if topic and topic.lower() != 'none' else None
+    prefix = f"""The user's practice history (from their practice tracker):
+{summarize_solved(solved_problems, focus=focus)}"""
+
+    if focus:
+        return prefix, f"""They want new recommendations specifically for the topic: {topic}
+
+Recommend 5 unsolved LeetCode-style problems from the {topic} topic, balanced across easy, medium, and hard difficulties. Ensure these problems are NOT among the solved numbers above."""
+
+    similar = "- 3 problems that are similar to the solved ones (based on topic/difficulty patterns, but slightly harder or related)"
+    if weak_topics:
+        similar = (f"- 3 problems from their weakest practiced topics ({', '.join(weak_topics)}: lowest "
+                   "recency-weighted mastery), slightly harder than what they solved there")
+
+    return prefix, f"""They want general recommendations (no specific topic).
+
+Recommend 5 problems total:
+{similar}
+- 2 problems that are new topics but relevant to their learning curve
+
+Ensure these problems are NOT among the solved numbers above."""
+
+
+def summarize_solved(solved_problems, max_numbers=None, focus=None, recent=5):
+    """
+    Per-topic/difficulty counts, a few recent problems and a bounded list of solved
+    numbers, so the prompt grows with topics rather than problems.
+    Expects solved_problems newest first; numbers from the focus topic are listed first.
+    """
+    if not solved_problems:
+        return "No problems solved yet."
+
+    max_numbers = RECOMMENDATION_PROMPT_MAX_NUMBERS if max_numbers is None else max_numbers
+    latest = {}
+    for p in solved_problems:
+        latest.setdefault(str(p['number']), p)
+    unique = list(latest.values())
+    counts = Counter((p['topic'], p['difficulty']) for p in unique)
+    topics = sorted({topic for topic, _ in counts})
+    topic_summary = ", ".join(
+        f"{topic} ({'/'.join(f'{counts[(topic, d)]}{d[0]}' for d in ('Easy', 'Medium', 'Hard') if counts[(topic, d)])})"
+        for topic in topics
+    )
+    recent_summary = "; ".join(f"{p['name']} ({p['difficulty']}, {p['topic']})" for p in unique[:recent])
+
+    if focus:
+        focus = focus.lower()
+        unique.sort(key=lambda p: p['topic'].lower() != focus)
+    numbers = [str(p['number']) for p in unique[:max_numbers]]
+    omitted = len(unique) - len(numbers)
+    numbers_summary = ", ".join(numbers) + (f" (+{omitted} more, filtered locally)" if omitted else "")
+
+    return (f"Solved {len(unique)} problems. Topics: {topic_summary}\n"
+            f"Recently solved: {recent_summary}\n"
+            f"Solved numbers: {numbers_summary}")
+
+
+def normalize_problem_name(name):
+    """'1. Two Sum' and 'two-sum' both become 'twosum'."""
+    name = re.sub(r'^\s*\d+\s*[.):-]\s*', '', str(name or '').lower())
+    return re.sub(r'[^a-z0-9]', '', name)
+
+
+def solved_exclusion_set(solved_problems):
+    """Normalized names and numbers of every solved problem, checked after generation."""
+    excluded = {normalize_problem_name(p['name']) for p in solved_problems}
+    excluded.update(f"#{str(p['number']).strip()}" for p in solved_problems)
+    return excluded
+
+
+def filter_solved_recommendations(recommendations, excluded):
+    """Drop recommendations the user has already solved (the prompt may not list them all)."""
+    kept = []
+    for rec in recommendations:
+        if not isinstance(rec, dict):
+            continue
+        name = str(rec.get('problem_name', ''))
+        number = re.match(r'^\s*(\d+)\s*[.):-]', name)
+        if normalize_problem_name(name) in excluded or (number and f"#{number.group(1)}" in excluded):
+            continue
+        kept.append(rec)
+    return kept
+
+
+def build_batch_recommendation_prompt(summaries):
+    """summaries: list of (user key, summary)."""
+    return "\n\n".join(f"User {key}:\n{summary}" for key, summary in summaries)
+
+
+def pack_recommendation_batches(summaries, batch_size, max_chars):
+    """Group (key, summary) pairs into batches bounded by user count and prompt length."""
+    batch, size = [], 0
+    for key, summary in summaries:
+        entry_size = len(key) + len(summary) + 10
+        if batch and (len(batch) >= batch_size or size + entry_size > max_chars):
+            yield batch
+            batch, size = [], 0
+        batch.append((key, summary))
+        size += entry_size
+    if batch:
+        yield batch
+
+
+def parse_recommendations(text):
+    """Return (recommendations or None, cleaned text) from a Gemini reply."""
+    recommendations_text = text.strip()
+
+    # Strip markdown fences if present
+    if recommendations_text.startswith('```'):
+        parts = recommendations_text.split('```')
+        if len(parts) > 1:
+            recommendations_text = parts[1]
+        if recommendations_text.strip().startswith('json'):
+            recommendations_text = recommendations_text[4:]
+        recommendations_text = recommendations_text.strip()
+
+    try:
+        return json.loads(recommendations_text), recommendations_text
+    except json.JSONDecodeError:
+        return None, recommendations_text
+
+
+SOLVER_SYSTEM_PROMPT = (
+    "You are an expert DSA mentor. "
+    "You help students solve coding problems step-by-step. "
+    "Your tone is encouraging and structured. "
+    "You always respond in clean Markdown (use bullet points, code blocks where needed). "
+    "IMPORTANT: When giving hints, be progressive. If you've given hints before, make the next one more specific. "
+    "CRITICAL: When you see conversation history, anything marked [YOU (MENTOR) SAID] was YOUR previous response - do not praise the student for it. "
+    "Only praise the student for their own thoughts marked as [STUDENT SAID]."
+)
+
+
+def build_solver_prompt(problem, stage, user_input, conversation_history):
+    """Return (problem statement prefix, stage prompt), or None if the stage is unknown.
+
+    The problem statement is the same for every stage of a session, so it is
+    sent first where it can be served from the context cache.
+    """
+    prefix = f"Problem:\n{problem}"
+
+    context = ""
+    if conversation_history:
+        context = "\n\nPrevious conversation (for your context - you are the Mentor):\n"
+        context += "=" * 60 + "\n"
+        for msg in conversation_history:
+            role = msg.get('role', '')
+            content = msg.get('content', '')
+            if role == 'user':
+                context += f"[STUDENT SAID]: {content}\n\n"
+            elif role == 'assistant':
+                context += f"[YOU (MENTOR) SAID]: {content}\n\n"
+        context += "=" * 60 + "\n"
+        context += "Remember: Everything marked [YOU (MENTOR) SAID] was YOUR previous response, not the student's work.\n"
+
+    if stage == 'explain':
+        return prefix, "Explain the problem above in simple, beginner-friendly language."
+    elif stage == 'hint':
+        hint_count = sum(
+            1 for msg in conversation_history
+            if msg.get('role') == 'user' and 'hint' in msg.get('content', '').lower()
+        )
+
+        if hint_count == 0:
+            hint_instruction = (
+                "Give the FIRST hint - be vague and high-level. "
+                "Just point towards the general approach or data structure without specifics."
+            )
+        elif hint_count == 1:
+            hint_instruction = (
+                "Give the SECOND hint - be more specific. "
+                "Mention the exact approach or algorithm, but don't reveal implementation details."
+            )
+        elif hint_count == 2:
+            hint_instruction = (
+                "Give the THIRD hint - be very direct. "
+                "Provide key implementation details, edge cases, or the main logic flow."
+            )
+        else:
+            hint_instruction = (
+                "Give a FINAL hint - at this point, provide almost the complete approach "
+                "with pseudocode if needed."
+            )
+
+        return prefix, f"{hint_instruction}\n{context}"
+    elif stage == 'feedback':
+        return prefix, (
+            "You are evaluating a student's partial idea for the problem above. "
+            "Give constructive feedback — tell what's good and what can improve. "
+            "Do not give the full solution yet.\n\n"
+            f"Student's thought:\n{user_input}\n"
+            f"{context}"
+        )
+    elif stage == 'solution':
+        return prefix, (
+            "Now provide the full optimal solution to the problem above with step-by-step "
+            "explanation, time and space complexity, and possible alternative approaches.\n"
+            f"{context}"
+        )
+    return None
+
+# ================== REQUEST HOOKS ==================
+
+@app.before_request
+def authenticate_request():
+    """Verify the bearer token (no DB hit) and pin the request to its user id."""
+    if request.method == 'OPTIONS':
+        return None
+
+    token = bearer_token(request.headers.get('Authorization'))
+    verify = verify_auth_token
+    if token is None and request.endpoint in STREAM_ENDPOINTS:
+        token = request.args.get('stream_token')
+        verify = partial(verify_stream_token, group_id=request.view_args['group_id'])
+    if token is None:
+        if AUTH_REQUIRED and request.endpoint not in PUBLIC_ENDPOINTS:
+            return jsonify({'error': 'Authentication required'}), 401
+        return None
+
+    try:
+        g.auth_user_id = verify(token)
+    except SignatureExpired:
+        return jsonify({'error': 'Token expired'}), 401
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Invalid token'}), 401
+
+    claimed = claimed_user_id()
+    if claimed not in (None, '') and str(claimed) != str(g.auth_user_id):
+        return jsonify({'error': 'user_id does not match token'}), 403
+
+    return None
+
+
+@app.after_request
+def remember_writes(response):
+    """Pin this client's (and user's) reads to the primary for a while after a successful write."""
+    if replica_router is None or request.method not in ('POST', 'PUT', 'PATCH', 'DELETE') \
+            or response.status_code >= 400:
+        return response
+
+    response.set_cookie(WRITE_COOKIE, f"{time.time():.3f}", max_age=int(math.ceil(DB_READ_YOUR_WRITES_SECONDS)),
+                        httponly=True, samesite='Lax')
+    user_id = resolve_user_id(claimed_user_id())
+    if user_id:
+        now = time.monotonic()
+        if len(_recent_writers) > 10000:
+            for key in [key for key, deadline in _recent_writers.items() if deadline <= now]:
+                del _recent_writers[key]
+        _recent_writers[str(user_id)] = now + DB_READ_YOUR_WRITES_SECONDS
+    return response
+
+
+@app.after_request
+def report_sql_usage(response):
+    """Flag requests that issue too many or repeated statements (SQL_DEBUG only)."""
+    if not SQL_DEBUG:
+        return response
+
+    queries = g.get('sql_queries', [])
+    total_ms = sum(ms for _, ms in queries)
+    response.headers['X-SQL-Query-Count'] = str(len(queries))
+    response.headers['X-SQL-Time-Ms'] = f"{total_ms:.2f}"
+
+    endpoint = f"{request.method} {request.path}"
+    if len(queries) > SQL_MAX_QUERIES_PER_REQUEST:
+        app.logger.warning("[sql] %s issued %d queries (limit %d, %.2fms total)",
+                           endpoint, len(queries), SQL_MAX_QUERIES_PER_REQUEST, total_ms)
+
+    for shape, count in Counter(shape for shape, _ in queries).items():
+        if count >= SQL_REPEAT_THRESHOLD:
+            app.logger.warning("[sql] possible N+1 in %s: %dx %s", endpoint, count, shape)
+
+    return response
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/csv')
+
+
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL)
+
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli large bodies the client accepts; streams (SSE) and small bodies go out as-is."""
+    if not COMPRESS_ENABLED or response.is_streamed or response.direct_passthrough \
+            or response.status_code < 200 or response.status_code in (204, 304) \
+            or 'Content-Encoding' in response.headers \
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(['br', 'gzip'] if brotli else ['gzip'])
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.set_data(compress_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# ================== RATE LIMITING ==================
+
+def parse_rate(spec):
+    """'10/60' -> (capacity 10, refill of 10 tokens per 60 seconds)."""
+    count, seconds = spec.split('/')
+    return float(count), float(count) / float(seconds)
+
+
+class MemoryBucketStore:
+    """Token buckets and counters kept in this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.counters = Counter()
+
+    def take(self, key, capacity, rate, now):
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            return allowed, 0 if allowed else math.ceil((1 - tokens) / rate)
+
+    def incr(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+class SQLiteBucketStore:
+    """Same interface backed by a local SQLite file, so every worker on the host
+    shares one set of buckets and counters."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)')
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self.local.conn = conn
+        return conn
+
+    def take(self, key, capacity, rate, now):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, 0 if allowed else math.ceil((1 - tokens) / rate)
+
+    def incr(self, name):
+        self._conn().execute(
+            'INSERT INTO counters (name, value) VALUES (?, 1) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + 1',
+            (name,)
+        )
+
+    def snapshot(self):
+        return dict(self._conn().execute('SELECT name, value FROM counters').fetchall())
+
+
+rate_limit_store = MemoryBucketStore() if RATE_LIMIT_STORE == 'memory' else SQLiteBucketStore(RATE_LIMIT_STORE)
+ai_inflight = Counter()
+ai_inflight_lock = threading.Lock()
+
+
+def check_rate_limit(name, user_key):
+    """Admit or reject one call to a limited endpoint.
+
+    Returns None when admitted (the caller must call release_rate_limit when
+    done), otherwise (error message, retry-after seconds).
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+
+    with ai_inflight_lock:
+        if sum(ai_inflight.values()) >= AI_MAX_INFLIGHT:
+            rate_limit_store.incr(f'{name}.shed')
+            return 'Server busy, please retry shortly', AI_SHED_RETRY_AFTER
+        ai_inflight[name] += 1
+
+    limits = RATE_LIMITS[name]
+    now = time.time()
+    for scope, key in (('user', f'{name}:user:{user_key}'), ('global', f'{name}:global')):
+        capacity, rate = parse_rate(limits[scope])
+        allowed, retry_after = rate_limit_store.take(key, capacity, rate, now)
+        if not allowed:
+            release_rate_limit(name)
+            rate_limit_store.incr(f'{name}.limited_{scope}')
+            return 'Rate limit exceeded, please slow down', retry_after
+
+    rate_limit_store.incr(f'{name}.allowed')
+    return None
+
+
+def release_rate_limit(name):
+    with ai_inflight_lock:
+        ai_inflight[name] -= 1
+
+
+def rate_limited(name):
+    """Token-bucket limit (per user and global) plus load shedding for a view."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            # Never key on the client's user_id: anyone could spread their calls across other users' buckets
+            user_key = g.get('auth_user_id') or request.remote_addr
+            rejection = check_rate_limit(name, user_key)
+            if rejection:
+                message, retry_after = rejection
+                response = jsonify({'error': message})
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
+            try:
+                return view(*args, **kwargs)
+            finally:
+                if RATE_LIMIT_ENABLED:
+                    release_rate_limit(name)
+        return wrapped
+    return decorator
+
+
+@app.route('/api/metrics/rate-limits', methods=['GET'])
+def rate_limit_metrics():
+    with ai_inflight_lock:
+        inflight = {name: count for name, count in ai_inflight.items() if count}
+    return jsonify({
+        'counters': rate_limit_store.snapshot(),
+        'inflight': inflight,
+        'max_inflight': AI_MAX_INFLIGHT,
+        'limits': RATE_LIMITS
+    }), 200
+
+@app.route('/api/metrics/llm', methods=['GET'])
+def llm_metrics():
+    """Per-endpoint Gemini call counts, mean latency and input tokens (incl. cached)."""
+    with llm_stats_lock:
+        stats = {
+            label: dict(
+                values,
+                avg_ms=round(values['seconds'] / values['calls'] * 1000, 1),
+                avg_prompt_tokens=round(values['prompt_tokens'] / values['calls'], 1)
+            )
+            for label, values in llm_stats.items()
+        }
+    return jsonify({
+        'models': len(_models),
+        'context_caches': sum(1 for model, _ in _cached_models.values() if model is not None),
+        'calls': stats,
+        'resilience': dict(llm_events),
+        'breaker': gemini_breaker.state
+    }), 200
+
+# ================== AUTH ENDPOINTS ==================
+
+@app.route('/api/register', methods=['POST'])
+def register():
+    try:
+        data = request.json
+        name = data.get('name')
+        email = data.get('email')
+        password = data.get('password')
+        tz_name = data.get('timezone') or 'UTC'
+
+        if not all([name, email, password]):
+            return jsonify({'error': 'All fields are required'}), 400
+        if not valid_timezone(tz_name):
+            return jsonify({'error': 'Unknown timezone'}), 400
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # Check if email already exists
+        cursor.execute('SELECT id FROM users WHERE email = %s', (email,))
+        if cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({'error': 'Email already registered'}), 409
+
+        # Hash password and insert user
+        hashed_password = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+        cursor.execute(
+            'INSERT INTO users (name, email, password, timezone) VALUES (%s, %s, %s, %s)',
+            (name, email, hashed_password, tz_name)
+        )
+        conn.commit()
+        user_id = cursor.lastrowid
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            'message': 'Registration successful',
+            'user': {'id': user_id, 'name': name, 'email': email},
+            'token': issue_auth_token(user_id),
+            'expires_in': AUTH_TOKEN_MAX_AGE
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/login', methods=['POST'])
+def login():
+    try:
+        data = request.json
+        email = data.get('email')
+        password = data.get('password')
+
+        if not all([email, password]):
+            return jsonify({'error': 'Email and password required'}), 400
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT * FROM users WHERE email = %s', (email,))
+        user = cursor.fetchone()
+
+        if not user or not check_password_hash(user['password'], password):
+            cursor.close()
+            conn.close()
+            return jsonify({'error': 'Invalid credentials'}), 401
+
+        # Upgrade hashes made with an older method/cost while we have the plaintext
+        if password_needs_rehash(user['password']):
+            cursor.execute(
+                'UPDATE users SET password = %s WHERE id = %s',
+                (generate_password_hash(password, method=PASSWORD_HASH_METHOD), user['id'])
+            )
+            conn.commit()
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            'message': 'Login successful',
+            'user': {
+                'id': user['id'],
+                'name': user['name'],
+                'email': user['email']
+            },
+            'token': issue_auth_token(user['id']),
+            'expires_in': AUTH_TOKEN_MAX_AGE
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ================== PROBLEM TRACKER ==================
+
+@app.route('/api/problems', methods=['GET'])
+def get_problems():
+    try:
+        user_id = resolve_user_id(request.args.get('user_id'))
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
+
+        conn = get_db_connection(readonly=True)
+        cursor = conn.cursor()
+
+        cursor.execute(
+            'SELECT * FROM problems WHERE user_id = %s ORDER BY created_at DESC',
+            (user_id,)
+        )
+        problems = cursor.fetchall()
+
+        cursor.close()
+        conn.close()
+
+        return jsonify(problems), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/problems', methods=['POST'])
+def add_problem():
+    try:
+        data = request.json
+        user_id = resolve_user_id(data.get('user_id'))
+        number = data.get('number')
+        name = data.get('name')
+        difficulty = data.get('difficulty')
+        topic = data.get('topic')
+        summary = data.get('summary', '')
+        notes = data.get('notes', '')
+
+        if not all([user_id, number, name, difficulty, topic]):
+            return jsonify({'error': 'All fields except summary and notes are required'}), 400
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        rules = active_points_rules(cursor)
+        points = points_for(rules, difficulty, topic)
+
+        # Explicit timestamp so the change event buckets the same instant the row stores
+        created_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        cursor.execute(
+            '''INSERT INTO problems (user_id, number, name, difficulty, topic, summary, notes, points,
+                                     points_version, created_at)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
+            (user_id, number, name, difficulty, topic, summary, notes, points, rules['version'], created_at)
+        )
+        problem_id = cursor.lastrowid
+        schedule_first_review(cursor, problem_id, user_id)
+        record_change(cursor, 'problem_added', user_id, {
+            'created_at': [created_at],
+            'topic': topic,
+            'problem': {'id': problem_id, 'number': number, 'name': name,
+                        'difficulty': difficulty, 'topic': topic, 'points': points}
+        })
+        conn.commit()
+
+        cursor.close()
+        conn.close()
+
+        change_event_consumer.notify()
+
+        return jsonify({
+            'message': 'Problem added successfully',
+            'id': problem_id
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/problems/<int:problem_id>', methods=['PUT'])
+def update_problem(problem_id):
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Body must be a JSON object'}), 400
+        user_id = resolve_user_id(claimed_user_id())
+
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        update_fields = []
+        values = []
+
+        if 'number' in data:
+            update_fields.append('number = %s')
+            values.append(data['number'])
+        if 'name' in data:
+            update_fields.append('name = %s')
+            values.append(data['name'])
+        if 'difficulty' in data:
+            update_fields.append('difficulty = %s')
+            values.append(data['difficulty'])
+        if 'topic' in data:
+            update_fields.append('topic = %s')
+            values.append(data['topic'])
+        if 'summary' in data:
+            update_fields.append('summary = %s')
+            values.append(data['summary'])
+        if 'notes' in data:
+            update_fields.append('notes = %s')
+            values.append(data['notes'])
+        if POINTS_FIELDS & set(data):
+            # Last, so the expression sees the new difficulty and topic
+            rules = active_points_rules(cursor)
+            expression, params = points_sql(rules)
+            update_fields += [f'points = {expression}', 'points_version = %s']
+            values += [*params, rules['version']]
+
+        if not update_fields:
+            return jsonify({'error': 'No fields to update'}), 400
+
+        values += [problem_id, user_id]
+        query = f"UPDATE problems SET {', '.join(update_fields)} WHERE id = %s AND user_id = %s"
+
+        cursor.execute(query, tuple(values))
+        if cursor.rowcount:
+            cursor.execute('SELECT user_id, created_at FROM problems WHERE id = %s', (problem_id,))
+            problem = cursor.fetchone()
+            record_change(cursor, 'problems_updated', problem['user_id'], {
+                'problem_ids': [problem_id],
+                'fields': sorted(field for field in data if field in PROBLEM_FIELDS),
+                'created_at': [problem['created_at']]
+            })
+        conn.commit()
+
+        cursor.close()
+        conn.close()
+
+        change_event_consumer.notify()
+
+        return jsonify({'message': 'Problem updated successfully'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/problems/<int:problem_id>', methods=['DELETE'])
+def delete_problem(problem_id):
+    try:
+        user_id = resolve_user_id(claimed_user_id())
+
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        args = (problem_id, user_id)
+        cursor.execute('SELECT user_id, created_at FROM problems WHERE id = %s AND user_id = %s', args)
+        problem = cursor.fetchone()
+        cursor.execute('DELETE FROM problems WHERE id = %s AND user_id = %s', args)
+        if problem:
+            record_change(cursor, 'problems_deleted', problem['user_id'], {
+                'problem_ids': [problem_id],
+                'created_at': [problem['created_at']]
+            })
+        conn.commit()
+
+        cursor.close()
+        conn.close()
+
+        change_event_consumer.notify()
+
+        return jsonify({'message': 'Problem deleted successfully'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+PROBLEM_FIELDS = ('number', 'name', 'difficulty', 'topic', 'summary', 'notes')
+# Fields the recommendation history is built from
+PROBLEM_HISTORY_FIELDS = {'number', 'name', 'difficulty', 'topic'}
+# Fields the points rules read
+POINTS_FIELDS = {'difficulty', 'topic'}
+
+
+@app.route('/api/problems/batch', methods=['POST'])
+def batch_problems():
+    """
+    Patch and/or delete many of a user's problems in one transaction.
+    Body: {"user_id": 1, "update": {"ids": [1, 2], "set": {"topic": "Graphs"}}, "delete": [3, 4]}
+    Returns how many rows were changed and deleted; ids owned by other users are ignored.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Body must be a JSON object'}), 400
+        user_id = resolve_user_id(data.get('user_id'))
+        update = data.get('update') or {}
+        if not isinstance(update, dict):
+            return jsonify({'error': 'update must be an object'}), 400
+        update_ids = update.get('ids') or []
+        changes = update.get('set') or {}
+        delete_ids = data.get('delete') or []
+
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
+        if not isinstance(update_ids, list) or not isinstance(delete_ids, list):
+            return jsonify({'error': 'update.ids and delete must be lists of ids'}), 400
+        if not isinstance(changes, dict) or \
+                not all(value is None or isinstance(value, (str, int, float)) for value in changes.values()):
+            return jsonify({'error': 'update.set must map fields to plain values'}), 400
+        if not update_ids and not delete_ids:
+            return jsonify({'error': 'Nothing to update or delete'}), 400
+        if not all(is_json_int(i) for i in update_ids + delete_ids):
+            return jsonify({'error': 'ids must be integers'}), 400
+        if len(update_ids) + len(delete_ids) > PROBLEM_BATCH_MAX:
+            return jsonify({'error': f'At most {PROBLEM_BATCH_MAX} ids per batch'}), 400
+        if update_ids and not changes:
+            return jsonify({'error': 'update.set is required'}), 400
+        unknown = set(changes) - set(PROBLEM_FIELDS)
+        if unknown:
+            return jsonify({'error': f"Cannot update: {', '.join(sorted(unknown))}"}), 400
+        if 'difficulty' in changes and changes['difficulty'] not in POINTS_BY_DIFFICULTY:
+            return jsonify({'error': 'Invalid difficulty'}), 400
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # Lock the rows and keep their timestamps: the change events name the days to re-bucket
+        all_ids = set(update_ids) | set(delete_ids)
+        placeholders = ', '.join(['%s'] * len(all_ids))
+        cursor.execute(
+            f'''SELECT id, created_at FROM problems
+                WHERE user_id = %s AND id IN ({placeholders}) FOR UPDATE''',
+            (user_id, *all_ids)
+        )
+        created = {row['id']: row['created_at'] for row in cursor.fetchall()}
+
+        updated = 0
+        if update_ids:
+            assignments = [f'{field} = %s' for field in changes]
+            values = list(changes.values())
+            if POINTS_FIELDS & set(changes):
+                # SET is applied left to right, so the expression sees the new difficulty and topic
+                rules = active_points_rules(cursor)
+                expression, params = points_sql(rules)
+                assignments += [f'points = {expression}', 'points_version = %s']
+                values += [*params, rules['version']]
+            placeholders = ', '.join(['%s'] * len(update_ids))
+            cursor.execute(
+                f"UPDATE problems SET {', '.join(assignments)} WHERE user_id = %s AND id IN ({placeholders})",
+                (*values, user_id, *update_ids)
+            )
+            updated = cursor.rowcount
+
+        deleted = 0
+        if delete_ids:
+            placeholders = ', '.join(['%s'] * len(delete_ids))
+            cursor.execute(
+                f'DELETE FROM problems WHERE user_id = %s AND id IN ({placeholders})',
+                (user_id, *delete_ids)
+            )
+            deleted = cursor.rowcount
+
+        if updated:
+            ids = [i for i in update_ids if i in created and i not in delete_ids]
+            record_change(cursor, 'problems_updated', user_id, {
+                'problem_ids': ids,
+                'fields': sorted(changes),
+                'created_at': [created[i] for i in ids]
+            })
+        if deleted:
+            ids = [i for i in delete_ids if i in created]
+            record_change(cursor, 'problems_deleted', user_id, {
+                'problem_ids': ids,
+                'created_at': [created[i] for i in ids]
+            })
+        conn.commit()
+
+        cursor.close()
+        conn.close()
+
+        change_event_consumer.notify()
+
+        return jsonify({
+            'message': 'Batch applied successfully',
+            'updated': updated,
+            'deleted': deleted
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ================== POINTS RULES ==================
+#
+# points = base points for the difficulty + the topic's bonus (if any), from the
+# active version in points_rules. problems.points_version records which version
+# scored each row, so `flask recompute-points` only rewrites rows scored by
+# another version and can stop and resume at any chunk.
+
+DEFAULT_POINTS = 10
+DEFAULT_POINTS_RULES = {'version': 1, 'difficulty': dict(POINTS_BY_DIFFICULTY), 'topics': {}}
+
+_points_rules_cache = {}
+
+
+def load_points_rules(cursor, version=None):
+    """Rules of a version (default: the active one) as {'version', 'difficulty', 'topics'}."""
+    if version is None:
+        cursor.execute('SELECT version FROM points_rule_versions WHERE active')
+        row = cursor.fetchone()
+        if row is None:
+            return DEFAULT_POINTS_RULES
+        version = row['version']
+
+    cursor.execute('SELECT kind, name, points FROM points_rules WHERE version = %s', (version,))
+    rules = {'version': version, 'difficulty': {}, 'topics': {}}
+    for row in cursor.fetchall():
+        if row['kind'] == 'difficulty':
+            rules['difficulty'][row['name']] = row['points']
+        else:
+            rules['topics'][row['name'].strip().lower()] = row['points']
+    return rules
+
+
+def active_points_rules(cursor):
+    """The active rules, cached per worker for POINTS_RULES_CACHE_SECONDS."""
+    cached = _points_rules_cache.get('active')
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    rules = load_points_rules(cursor)
+    _points_rules_cache['active'] = (rules, time.monotonic() + POINTS_RULES_CACHE_SECONDS)
+    return rules
+
+
+def points_for(rules, difficulty, topic):
+    return (rules['difficulty'].get(difficulty, DEFAULT_POINTS)
+            + rules['topics'].get(str(topic or '').strip().lower(), 0))
+
+
+def points_sql(rules):
+    """(expression, params) computing points_for() from a row's difficulty and topic columns."""
+    expression = f"(CASE difficulty {' '.join(['WHEN %s THEN %s'] * len(rules['difficulty']))} ELSE %s END)"
+    params = [value for rule in rules['difficulty'].items() for value in rule] + [DEFAULT_POINTS]
+    if rules['topics']:
+        expression += f" + (CASE LOWER(TRIM(topic)) {' '.join(['WHEN %s THEN %s'] * len(rules['topics']))} ELSE 0 END)"
+        params += [value for rule in rules['topics'].items() for value in rule]
+    return expression, params
+
+
+@app.route('/api/points-rules', methods=['GET'])
+def get_points_rules():
+    """The active points rules, for showing what a problem is worth."""
+    try:
+        conn = get_db_connection(readonly=True)
+        cursor = conn.cursor()
+        rules = active_points_rules(cursor)
+        cursor.close()
+        conn.close()
+
+        return jsonify(rules), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def parse_points_option(values, option):
+    """['Graphs=5', ...] from repeated click options into {'Graphs': 5}."""
+    parsed = {}
+    for value in values:
+        name, sep, points = value.rpartition('=')
+        if not sep or not name.strip() or not points.strip().lstrip('-').isdigit():
+            raise click.BadParameter(f"expected NAME=POINTS, got '{value}'", param_hint=option)
+        parsed[name.strip()] = int(points)
+    return parsed
+
+
+@app.cli.command('create-points-rules')
+@click.option('--difficulty', 'difficulties', multiple=True, help='Base points, e.g. Hard=60 (repeatable).')
+@click.option('--topic-bonus', 'bonuses', multiple=True, help='Topic bonus, e.g. "Dynamic Programming=5" (repeatable).')
+@click.option('--description', default=None)
+@click.option('--activate', is_flag=True, help='Make the new version active right away.')
+def create_points_rules_command(difficulties, bonuses, description, activate):
+    """Create a new points rules version; difficulties not given keep the active version's points."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    current = load_points_rules(cursor)
+    base = {**current['difficulty'], **parse_points_option(difficulties, '--difficulty')}
+    unknown = set(base) - set(POINTS_BY_DIFFICULTY)
+    if unknown:
+        raise click.BadParameter(f"unknown difficulty: {', '.join(sorted(unknown))}", param_hint='--difficulty')
+
+    cursor.execute('INSERT INTO points_rule_versions (description) VALUES (%s)', (description,))
+    version = cursor.lastrowid
+    cursor.executemany(
+        'INSERT INTO points_rules (version, kind, name, points) VALUES (%s, %s, %s, %s)',
+        [(version, 'difficulty', name, points) for name, points in base.items()]
+        + [(version, 'topic', name, points) for name, points in parse_points_option(bonuses, '--topic-bonus').items()]
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+    click.echo(f'Created points rules version {version}')
+    if activate:
+        activate_points_rules(version)
+        click.echo(f'Version {version} is active; run `flask recompute-points` to rescore existing problems')
+
+
+def activate_points_rules(version):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM points_rule_versions WHERE version = %s', (version,))
+    if cursor.fetchone() is None:
+        raise click.ClickException(f'No points rules version {version}')
+    cursor.execute(
+        '''UPDATE points_rule_versions
+           SET active = (version = %s), activated_at = IF(version = %s, NOW(), activated_at)''',
+        (version, version)
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+    _points_rules_cache.clear()
+
+
+@app.cli.command('activate-points-rules')
+@click.argument('version', type=int)
+def activate_points_rules_command(version):
+    """Make VERSION the rules new and edited problems are scored with."""
+    activate_points_rules(version)
+    click.echo(f'Version {version} is active; run `flask recompute-points` to rescore existing problems')
+
+
+RESCORE_CHUNK_SQL = '''
+    SELECT MAX(id) AS last_id, COUNT(*) AS scanned
+    FROM (SELECT id FROM problems WHERE id > %s ORDER BY id LIMIT %s) chunk
+'''
+# One event per user whose points move, skipped while one is still pending: the
+# consumer rebuilds rollups, mastery and the leaderboard from the rewritten rows
+RESCORE_EVENTS_SQL = '''
+    INSERT INTO change_events (event_type, user_id, payload)
+    SELECT DISTINCT 'points_rescored', p.user_id, '{{}}'
+    FROM problems p
+    WHERE p.id > %s AND p.id <= %s AND p.points <> {expression}
+      AND NOT EXISTS (SELECT 1 FROM change_events e
+                      WHERE e.processed_at IS NULL AND e.event_type = 'points_rescored'
+                        AND e.user_id = p.user_id)
+'''
+RESCORE_UPDATE_SQL = '''
+    UPDATE problems SET points = {expression}, points_version = %s
+    WHERE id > %s AND id <= %s AND points_version <> %s
+'''
+RESCORE_PROGRESS_SQL = '''
+    UPDATE points_recompute_jobs
+    SET last_id = %s, rows_scanned = rows_scanned + %s, rows_updated = rows_updated + %s
+    WHERE id = %s AND cancelled_at IS NULL
+'''
+
+
+def rescore_points_chunk(cursor, rules, job_id, after_id, chunk_size):
+    """
+    Rescore the next chunk_size problems by id after after_id with set-based
+    statements, committing the job's checkpoint in the same transaction.
+    Returns (last id covered, rows scanned, rows updated); scanned is 0 at the end.
+    """
+    cursor.execute(RESCORE_CHUNK_SQL, (after_id, chunk_size))
+    chunk = cursor.fetchone()
+    if not chunk['scanned']:
+        return after_id, 0, 0
+
+    expression, params = points_sql(rules)
+    cursor.execute(RESCORE_EVENTS_SQL.format(expression=expression), (after_id, chunk['last_id'], *params))
+    cursor.execute(RESCORE_UPDATE_SQL.format(expression=expression),
+                   (*params, rules['version'], after_id, chunk['last_id'], rules['version']))
+    updated = cursor.rowcount
+    cursor.execute(RESCORE_PROGRESS_SQL, (chunk['last_id'], chunk['scanned'], updated, job_id))
+    if not cursor.rowcount:
+        # A newer run superseded this job; leave the chunk to it
+        cursor.connection.rollback()
+        raise click.ClickException(f'job {job_id} was cancelled by a newer recompute-points run')
+    cursor.connection.commit()
+    return chunk['last_id'], chunk['scanned'], updated
+
+
+def wait_for_replicas(max_lag):
+    """Block while any read replica is more than max_lag seconds behind; returns the worst lag seen."""
+    if replica_router is None:
+        return 0
+    while True:
+        lags = []
+        for replica in replica_router.replicas:
+            try:
+                lags.append(replica_lag(replica_router.config(replica)))
+            except pymysql.err.OperationalError:
+                # An unreachable replica isn't serving reads; don't stall the job on it
+                continue
+        worst = max((lag for lag in lags if lag is not None), default=0)
+        if worst <= max_lag:
+            return worst
+        click.echo(f'replica lag {worst}s > {max_lag}s, waiting')
+        time.sleep(min(worst, 5))
+
+
+@app.cli.command('recompute-points')
+@click.option('--version', type=int, default=None, help='Rules version to apply (default: the active one).')
+@click.option('--chunk-size', default=POINTS_RECOMPUTE_CHUNK, show_default=True, help='Problems per UPDATE.')
+@click.option('--pause', default=POINTS_RECOMPUTE_PAUSE, show_default=True, help='Seconds to sleep between chunks.')
+@click.option('--max-lag', default=POINTS_RECOMPUTE_MAX_LAG, show_default=True,
+              help='Wait while a read replica is further behind than this (seconds).')
+@click.option('--restart', is_flag=True, help='Start from the first problem instead of resuming.')
+def recompute_points_command(version, chunk_size, pause, max_lag, restart):
+    """Rewrite problems.points under a rules version in throttled, resumable chunks."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    rules = load_points_rules(cursor, version)
+    if not rules['difficulty']:
+        raise click.ClickException(f'No points rules version {version}')
+
+    # Let every worker's cached rules expire first, so nothing scored with the old
+    # version lands behind the job once it has passed
+    cursor.execute(
+        '''SELECT TIMESTAMPDIFF(SECOND, activated_at, NOW()) AS age
+           FROM points_rule_versions WHERE version = %s AND active''',
+        (rules['version'],)
+    )
+    activated = cursor.fetchone()
+    if activated and activated['age'] is not None and activated['age'] < POINTS_RULES_CACHE_SECONDS:
+        wait = POINTS_RULES_CACHE_SECONDS - activated['age']
+        click.echo(f'waiting {wait:.0f}s for workers to pick up version {rules["version"]}')
+        time.sleep(wait)
+
+    cursor.execute(
+        '''SELECT id, last_id, rows_scanned, rows_updated FROM points_recompute_jobs
+           WHERE version = %s AND finished_at IS NULL AND cancelled_at IS NULL ORDER BY id DESC LIMIT 1''',
+        (rules['version'],)
+    )
+    job = None if restart else cursor.fetchone()
+    if job is None:
+        # A full rescore supersedes every unfinished job, whatever its version
+        cursor.execute('''UPDATE points_recompute_jobs SET cancelled_at = NOW()
+                          WHERE finished_at IS NULL AND cancelled_at IS NULL''')
+        if cursor.rowcount:
+            click.echo(f'{cursor.rowcount} unfinished job(s) cancelled')
+        cursor.execute('INSERT INTO points_recompute_jobs (version) VALUES (%s)', (rules['version'],))
+        job = {'id': cursor.lastrowid, 'last_id': 0, 'rows_scanned': 0, 'rows_updated': 0}
+    else:
+        click.echo(f"resuming job {job['id']} after problem {job['last_id']}")
+    cursor.execute('SELECT COALESCE(MAX(id), 0) AS max_id FROM problems')
+    max_id = cursor.fetchone()['max_id']
+    conn.commit()
+
+    last_id, scanned, updated = job['last_id'], job['rows_scanned'], job['rows_updated']
+    start = time.perf_counter()
+    try:
+        while True:
+            chunk_start = time.perf_counter()
+            last_id, chunk_scanned, chunk_updated = rescore_points_chunk(cursor, rules, job['id'],
+                                                                         last_id, chunk_size)
+            if not chunk_scanned:
+                break
+            scanned += chunk_scanned
+            updated += chunk_updated
+            elapsed = time.perf_counter() - start
+            click.echo(
+                f"job {job['id']}: through problem {last_id} of {max(max_id, last_id)} "
+                f"({min(last_id / max_id, 1) if max_id else 1:.1%}), {scanned} scanned, {updated} updated, "
+                f"chunk {(time.perf_counter() - chunk_start) * 1000:.0f}ms"
+                + (f', {scanned / elapsed:.0f} rows/s' if elapsed else '')
+            )
+            time.sleep(pause)
+            wait_for_replicas(max_lag)
+
+        cursor.execute('UPDATE points_recompute_jobs SET finished_at = NOW() WHERE id = %s', (job['id'],))
+        conn.commit()
+    except KeyboardInterrupt:
+        conn.rollback()
+        raise click.ClickException(f"interrupted after problem {last_id}; rerun to resume job {job['id']}")
+    finally:
+        cursor.close()
+        conn.close()
 
-# ================== HELPERS ==================
+    click.echo(f"job {job['id']} done: {scanned} problems scanned, {updated} rescored with version {rules['version']}; "
+               'the change-event consumer refreshes the affected users\' rollups')
 
-def get_db_connection():
-    """Get a new DB connection."""
-    return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
+# ================== ANALYTICS ==================
 
-def user_exists(cursor, user_id):
-    cursor.execute('SELECT id FROM users WHERE id = %s', (user_id,))
-    return cursor.fetchone() is not None
+@app.route('/api/analytics/difficulty', methods=['GET'])
+def analytics_by_difficulty():
+    try:
+        user_id = resolve_user_id(request.args.get('user_id'))
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
 
+        conn = get_db_connection(readonly=True)
+        cursor = conn.cursor()
 
-def get_user_group_count(cursor, user_id):
-    cursor.execute('SELECT COUNT(*) as count FROM group_members WHERE user_id = %s', (user_id,))
-    result = cursor.fetchone()
-    return result['count'] if result else 0
+        cursor.execute(
+            '''SELECT difficulty, COUNT(*) as count
+               FROM problems
+               WHERE user_id = %s
+               GROUP BY difficulty''',
+            (user_id,)
+        )
+        results = cursor.fetchall()
 
+        cursor.close()
+        conn.close()
 
-def generate_invite_code(cursor, length=12, max_attempts=5):
-    for _ in range(max_attempts):
-        code = secrets.token_urlsafe(length)[:20]
-        cursor.execute('SELECT id FROM groups WHERE invite_code = %s', (code,))
-        if not cursor.fetchone():
-            return code
-    return None
+        return jsonify(results), 200
 
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-def extract_text_from_pdf(pdf_file):
-    """Extract raw text from a PDF file-like object."""
+
+@app.route('/api/analytics/topic', methods=['GET'])
+def analytics_by_topic():
     try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
+        user_id = resolve_user_id(request.args.get('user_id'))
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
+
+        conn = get_db_connection(readonly=True)
+        cursor = conn.cursor()
+
+        cursor.execute(
+            '''SELECT topic, COUNT(*) as count
+               FROM problems
+               WHERE user_id = %s
+               GROUP BY topic
+               ORDER BY count DESC''',
+            (user_id,)
+        )
+        results = cursor.fetchall()
+
+        cursor.close()
+        conn.close()
+
+        return jsonify(results), 200
+
     except Exception as e:
-        print(f"Error extracting PDF text: {e}")
-        return None
+        return jsonify({'error': str(e)}), 500
 
 
-def extract_candidate_name(text):
-    """
-    Extract candidate name from resume text using heuristics + Gemini.
-    Assumes name is in the first few lines of the resume.
-    """
+@app.route('/api/analytics/points', methods=['GET'])
+def analytics_points_over_time():
     try:
-        lines = text.strip().split('\n')
-        first_lines = [line.strip() for line in lines[:5] if line.strip()]
+        user_id = resolve_user_id(request.args.get('user_id'))
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
 
-        if not first_lines:
-            return "the candidate"
+        conn = get_db_connection(readonly=True)
+        cursor = conn.cursor()
 
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        name_prompt = f"""From the following resume excerpt, extract ONLY the candidate's full name. 
-Return just the name, nothing else. If you cannot find a clear name, return "Candidate".
+        # Running total straight from the daily rollup (one row per active day)
+        cursor.execute(
+            '''SELECT activity_date AS date,
+                      CAST(SUM(points) OVER (ORDER BY activity_date) AS SIGNED) AS points
+               FROM user_daily_activity
+               WHERE user_id = %s
+               ORDER BY activity_date''',
+            (user_id,)
+        )
+        # Rows go out as-is: the JSON provider renders dates as YYYY-MM-DD
+        cumulative_data = cursor.fetchall()
 
-Resume excerpt:
-{chr(10).join(first_lines[:3])}
-"""
-        response = model.generate_content(name_prompt)
-        name = response.text.strip()
+        cursor.close()
+        conn.close()
 
-        # Simple validation
-        words = name.split()
-        if 1 <= len(words) <= 4 and len(name) < 50:
-            return name
-        else:
-            return "the candidate"
+        return jsonify(cumulative_data), 200
 
     except Exception as e:
-        print(f"Error extracting name: {e}")
-        return "the candidate"
+        return jsonify({'error': str(e)}), 500
 
-# ================== AUTH ENDPOINTS ==================
 
-@app.route('/api/register', methods=['POST'])
-def register():
+@app.route('/api/analytics/summary', methods=['GET'])
+def analytics_summary():
     try:
-        data = request.json
-        name = data.get('name')
-        email = data.get('email')
-        password = data.get('password')
-
-        if not all([name, email, password]):
-            return jsonify({'error': 'All fields are required'}), 400
+        user_id = resolve_user_id(request.args.get('user_id'))
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
 
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cursor = conn.cursor()
 
-        # Check if email already exists
-        cursor.execute('SELECT id FROM users WHERE email = %s', (email,))
-        if cursor.fetchone():
-            cursor.close()
-            conn.close()
-            return jsonify({'error': 'Email already registered'}), 409
+        # Total problems
+        cursor.execute(
+            'SELECT COUNT(*) as total FROM problems WHERE user_id = %s',
+            (user_id,)
+        )
+        total = cursor.fetchone()['total']
 
-        # Hash password and insert user
-        hashed_password = generate_password_hash(password)
+        # Total points
         cursor.execute(
-            'INSERT INTO users (name, email, password) VALUES (%s, %s, %s)',
-            (name, email, hashed_password)
+            'SELECT SUM(points) as total_points FROM problems WHERE user_id = %s',
+            (user_id,)
         )
-        conn.commit()
-        user_id = cursor.lastrowid
+        points_result = cursor.fetchone()
+        total_points = points_result['total_points'] if points_result['total_points'] else 0
 
         cursor.close()
         conn.close()
 
         return jsonify({
-            'message': 'Registration successful',
-            'user': {'id': user_id, 'name': name, 'email': email}
-        }), 201
+            'total_problems': total,
+            'total_points': total_points
+        }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-
-@app.route('/api/login', methods=['POST'])
-def login():
+@app.route('/api/analytics/heatmap', methods=['GET'])
+def analytics_heatmap():
+    """Per-day problem counts and points for a calendar heatmap, in the user's time zone."""
     try:
-        data = request.json
-        email = data.get('email')
-        password = data.get('password')
-
-        if not all([email, password]):
-            return jsonify({'error': 'Email and password required'}), 400
+        user_id = resolve_user_id(request.args.get('user_id'))
+        days = min(max(request.args.get('days', 365, type=int), 1), 3660)
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
 
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM users WHERE email = %s', (email,))
-        user = cursor.fetchone()
+        zone = user_zone(cursor, user_id)
+        today = datetime.now(zone).date()
+        start = today - timedelta(days=days - 1)
+        cursor.execute(
+            '''SELECT activity_date AS date, problems_solved AS count, points
+               FROM user_daily_activity
+               WHERE user_id = %s AND activity_date BETWEEN %s AND %s
+               ORDER BY activity_date''',
+            (user_id, start, today)
+        )
+        rows = cursor.fetchall()
 
         cursor.close()
         conn.close()
 
-        if not user or not check_password_hash(user['password'], password):
-            return jsonify({'error': 'Invalid credentials'}), 401
-
         return jsonify({
-            'message': 'Login successful',
-            'user': {
-                'id': user['id'],
-                'name': user['name'],
-                'email': user['email']
-            }
+            'timezone': str(zone),
+            'start': start,
+            'end': today,
+            'days': rows
         }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# ================== PROBLEM TRACKER ==================
 
-@app.route('/api/problems', methods=['GET'])
-def get_problems():
+@app.route('/api/analytics/streak', methods=['GET'])
+def analytics_streak():
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(request.args.get('user_id'))
         if not user_id:
             return jsonify({'error': 'user_id required'}), 400
 
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cursor = conn.cursor()
 
+        zone = user_zone(cursor, user_id)
         cursor.execute(
-            'SELECT * FROM problems WHERE user_id = %s ORDER BY created_at DESC',
+            'SELECT activity_date FROM user_daily_activity WHERE user_id = %s ORDER BY activity_date',
             (user_id,)
         )
-        problems = cursor.fetchall()
+        active_days = [row['activity_date'] for row in cursor.fetchall()]
 
         cursor.close()
         conn.close()
 
-        return jsonify(problems), 200
+        current, longest = compute_streaks(active_days, datetime.now(zone).date())
+        return jsonify({
+            'current_streak': current,
+            'longest_streak': longest,
+            'active_days': len(active_days),
+            'last_active': active_days[-1].isoformat() if active_days else None,
+            'timezone': str(zone)
+        }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/problems', methods=['POST'])
-def add_problem():
+@app.route('/api/user/timezone', methods=['PUT'])
+def update_timezone():
+    """Change a user's time zone and re-bucket their activity history."""
     try:
         data = request.json
-        user_id = data.get('user_id')
-        number = data.get('number')
-        name = data.get('name')
-        difficulty = data.get('difficulty')
-        topic = data.get('topic')
-        summary = data.get('summary', '')
-        notes = data.get('notes', '')
-
-        if not all([user_id, number, name, difficulty, topic]):
-            return jsonify({'error': 'All fields except summary and notes are required'}), 400
+        user_id = resolve_user_id(data.get('user_id'))
+        tz_name = data.get('timezone')
 
-        # Points based on difficulty
-        points = {'Easy': 10, 'Medium': 25, 'Hard': 50}.get(difficulty, 10)
+        if not user_id or not tz_name:
+            return jsonify({'error': 'user_id and timezone required'}), 400
+        if not valid_timezone(tz_name):
+            return jsonify({'error': 'Unknown timezone'}), 400
 
         conn = get_db_connection()
         cursor = conn.cursor()
 
+        cursor.execute('UPDATE users SET timezone = %s WHERE id = %s', (tz_name, user_id))
+        rebuild_daily_activity(cursor, user_id, ZoneInfo(tz_name))
+        conn.commit()
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({'message': 'Timezone updated', 'timezone': tz_name}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.cli.command('rebuild-activity')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+def rebuild_activity_command(user_id):
+    """Recompute user_daily_activity from the problems table."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    if user_id:
+        user_ids = [user_id]
+    else:
+        cursor.execute('SELECT id FROM users ORDER BY id')
+        user_ids = [row['id'] for row in cursor.fetchall()]
+
+    for uid in user_ids:
+        rebuild_daily_activity(cursor, uid, user_zone(cursor, uid))
+        conn.commit()
+
+    cursor.close()
+    conn.close()
+    click.echo(f'Rebuilt daily activity for {len(user_ids)} users')
+
+# ================== TOPIC MASTERY ==================
+#
+# mastery(user, topic) = sum of points * difficulty weight * 0.5 ** (days since solved / half-life)
+#
+# Stored scores are anchored at MASTERY_EPOCH rather than "now": each problem adds
+# points * weight * 2 ** (days from the epoch to solving / half-life). Today's score
+# is the stored value times mastery_decay(), one factor shared by every row, so
+# stored scores keep ranking users correctly without being rewritten as time
+# passes and rankings can ORDER BY the indexed column.
+
+MASTERY_EPOCH = datetime(2024, 1, 1)
+DIFFICULTY_CODES = {difficulty: code for code, difficulty in enumerate(MASTERY_DIFFICULTY_WEIGHTS)}
+
+# Locking read: a concurrent add_problem for these users waits for the recompute to
+# commit (and is then applied by its own change event) instead of being overwritten
+MASTERY_COLUMNS_SQL = '''
+    SELECT user_id, topic, difficulty, points, TIMESTAMPDIFF(SECOND, %s, created_at)
+    FROM problems
+    WHERE {where}
+    FOR SHARE
+'''
+# Callers delete the affected rows first. The additive update only merges topics the
+# column collation treats as equal but the Python grouping kept apart (e.g. accents).
+STORE_MASTERY_SQL = '''
+    INSERT INTO topic_mastery (user_id, topic, score, problems, points, last_solved_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE score = score + VALUES(score), problems = problems + VALUES(problems),
+                            points = points + VALUES(points),
+                            last_solved_at = GREATEST(last_solved_at, VALUES(last_solved_at))
+'''
+WEAKEST_TOPICS_SQL = 'SELECT topic FROM topic_mastery WHERE user_id = %s ORDER BY score LIMIT %s'
+
+
+def load_problem_columns(conn, where, args):
+    """
+    Read the matching problems as parallel NumPy arrays (user_id, topic code,
+    difficulty code, points, seconds since MASTERY_EPOCH) plus the topic names
+    the codes index. Topics are grouped case- and whitespace-insensitively.
+    """
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    cursor.execute(MASTERY_COLUMNS_SQL.format(where=where), (MASTERY_EPOCH, *args))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    user_ids, names, difficulties, points, seconds = zip(*rows) if rows else ((),) * 5
+    keys = np.array([name.strip().lower() for name in names], dtype=str)
+    _, first, topic_codes = np.unique(keys, return_index=True, return_inverse=True)
+    columns = {
+        'user_id': np.array(user_ids, dtype=np.int64),
+        'topic': topic_codes.reshape(-1).astype(np.int64),
+        'difficulty': np.array([DIFFICULTY_CODES.get(d, 0) for d in difficulties], dtype=np.int64),
+        'points': np.array(points, dtype=np.float64),
+        'seconds': np.array(seconds, dtype=np.float64),
+    }
+    return columns, [names[i].strip() for i in first]
+
+
+def compute_topic_mastery(columns, topic_count):
+    """
+    Score every (user, topic) pair in the columns in one vectorized pass.
+    Returns parallel arrays: user_id, topic code, anchored score, problems,
+    points and the latest solve in seconds since MASTERY_EPOCH.
+    """
+    weights = np.array(list(MASTERY_DIFFICULTY_WEIGHTS.values()))
+    terms = (weights[columns['difficulty']] * columns['points']
+             * np.exp2(columns['seconds'] / (MASTERY_HALF_LIFE_DAYS * 86400)))
+
+    # One sparse key per (user, topic); a dense users x topics matrix would be mostly zeros
+    topic_count = max(topic_count, 1)
+    pairs, inverse = np.unique(columns['user_id'] * topic_count + columns['topic'], return_inverse=True)
+    inverse = inverse.reshape(-1)
+    latest = np.full(len(pairs), -np.inf)
+    np.maximum.at(latest, inverse, columns['seconds'])
+    return {
+        'user_id': pairs // topic_count,
+        'topic': pairs % topic_count,
+        'score': np.bincount(inverse, weights=terms, minlength=len(pairs)),
+        'problems': np.bincount(inverse, minlength=len(pairs)),
+        'points': np.bincount(inverse, weights=columns['points'], minlength=len(pairs)),
+        'latest': latest,
+    }
+
+
+def store_topic_mastery(cursor, mastery, topics):
+    rows = [
+        (user_id, topics[topic], score, problems, int(points), MASTERY_EPOCH + timedelta(seconds=latest))
+        for user_id, topic, score, problems, points, latest in zip(
+            *(mastery[key].tolist() for key in ('user_id', 'topic', 'score', 'problems', 'points', 'latest')))
+    ]
+    if rows:
+        cursor.executemany(STORE_MASTERY_SQL, rows)
+    return len(rows)
+
+
+def refresh_topic_mastery(cursor, user_id, topic=None):
+    """Recompute one user's mastery, or just one topic of it, from their problems (idempotent)."""
+    where, args = 'user_id = %s', [user_id]
+    if topic is not None:
+        # Stored topics are trimmed; the problem row may carry stray whitespace
+        where += ' AND TRIM(topic) = %s'
+        args.append(topic.strip())
+    columns, topics = load_problem_columns(cursor.connection, where, args)
+    cursor.execute(f'DELETE FROM topic_mastery WHERE {where}', args)
+    return store_topic_mastery(cursor, compute_topic_mastery(columns, len(topics)), topics)
+
+
+def recompute_topic_mastery(batch_users=MASTERY_BATCH_USERS):
+    """
+    Rescore all users in id ranges of batch_users, loading, scoring and replacing
+    each range in one transaction. Yields (first id, last id, problems read, rows stored).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT MIN(id) AS first_id, MAX(id) AS last_id FROM users')
+        bounds = cursor.fetchone()
+        conn.commit()
+        for low in range(bounds['first_id'] or 1, (bounds['last_id'] or 0) + 1, batch_users):
+            high = low + batch_users - 1
+            columns, topics = load_problem_columns(conn, 'user_id BETWEEN %s AND %s', (low, high))
+            cursor.execute('DELETE FROM topic_mastery WHERE user_id BETWEEN %s AND %s', (low, high))
+            stored = store_topic_mastery(cursor, compute_topic_mastery(columns, len(topics)), topics)
+            conn.commit()
+            yield low, high, len(columns['user_id']), stored
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def mastery_decay(now=None):
+    """Factor turning stored (epoch-anchored) scores into today's scores."""
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    return 2 ** (-(now - MASTERY_EPOCH).total_seconds() / 86400 / MASTERY_HALF_LIFE_DAYS)
+
+
+def weakest_topics(cursor, user_id, limit=MASTERY_WEAK_TOPICS):
+    """Practiced topics with the lowest mastery; the shared decay keeps stored order valid."""
+    cursor.execute(WEAKEST_TOPICS_SQL, (user_id, limit))
+    return [row['topic'] for row in cursor.fetchall()]
+
+
+@app.route('/api/mastery', methods=['GET'])
+def get_topic_mastery():
+    """A user's practiced topics, strongest first, scored as of now."""
+    try:
+        user_id = resolve_user_id(request.args.get('user_id'))
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
+
+        conn = get_db_connection(readonly=True)
+        cursor = conn.cursor()
+
         cursor.execute(
-            '''INSERT INTO problems (user_id, number, name, difficulty, topic, summary, notes, points)
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s)''',
-            (user_id, number, name, difficulty, topic, summary, notes, points)
+            '''SELECT topic, score, problems, points, last_solved_at FROM topic_mastery
+               WHERE user_id = %s ORDER BY score DESC''',
+            (user_id,)
         )
-        conn.commit()
-        problem_id = cursor.lastrowid
+        topics = cursor.fetchall()
 
         cursor.close()
         conn.close()
 
-        return jsonify({
-            'message': 'Problem added successfully',
-            'id': problem_id
-        }), 201
+        decay = mastery_decay()
+        for row in topics:
+            row['score'] = round(row['score'] * decay, 2)
+
+        return jsonify({'topics': topics, 'half_life_days': MASTERY_HALF_LIFE_DAYS}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/problems/<int:problem_id>', methods=['PUT'])
-def update_problem(problem_id):
+@app.route('/api/mastery/rankings', methods=['GET'])
+def get_mastery_rankings():
+    """Top users in one topic by mastery, plus the requesting user's own rank."""
     try:
-        data = request.json
+        topic = (request.args.get('topic') or '').strip()
+        if not topic:
+            return jsonify({'error': 'topic required'}), 400
+        limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+        user_id = resolve_user_id(request.args.get('user_id'))
 
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cursor = conn.cursor()
 
-        update_fields = []
-        values = []
+        cursor.execute(
+            '''SELECT m.user_id, u.name, m.score, m.problems
+               FROM topic_mastery m
+               JOIN users u ON u.id = m.user_id
+               WHERE m.topic = %s
+               ORDER BY m.score DESC
+               LIMIT %s''',
+            (topic, limit)
+        )
+        rankings = cursor.fetchall()
 
-        if 'number' in data:
-            update_fields.append('number = %s')
-            values.append(data['number'])
-        if 'name' in data:
-            update_fields.append('name = %s')
-            values.append(data['name'])
-        if 'difficulty' in data:
-            update_fields.append('difficulty = %s')
-            values.append(data['difficulty'])
-            # Update points based on new difficulty
-            points = {'Easy': 10, 'Medium': 25, 'Hard': 50}.get(data['difficulty'], 10)
-            update_fields.append('points = %s')
-            values.append(points)
-        if 'topic' in data:
-            update_fields.append('topic = %s')
-            values.append(data['topic'])
-        if 'summary' in data:
-            update_fields.append('summary = %s')
-            values.append(data['summary'])
-        if 'notes' in data:
-            update_fields.append('notes = %s')
-            values.append(data['notes'])
+        own = None
+        if user_id:
+            cursor.execute(
+                '''SELECT m.score, m.problems,
+                          (SELECT COUNT(*) FROM topic_mastery o
+                           WHERE o.topic = m.topic AND o.score > m.score) + 1 AS user_rank
+                   FROM topic_mastery m
+                   WHERE m.user_id = %s AND m.topic = %s''',
+                (user_id, topic)
+            )
+            own = cursor.fetchone()
 
-        if not update_fields:
-            return jsonify({'error': 'No fields to update'}), 400
+        cursor.close()
+        conn.close()
+
+        decay = mastery_decay()
+        for row in rankings + ([own] if own else []):
+            row['score'] = round(row['score'] * decay, 2)
+
+        return jsonify({'topic': topic, 'rankings': rankings, 'you': own}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        values.append(problem_id)
-        query = f"UPDATE problems SET {', '.join(update_fields)} WHERE id = %s"
 
-        cursor.execute(query, tuple(values))
+@app.cli.command('compute-mastery')
+@click.option('--user-id', type=int, default=None, help='Only recompute this user.')
+@click.option('--batch-users', default=MASTERY_BATCH_USERS, show_default=True,
+              help='Users loaded and scored per transaction.')
+def compute_mastery_command(user_id, batch_users):
+    """Recompute topic_mastery from the problems table (backfill, or after changing weights)."""
+    start = time.perf_counter()
+    if user_id:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        stored = refresh_topic_mastery(cursor, user_id)
         conn.commit()
-
         cursor.close()
         conn.close()
+        click.echo(f'{stored} topics scored for user {user_id}')
+        return
 
-        return jsonify({'message': 'Problem updated successfully'}), 200
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    problems = stored = 0
+    for low, high, read, written in recompute_topic_mastery(batch_users):
+        problems += read
+        stored += written
+        click.echo(f'users {low}-{high}: {read} problems, {written} topic scores')
+    click.echo(f'{stored} user/topic scores from {problems} problems in {time.perf_counter() - start:.1f}s')
 
+# ================== RESUME UPLOAD & LIST ==================
 
-@app.route('/api/problems/<int:problem_id>', methods=['DELETE'])
-def delete_problem(problem_id):
+@app.route('/api/upload-resume', methods=['POST'])
+def upload_resume():
     try:
+        file = request.files.get('file')
+        if file is None:
+            return jsonify({'error': 'No file provided'}), 400
+
+        user_id = resolve_user_id(request.form.get('user_id'))
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
+
+        upload_error = pdf_upload_error(file)
+        if upload_error:
+            return jsonify({'error': upload_error}), 400
+
+        upload = read_upload(file.stream, RESUME_MAX_BYTES)
+        upload_error = pdf_content_error(upload)
+        if upload_error:
+            return jsonify({'error': upload_error}), 400
+        data, content_hash = upload
+
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute('DELETE FROM problems WHERE id = %s', (problem_id,))
-        conn.commit()
+        # Identical bytes already uploaded by this user: share the S3 object instead of writing it again
+        s3_key = acquire_resume_object(cursor, user_id, content_hash)
+        deduplicated = s3_key is not None
+        new_key = None
+        if not deduplicated:
+            # Upload outside any transaction so no row lock is held across the S3 round trip
+            conn.rollback()
+            new_key = new_resume_key(user_id, file.filename)
+            s3_client.upload_fileobj(
+                io.BytesIO(data),
+                S3_BUCKET,
+                new_key,
+                ExtraArgs={'ContentType': 'application/pdf'}
+            )
+
+        committed = False
+        try:
+            if new_key:
+                s3_key = register_resume_object(cursor, user_id, content_hash, new_key, len(data))
+
+            # Generate presigned URL (valid for 1 hour)
+            file_url = s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': S3_BUCKET, 'Key': s3_key},
+                ExpiresIn=3600
+            )
+
+            # Save to database
+            cursor.execute(INSERT_RESUME_SQL, (user_id, file.filename, s3_key, file_url, content_hash))
+            conn.commit()
+            committed = True
+            resume_id = cursor.lastrowid
+        finally:
+            # A concurrent identical upload won the race, or nothing ended up referencing the object
+            if new_key and (not committed or s3_key != new_key):
+                s3_client.delete_objects(Bucket=S3_BUCKET, Delete={'Objects': [{'Key': new_key}]})
 
         cursor.close()
         conn.close()
 
-        return jsonify({'message': 'Problem deleted successfully'}), 200
+        resume_text_executor.submit(store_resume_text, resume_id, data, content_hash)
 
+        return jsonify({
+            'message': 'Resume uploaded successfully',
+            'resume_id': resume_id,
+            'file_url': file_url,
+            'text_status': 'pending',
+            'deduplicated': deduplicated
+        }), 201
+
+    except ClientError as e:
+        return jsonify({'error': f'AWS S3 error: {str(e)}'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# ================== ANALYTICS ==================
 
-@app.route('/api/analytics/difficulty', methods=['GET'])
-def analytics_by_difficulty():
+@app.route('/api/resumes', methods=['GET'])
+def get_resumes():
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(request.args.get('user_id'))
         if not user_id:
             return jsonify({'error': 'user_id required'}), 400
 
         conn = get_db_connection()
         cursor = conn.cursor()
 
+        # extracted_text stays server-side; it can be megabytes per row
         cursor.execute(
-            '''SELECT difficulty, COUNT(*) as count
-               FROM problems
-               WHERE user_id = %s
-               GROUP BY difficulty''',
+            '''SELECT id, user_id, filename, s3_key, file_url, uploaded_at,
+                      page_count, content_hash, text_status
+               FROM resumes WHERE user_id = %s ORDER BY uploaded_at DESC''',
             (user_id,)
         )
-        results = cursor.fetchall()
+        resumes = cursor.fetchall()
+
+        # Generate fresh presigned URLs
+        for resume in resumes:
+            resume['file_url'] = s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': S3_BUCKET, 'Key': resume['s3_key']},
+                ExpiresIn=3600
+            )
 
         cursor.close()
         conn.close()
 
-        return jsonify(results), 200
+        return jsonify(resumes), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-
-@app.route('/api/analytics/topic', methods=['GET'])
-def analytics_by_topic():
+@app.route('/api/resumes/<int:resume_id>', methods=['DELETE'])
+def delete_resume(resume_id):
+    """Delete a resume; its S3 object is removed by cleanup-resume-objects once unreferenced."""
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(claimed_user_id())
         if not user_id:
             return jsonify({'error': 'user_id required'}), 400
 
@@ -372,28 +3230,201 @@ def analytics_by_topic():
         cursor = conn.cursor()
 
         cursor.execute(
-            '''SELECT topic, COUNT(*) as count
-               FROM problems
-               WHERE user_id = %s
-               GROUP BY topic
-               ORDER BY count DESC''',
-            (user_id,)
+            'SELECT s3_key FROM resumes WHERE id = %s AND user_id = %s FOR UPDATE',
+            (resume_id, user_id)
         )
-        results = cursor.fetchall()
+        resume = cursor.fetchone()
+        if not resume:
+            cursor.close()
+            conn.close()
+            return jsonify({'error': 'Resume not found'}), 404
+
+        cursor.execute('DELETE FROM resumes WHERE id = %s', (resume_id,))
+        cursor.execute(RESUME_OBJECT_RELEASE_SQL, (resume['s3_key'],))
+        conn.commit()
 
         cursor.close()
         conn.close()
 
-        return jsonify(results), 200
+        return jsonify({'message': 'Resume deleted successfully'}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/analytics/points', methods=['GET'])
-def analytics_points_over_time():
+@app.cli.command('cleanup-resume-objects')
+@click.option('--grace-hours', default=RESUME_ORPHAN_GRACE_HOURS, show_default=True,
+              help='Only delete objects unreferenced for at least this long.')
+@click.option('--batch-size', default=1000, show_default=True, help='Keys per S3 DeleteObjects call (max 1000).')
+@click.option('--dry-run', is_flag=True, help='List what would be deleted.')
+def cleanup_resume_objects_command(grace_hours, batch_size, dry_run):
+    """Delete S3 objects no resume references any more, in batched multi-object deletes."""
+    batch_size = min(batch_size, 1000)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    last_id, deleted, failed = 0, 0, 0
+    while True:
+        # Locked rows block concurrent re-use (acquire_resume_object) until this batch commits
+        cursor.execute(
+            '''SELECT id, s3_key FROM resume_objects
+               WHERE ref_count = 0 AND orphaned_at < NOW() - INTERVAL %s HOUR AND id > %s
+               ORDER BY id LIMIT %s
+               FOR UPDATE SKIP LOCKED''',
+            (grace_hours, last_id, batch_size)
+        )
+        orphans = cursor.fetchall()
+        if not orphans:
+            break
+        last_id = orphans[-1]['id']
+
+        if dry_run:
+            for orphan in orphans:
+                click.echo(orphan['s3_key'])
+            conn.rollback()
+            continue
+
+        response = s3_client.delete_objects(
+            Bucket=S3_BUCKET,
+            Delete={'Objects': [{'Key': orphan['s3_key']} for orphan in orphans], 'Quiet': True}
+        )
+        errors = {error['Key'] for error in response.get('Errors', [])}
+        for error in response.get('Errors', []):
+            print(f"Could not delete {error['Key']}: {error.get('Code')} {error.get('Message')}")
+
+        removed = [orphan['id'] for orphan in orphans if orphan['s3_key'] not in errors]
+        if removed:
+            placeholders = ', '.join(['%s'] * len(removed))
+            cursor.execute(f'DELETE FROM resume_objects WHERE id IN ({placeholders})', removed)
+        conn.commit()
+        deleted += len(removed)
+        failed += len(orphans) - len(removed)
+
+    cursor.close()
+    conn.close()
+    click.echo(f'{deleted} orphaned objects deleted, {failed} failed')
+
+# ================== GEMINI RESUME ANALYSIS ==================
+
+@app.route('/api/analyze-resume', methods=['POST'])
+@rate_limited('analyze_resume')
+def analyze_resume():
+    """Analyze a stored resume by resume_id, or a PDF uploaded with the request."""
+    try:
+        if not GEMINI_API_KEY:
+            return jsonify({'error': 'Gemini API key not configured'}), 500
+
+        body = request.get_json(silent=True) or {}
+        resume_id = request.form.get('resume_id') or body.get('resume_id')
+        mode = request.form.get('mode') or body.get('mode') or 'auto'
+        if mode not in RESUME_ANALYSIS_MODES:
+            return jsonify({'error': f"mode must be one of {', '.join(RESUME_ANALYSIS_MODES)}"}), 400
+
+        user_id = resolve_user_id(claimed_user_id())
+        if resume_id:
+            if not user_id:
+                return jsonify({'error': 'user_id required'}), 400
+
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                '''SELECT s3_key, content_hash, extracted_text, text_status
+                   FROM resumes WHERE id = %s AND user_id = %s''',
+                (resume_id, user_id)
+            )
+            resume = cursor.fetchone()
+            cursor.close()
+            conn.close()
+
+            if not resume:
+                return jsonify({'error': 'Resume not found'}), 404
+
+            pdf_text = resume['extracted_text']
+            if resume['text_status'] == 'pending':
+                # Background extraction hasn't finished (or was lost in a restart): do it now
+                data = s3_client.get_object(Bucket=S3_BUCKET, Key=resume['s3_key'])['Body'].read()
+                pdf_text = store_resume_text(resume_id, data,
+                                             resume['content_hash'] or hashlib.sha256(data).hexdigest())
+        else:
+            file = request.files.get('file')
+            upload_error = pdf_upload_error(file)
+            if upload_error:
+                return jsonify({'error': upload_error}), 400
+            upload = read_upload(file.stream, RESUME_MAX_BYTES)
+            upload_error = pdf_content_error(upload)
+            if upload_error:
+                return jsonify({'error': upload_error}), 400
+
+            # Extract text from PDF
+            pdf_text = extract_text_from_pdf(io.BytesIO(upload[0]))
+
+        if not pdf_text:
+            return jsonify({'error': 'Could not extract text from PDF'}), 400
+
+        sections = split_resume_sections(pdf_text)
+        previous = None
+        if user_id:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(LATEST_RESUME_ANALYSIS_SQL, (user_id,))
+            previous = cursor.fetchone()
+            cursor.close()
+            conn.close()
+
+        mode, to_review, reused = plan_resume_analysis(sections, previous, mode)
+        if mode == 'cached':
+            return jsonify({
+                'analysis': previous['analysis'],
+                'candidate_name': previous['candidate_name'],
+                'mode': mode,
+                'reviewed_sections': [],
+                'reused_sections': list(reused),
+                'message': 'Resume unchanged since the last analysis'
+            }), 200
+
+        # Extract candidate name (the previous one still holds if the header didn't change)
+        if mode == 'incremental' and ('Header' in reused or 'Resume' in reused):
+            candidate_name = previous['candidate_name']
+        else:
+            candidate_name = extract_candidate_name(pdf_text)
+
+        # Analyze with Gemini, sending only the sections that need a (re)review
+        previous_overall = previous['overall'] if mode == 'incremental' else None
+        prompt = build_resume_prompt(candidate_name, to_review, list(reused), previous_overall)
+        label = 'analyze_resume' if mode == 'full' else 'analyze_resume_incremental'
+        response = gemini_generate(label, RESUME_SYSTEM_PROMPT, prompt)
+        analysis, overall, stored = merge_resume_analysis(sections, response.text, reused, previous_overall)
+
+        if user_id:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(INSERT_RESUME_ANALYSIS_SQL,
+                           (user_id, resume_id, candidate_name, json.dumps(stored), overall,
+                            analysis, mode, len(prompt)))
+            conn.commit()
+            cursor.close()
+            conn.close()
+
+        return jsonify({
+            'analysis': analysis,
+            'candidate_name': candidate_name,
+            'mode': mode,
+            'reviewed_sections': [name for name, _ in to_review],
+            'reused_sections': list(reused),
+            'message': 'Resume analyzed successfully'
+        }), 200
+
+    except LLMUnavailable as e:
+        return llm_unavailable_response(e)
+    except Exception as e:
+        return jsonify({'error': f'Analysis error: {str(e)}'}), 500
+
+# ================== PROBLEM NOTES ==================
+
+@app.route('/api/notes/<int:problem_id>', methods=['GET'])
+def get_notes(problem_id):
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(request.args.get('user_id'))
         if not user_id:
             return jsonify({'error': 'user_id required'}), 400
 
@@ -401,139 +3432,106 @@ def analytics_points_over_time():
         cursor = conn.cursor()
 
         cursor.execute(
-            '''SELECT DATE(created_at) as date, SUM(points) as total_points
-               FROM problems
-               WHERE user_id = %s
-               GROUP BY DATE(created_at)
-               ORDER BY date ASC''',
-            (user_id,)
+            'SELECT * FROM problem_notes WHERE problem_id = %s AND user_id = %s',
+            (problem_id, user_id)
         )
-        results = cursor.fetchall()
-
-        cumulative = 0
-        cumulative_data = []
-        for row in results:
-            cumulative += row['total_points']
-            cumulative_data.append({
-                'date': row['date'].strftime('%Y-%m-%d'),
-                'points': cumulative
-            })
+        notes = cursor.fetchone()
 
         cursor.close()
         conn.close()
 
-        return jsonify(cumulative_data), 200
+        return jsonify(notes if notes else {}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/analytics/summary', methods=['GET'])
-def analytics_summary():
+NOTE_FIELDS = ('approach', 'solution_code', 'time_complexity', 'space_complexity',
+               'key_insights', 'mistakes_made', 'related_problems')
+NOTES_BULK_MAX = 500
+
+
+@app.route('/api/notes', methods=['GET'])
+def get_notes_bulk():
+    """Notes for many problems in one query: ?user_id=1&problem_ids=3,5,8 -> {problem_id: notes}."""
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(request.args.get('user_id'))
+        raw_ids = request.args.get('problem_ids', '')
         if not user_id:
             return jsonify({'error': 'user_id required'}), 400
 
+        try:
+            problem_ids = list(dict.fromkeys(int(i) for i in raw_ids.split(',') if i.strip()))
+        except ValueError:
+            return jsonify({'error': 'problem_ids must be a comma-separated list of integers'}), 400
+        if not problem_ids:
+            return jsonify({}), 200
+        if len(problem_ids) > NOTES_BULK_MAX:
+            return jsonify({'error': f'At most {NOTES_BULK_MAX} problem_ids per request'}), 400
+
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Total problems
-        cursor.execute(
-            'SELECT COUNT(*) as total FROM problems WHERE user_id = %s',
-            (user_id,)
-        )
-        total = cursor.fetchone()['total']
-
-        # Total points
+        placeholders = ', '.join(['%s'] * len(problem_ids))
         cursor.execute(
-            'SELECT SUM(points) as total_points FROM problems WHERE user_id = %s',
-            (user_id,)
+            f'SELECT * FROM problem_notes WHERE user_id = %s AND problem_id IN ({placeholders})',
+            (user_id, *problem_ids)
         )
-        points_result = cursor.fetchone()
-        total_points = points_result['total_points'] if points_result['total_points'] else 0
+        notes = {row['problem_id']: row for row in cursor.fetchall()}
 
         cursor.close()
         conn.close()
 
-        return jsonify({
-            'total_problems': total,
-            'total_points': total_points
-        }), 200
+        return jsonify(notes), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# ================== RESUME UPLOAD & LIST ==================
 
-@app.route('/api/upload-resume', methods=['POST'])
-def upload_resume():
+@app.route('/api/notes', methods=['POST'])
+def create_or_update_notes():
+    """
+    Create or patch notes in one statement.
+    Only the fields present in the body are changed on existing notes; new notes default the rest to ''.
+    """
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-
-        file = request.files['file']
-        user_id = request.form.get('user_id')
-
-        if not user_id:
-            return jsonify({'error': 'user_id required'}), 400
-
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-
-        if not file.filename.lower().endswith('.pdf'):
-            return jsonify({'error': 'Only PDF files allowed'}), 400
-
-        # Generate unique filename
-        file_extension = file.filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"resumes/{user_id}_{uuid.uuid4()}.{file_extension}"
+        data = request.json
+        problem_id = data.get('problem_id')
+        user_id = resolve_user_id(data.get('user_id'))
 
-        # Upload to S3
-        s3_client.upload_fileobj(
-            file,
-            S3_BUCKET,
-            unique_filename,
-            ExtraArgs={'ContentType': 'application/pdf'}
-        )
+        if not all([problem_id, user_id]):
+            return jsonify({'error': 'problem_id and user_id required'}), 400
 
-        # Generate presigned URL (valid for 1 hour)
-        file_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': S3_BUCKET, 'Key': unique_filename},
-            ExpiresIn=3600
-        )
+        provided = [field for field in NOTE_FIELDS if field in data]
+        assignments = [f'{field} = VALUES({field})' for field in provided]
 
-        # Save to database
         conn = get_db_connection()
         cursor = conn.cursor()
 
+        # Relies on UNIQUE (problem_id, user_id): concurrent saves can't create duplicates
         cursor.execute(
-            '''INSERT INTO resumes (user_id, filename, s3_key, file_url)
-               VALUES (%s, %s, %s, %s)''',
-            (user_id, file.filename, unique_filename, file_url)
+            f'''INSERT INTO problem_notes (problem_id, user_id, {', '.join(NOTE_FIELDS)})
+                VALUES (%s, %s, {', '.join(['%s'] * len(NOTE_FIELDS))})
+                ON DUPLICATE KEY UPDATE {', '.join(assignments + ['updated_at = CURRENT_TIMESTAMP'])}''',
+            (problem_id, user_id, *(data.get(field) or '' for field in NOTE_FIELDS))
         )
-        conn.commit()
-        resume_id = cursor.lastrowid
+        # MySQL reports 1 affected row for an insert, 2 for an update of an existing row
+        message = 'Notes created successfully' if cursor.rowcount == 1 else 'Notes updated successfully'
 
+        conn.commit()
         cursor.close()
         conn.close()
 
-        return jsonify({
-            'message': 'Resume uploaded successfully',
-            'resume_id': resume_id,
-            'file_url': file_url
-        }), 201
+        return jsonify({'message': message}), 200
 
-    except ClientError as e:
-        return jsonify({'error': f'AWS S3 error: {str(e)}'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/resumes', methods=['GET'])
-def get_resumes():
+@app.route('/api/notes/<int:problem_id>', methods=['DELETE'])
+def delete_notes(problem_id):
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(request.args.get('user_id'))
         if not user_id:
             return jsonify({'error': 'user_id required'}), 400
 
@@ -541,204 +3539,422 @@ def get_resumes():
         cursor = conn.cursor()
 
         cursor.execute(
-            'SELECT * FROM resumes WHERE user_id = %s ORDER BY uploaded_at DESC',
-            (user_id,)
+            'DELETE FROM problem_notes WHERE problem_id = %s AND user_id = %s',
+            (problem_id, user_id)
         )
-        resumes = cursor.fetchall()
-
-        # Generate fresh presigned URLs
-        for resume in resumes:
-            resume['file_url'] = s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': S3_BUCKET, 'Key': resume['s3_key']},
-                ExpiresIn=3600
-            )
+        conn.commit()
 
         cursor.close()
         conn.close()
 
-        return jsonify(resumes), 200
+        return jsonify({'message': 'Notes deleted successfully'}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# ================== GEMINI RESUME ANALYSIS ==================
-
-@app.route('/api/analyze-resume', methods=['POST'])
-def analyze_resume():
-    try:
-        if not GEMINI_API_KEY:
-            return jsonify({'error': 'Gemini API key not configured'}), 500
-
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-
-        file = request.files['file']
+# ================== SEARCH ==================
 
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+def fulltext_query(text, max_terms=8):
+    """Turn free text into a boolean-mode query requiring every term, prefix-matched."""
+    # Terms below innodb_ft_min_token_size are never indexed, so requiring them would match nothing
+    terms = [term for term in re.findall(r'\w+', text.lower()) if len(term) >= SEARCH_MIN_TOKEN_SIZE]
+    return ' '.join(f'+{term}*' for term in terms[:max_terms])
 
-        if not file.filename.lower().endswith('.pdf'):
-            return jsonify({'error': 'Only PDF files allowed'}), 400
 
-        # Extract text from PDF
-        pdf_text = extract_text_from_pdf(io.BytesIO(file.read()))
+@app.route('/api/search', methods=['GET'])
+def search_problems():
+    """
+    Search a user's problems and notes.
+    Query params: user_id, q, optional topic/difficulty, page, per_page.
+    Problem name/summary matches rank above note matches; an exact problem number ranks first.
+    """
+    try:
+        user_id = resolve_user_id(request.args.get('user_id'))
+        q = (request.args.get('q') or '').strip()
+        topic = request.args.get('topic')
+        difficulty = request.args.get('difficulty')
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
 
-        if not pdf_text:
-            return jsonify({'error': 'Could not extract text from PDF'}), 400
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
 
-        # Extract candidate name
-        candidate_name = extract_candidate_name(pdf_text)
+        boolean_query = fulltext_query(q)
+        if not boolean_query and not q.isdigit():
+            return jsonify({'error': f'q needs a problem number or a word of at least {SEARCH_MIN_TOKEN_SIZE} letters'}), 400
 
-        # Analyze with Gemini
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
+        filters, filter_args = '', []
+        if topic:
+            filters += ' AND p.topic = %s'
+            filter_args.append(topic)
+        if difficulty:
+            filters += ' AND p.difficulty = %s'
+            filter_args.append(difficulty)
 
-        prompt = f"""You are an expert career advisor. Review this resume for {candidate_name} carefully.
+        conn = get_db_connection(readonly=True)
+        cursor = conn.cursor()
 
-Tasks:
-1. Give a short summary (2–3 lines) of their professional profile.
-2. Identify 3–5 strengths and 3–5 areas to improve.
-3. Suggest keyword optimizations for ATS systems.
-4. Recommend action verbs and restructuring tips to make it stronger.
+        # Each branch is driven by its own index; fetch one extra row to know if there is a next page
+        cursor.execute(
+            f'''SELECT p.id, p.number, p.name, p.difficulty, p.topic, p.points, p.created_at,
+                      SUM(hits.problem_score) AS problem_score,
+                      SUM(hits.notes_score) AS notes_score,
+                      MAX(hits.number_match) AS number_match
+               FROM (
+                   SELECT id AS problem_id,
+                          MATCH(name, summary, notes) AGAINST (%s IN BOOLEAN MODE) AS problem_score,
+                          0 AS notes_score, 0 AS number_match
+                   FROM problems
+                   WHERE user_id = %s AND MATCH(name, summary, notes) AGAINST (%s IN BOOLEAN MODE)
+                   UNION ALL
+                   SELECT problem_id, 0,
+                          MATCH(approach, solution_code, key_insights, mistakes_made) AGAINST (%s IN BOOLEAN MODE),
+                          0
+                   FROM problem_notes
+                   WHERE user_id = %s
+                     AND MATCH(approach, solution_code, key_insights, mistakes_made) AGAINST (%s IN BOOLEAN MODE)
+                   UNION ALL
+                   SELECT id, 0, 0, 1 FROM problems WHERE user_id = %s AND number = %s
+               ) hits
+               JOIN problems p ON p.id = hits.problem_id AND p.user_id = %s
+               WHERE 1 = 1{filters}
+               GROUP BY p.id
+               ORDER BY number_match DESC, problem_score * 2 + notes_score DESC, p.created_at DESC
+               LIMIT %s OFFSET %s''',
+            (boolean_query, user_id, boolean_query,
+             boolean_query, user_id, boolean_query,
+             user_id, q, user_id,
+             *filter_args, per_page + 1, (page - 1) * per_page)
+        )
+        rows = cursor.fetchall()
 
-Resume Text:
-{pdf_text[:15000]}
-"""
+        cursor.close()
+        conn.close()
 
-        response = model.generate_content(prompt)
-        analysis = response.text
+        results = [
+            dict(
+                {key: row[key] for key in ('id', 'number', 'name', 'difficulty', 'topic', 'points', 'created_at')},
+                score=round(float(row['problem_score']) * 2 + float(row['notes_score']), 4),
+                matched_in=[field for field, hit in (('number', row['number_match']),
+                                                     ('problem', row['problem_score']),
+                                                     ('notes', row['notes_score'])) if hit]
+            )
+            for row in rows[:per_page]
+        ]
 
         return jsonify({
-            'analysis': analysis,
-            'candidate_name': candidate_name,
-            'message': 'Resume analyzed successfully'
+            'results': results,
+            'page': page,
+            'per_page': per_page,
+            'has_more': len(rows) > per_page
         }), 200
 
     except Exception as e:
-        return jsonify({'error': f'Analysis error: {str(e)}'}), 500
+        return jsonify({'error': str(e)}), 500
 
-# ================== PROBLEM NOTES ==================
+# ================== SPACED REPETITION ==================
 
-@app.route('/api/notes/<int:problem_id>', methods=['GET'])
-def get_notes(problem_id):
+def sm2_schedule(ease_factor, interval_days, repetitions, grade):
+    """
+    SM-2 update for a recall grade 0-5.
+    Returns (ease_factor, interval_days, repetitions); grades below 3 restart the sequence.
+    """
+    ease_factor = float(ease_factor)
+    if grade < 3:
+        repetitions = 0
+        interval_days = 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval_days = 1
+        elif repetitions == 2:
+            interval_days = 6
+        else:
+            interval_days = int(round(interval_days * ease_factor))
+    ease_factor += 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)
+    return max(1.3, round(ease_factor, 2)), interval_days, repetitions
+
+
+def schedule_first_review(cursor, problem_id, user_id):
+    cursor.execute(
+        '''INSERT IGNORE INTO problem_reviews (problem_id, user_id, next_review_at)
+           VALUES (%s, %s, NOW() + INTERVAL %s DAY)''',
+        (problem_id, user_id, REVIEW_FIRST_INTERVAL_DAYS)
+    )
+
+
+@app.route('/api/review/due', methods=['GET'])
+def get_due_reviews():
+    """Next due problems, oldest first; served from the (user_id, next_review_at) index."""
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(request.args.get('user_id'))
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+
         if not user_id:
             return jsonify({'error': 'user_id required'}), 400
 
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cursor = conn.cursor()
 
         cursor.execute(
-            'SELECT * FROM problem_notes WHERE problem_id = %s AND user_id = %s',
-            (problem_id, user_id)
+            '''SELECT r.problem_id, r.ease_factor, r.interval_days, r.repetitions,
+                      r.last_grade, r.last_reviewed_at, r.next_review_at,
+                      p.number, p.name, p.difficulty, p.topic
+               FROM problem_reviews r
+               JOIN problems p ON p.id = r.problem_id
+               WHERE r.user_id = %s AND r.next_review_at <= NOW()
+               ORDER BY r.next_review_at
+               LIMIT %s''',
+            (user_id, limit)
         )
-        notes = cursor.fetchone()
+        due = cursor.fetchall()
 
         cursor.close()
         conn.close()
 
-        return jsonify(notes if notes else {}), 200
+        for item in due:
+            item['ease_factor'] = float(item['ease_factor'])
+
+        return jsonify({'due': due, 'count': len(due)}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/notes', methods=['POST'])
-def create_or_update_notes():
+@app.route('/api/review/grade', methods=['POST'])
+def grade_reviews():
+    """
+    Grade several reviews at once.
+    Body: {"user_id": 1, "grades": [{"problem_id": 10, "grade": 4}, ...]} with grades 0-5.
+    """
     try:
-        data = request.json
-        problem_id = data.get('problem_id')
-        user_id = data.get('user_id')
-        approach = data.get('approach', '')
-        solution_code = data.get('solution_code', '')
-        time_complexity = data.get('time_complexity', '')
-        space_complexity = data.get('space_complexity', '')
-        key_insights = data.get('key_insights', '')
-        mistakes_made = data.get('mistakes_made', '')
-        related_problems = data.get('related_problems', '')
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Body must be a JSON object'}), 400
+        user_id = resolve_user_id(data.get('user_id'))
+        grades = data.get('grades') or []
 
-        if not all([problem_id, user_id]):
-            return jsonify({'error': 'problem_id and user_id required'}), 400
+        if not user_id:
+            return jsonify({'error': 'user_id required'}), 400
+        if not isinstance(grades, list) or not grades or len(grades) > REVIEW_MAX_BATCH:
+            return jsonify({'error': f'grades must be a list of 1-{REVIEW_MAX_BATCH} items'}), 400
+
+        graded = {}
+        for item in grades:
+            problem_id, grade = (item.get('problem_id'), item.get('grade')) if isinstance(item, dict) else (None, None)
+            if not is_json_int(problem_id) or not is_json_int(grade) or not 0 <= grade <= 5:
+                return jsonify({'error': 'Each grade needs an integer problem_id and a grade from 0 to 5'}), 400
+            graded[problem_id] = grade
 
         conn = get_db_connection()
         cursor = conn.cursor()
 
+        placeholders = ', '.join(['%s'] * len(graded))
         cursor.execute(
-            'SELECT id FROM problem_notes WHERE problem_id = %s AND user_id = %s',
-            (problem_id, user_id)
+            f'''SELECT problem_id, ease_factor, interval_days, repetitions
+                FROM problem_reviews
+                WHERE user_id = %s AND problem_id IN ({placeholders})
+                FOR UPDATE''',
+            (user_id, *graded)
         )
-        existing = cursor.fetchone()
+        current = cursor.fetchall()
+
+        updates, results = [], []
+        for review in current:
+            grade = graded[review['problem_id']]
+            ease_factor, interval_days, repetitions = sm2_schedule(
+                review['ease_factor'], review['interval_days'], review['repetitions'], grade)
+            updates.append((ease_factor, interval_days, repetitions, grade, interval_days,
+                            review['problem_id'], user_id))
+            results.append({
+                'problem_id': review['problem_id'],
+                'ease_factor': ease_factor,
+                'interval_days': interval_days,
+                'repetitions': repetitions
+            })
 
-        if existing:
-            # Update notes
-            cursor.execute(
-                '''UPDATE problem_notes SET 
-                   approach = %s, solution_code = %s, time_complexity = %s, 
-                   space_complexity = %s, key_insights = %s, mistakes_made = %s, 
-                   related_problems = %s, updated_at = CURRENT_TIMESTAMP
+        if updates:
+            cursor.executemany(
+                '''UPDATE problem_reviews
+                   SET ease_factor = %s, interval_days = %s, repetitions = %s, last_grade = %s,
+                       last_reviewed_at = NOW(), next_review_at = NOW() + INTERVAL %s DAY
                    WHERE problem_id = %s AND user_id = %s''',
-                (approach, solution_code, time_complexity,
-                 space_complexity, key_insights, mistakes_made,
-                 related_problems, problem_id, user_id)
-            )
-            message = 'Notes updated successfully'
-        else:
-            # Create new notes
-            cursor.execute(
-                '''INSERT INTO problem_notes 
-                   (problem_id, user_id, approach, solution_code, time_complexity, 
-                    space_complexity, key_insights, mistakes_made, related_problems)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)''',
-                (problem_id, user_id, approach, solution_code, time_complexity,
-                 space_complexity, key_insights, mistakes_made, related_problems)
+                updates
             )
-            message = 'Notes created successfully'
-
         conn.commit()
+
         cursor.close()
         conn.close()
 
-        return jsonify({'message': message}), 200
+        found = {review['problem_id'] for review in current}
+        return jsonify({
+            'updated': results,
+            'not_found': [problem_id for problem_id in graded if problem_id not in found]
+        }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/notes/<int:problem_id>', methods=['DELETE'])
-def delete_notes(problem_id):
-    try:
-        user_id = request.args.get('user_id')
-        if not user_id:
-            return jsonify({'error': 'user_id required'}), 400
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
+@app.cli.command('backfill-reviews')
+@click.option('--chunk-size', default=10000, show_default=True, help='Problem ids per INSERT.')
+def backfill_reviews_command(chunk_size):
+    """Create review rows for problems logged before spaced repetition existed."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT COALESCE(MIN(id), 0) AS low, COALESCE(MAX(id), 0) AS high FROM problems')
+    bounds = cursor.fetchone()
 
+    created = 0
+    for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+        # Due one interval after the problem was logged, so old problems surface first
         cursor.execute(
-            'DELETE FROM problem_notes WHERE problem_id = %s AND user_id = %s',
-            (problem_id, user_id)
+            '''INSERT IGNORE INTO problem_reviews (problem_id, user_id, next_review_at)
+               SELECT id, user_id, created_at + INTERVAL %s DAY
+               FROM problems WHERE id >= %s AND id < %s''',
+            (REVIEW_FIRST_INTERVAL_DAYS, start, start + chunk_size)
         )
         conn.commit()
+        created += cursor.rowcount
 
-        cursor.close()
-        conn.close()
+    cursor.close()
+    conn.close()
+    click.echo(f'{created} review rows created')
 
-        return jsonify({'message': 'Notes deleted successfully'}), 200
+# ================== AI PROBLEM RECOMMENDATIONS ==================
 
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+SOLVED_PROBLEMS_SQL = '''
+    SELECT number, name, difficulty, topic FROM problems
+    WHERE user_id = %s ORDER BY created_at DESC, id DESC
+'''
+STORED_RECOMMENDATIONS_SQL = '''
+    SELECT recommendations, generated_at,
+           (stale OR generated_at < NOW() - INTERVAL %s HOUR) AS expired
+    FROM problem_recommendations
+    WHERE user_id = %s AND topic = %s
+'''
+STORE_RECOMMENDATIONS_SQL = '''
+    INSERT INTO problem_recommendations (user_id, topic, recommendations, stale, generated_at)
+    VALUES (%s, %s, %s, FALSE, NOW())
+    ON DUPLICATE KEY UPDATE recommendations = VALUES(recommendations),
+                            stale = FALSE, generated_at = NOW()
+'''
+
+
+def recommendation_topic(topic):
+    """Store key for a requested topic; '' is the general set."""
+    if not topic or topic.strip().lower() == 'none':
+        return ''
+    return topic.strip()[:100]
+
+
+def generate_recommendations(solved_problems, topic, label='suggest_problems', weak_topics=()):
+    """Return (recommendations or None, raw text) for a user's solved history."""
+    history, request_prompt = build_recommendation_prompt(solved_problems, topic or None, weak_topics)
+    response = gemini_generate(label, RECOMMENDER_SYSTEM_PROMPT, request_prompt, prefix=history)
+    recommendations, text = parse_recommendations(response.text)
+    if isinstance(recommendations, list):
+        recommendations = filter_solved_recommendations(recommendations, solved_exclusion_set(solved_problems))
+    return recommendations, text
+
+
+def mark_recommendations_stale(cursor, user_id):
+    cursor.execute('UPDATE problem_recommendations SET stale = TRUE WHERE user_id = %s', (user_id,))
+
+
+class RecommendationPrecomputer:
+    """Debounced per-user refresh of stored recommendations on a background thread."""
+
+    def __init__(self, delay, workers):
+        self.delay = delay
+        self.workers = workers
+        self.cond = threading.Condition()
+        self.due = {}
+        self.topics = {}
+        self.thread = None
+        self.executor = None
+
+    def schedule(self, user_id, topic=None):
+        with self.cond:
+            # Threads are started lazily so they exist in each forked Gunicorn worker
+            if self.thread is None or not self.thread.is_alive():
+                self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                   thread_name_prefix='recommendations')
+                self.thread = threading.Thread(target=self._run, daemon=True,
+                                               name='recommendation-scheduler')
+                self.thread.start()
+            self.due[user_id] = time.monotonic() + self.delay
+            self.topics.setdefault(user_id, set()).add(recommendation_topic(topic))
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                now = time.monotonic()
+                ready = [user_id for user_id, due in self.due.items() if due <= now]
+                for user_id in ready:
+                    del self.due[user_id]
+                    self.executor.submit(self.refresh, user_id, self.topics.pop(user_id))
+                timeout = min(self.due.values()) - now if self.due else None
+                self.cond.wait(timeout=timeout)
+
+    def refresh(self, user_id, touched_topics):
+        """Regenerate the general set, previously requested topics and the touched ones."""
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(SOLVED_PROBLEMS_SQL, (user_id,))
+            solved_problems = cursor.fetchall()
+            cursor.execute(
+                'SELECT topic FROM problem_recommendations WHERE user_id = %s ORDER BY generated_at DESC',
+                (user_id,)
+            )
+            stored_topics = [row['topic'] for row in cursor.fetchall()]
+            weak_topics = weakest_topics(cursor, user_id)
+            cursor.close()
+            conn.close()
+
+            topics = [t for t in dict.fromkeys(stored_topics + sorted(touched_topics)) if t]
+            results = []
+            for topic in [''] + topics[:RECOMMENDATION_MAX_TOPICS]:
+                recommendations, _ = generate_recommendations(solved_problems, topic,
+                                                              label='precompute_recommendations',
+                                                              weak_topics=[] if topic else weak_topics)
+                if recommendations is not None:
+                    results.append((user_id, topic, json.dumps(recommendations)))
+
+            if results:
+                conn = get_db_connection()
+                cursor = conn.cursor()
+                cursor.executemany(STORE_RECOMMENDATIONS_SQL, results)
+                conn.commit()
+                cursor.close()
+                conn.close()
+
+        except LLMUnavailable as e:
+            print(f"Recommendation precompute for user {user_id} skipped: {e}")
+        except Exception as e:
+            print(f"Recommendation precompute for user {user_id} failed: {e}")
+
+
+recommendation_precomputer = RecommendationPrecomputer(RECOMMENDATION_DEBOUNCE_SECONDS,
+                                                       RECOMMENDATION_WORKERS)
+
+
+def schedule_recommendations(user_id, topic=None):
+    if RECOMMENDATION_PRECOMPUTE and GEMINI_API_KEY:
+        recommendation_precomputer.schedule(user_id, topic)
 
-# ================== AI PROBLEM RECOMMENDATIONS ==================
 
 @app.route('/api/suggest-problems', methods=['POST'])
+@rate_limited('suggest_problems')
 def suggest_problems():
     try:
         if not GEMINI_API_KEY:
             return jsonify({'error': 'Gemini API key not configured'}), 500
 
         data = request.json
-        user_id = data.get('user_id')
+        user_id = resolve_user_id(data.get('user_id'))
         topic = data.get('topic')  # Can be None or a specific topic
 
         if not user_id:
@@ -747,93 +3963,162 @@ def suggest_problems():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute(
-            'SELECT number, name, difficulty, topic FROM problems WHERE user_id = %s',
-            (user_id,)
-        )
+        # Serve the precomputed set unless a new problem made it stale
+        cursor.execute(STORED_RECOMMENDATIONS_SQL,
+                       (RECOMMENDATION_MAX_AGE_HOURS, user_id, recommendation_topic(topic)))
+        stored = cursor.fetchone()
+        if stored and not stored['expired']:
+            cursor.close()
+            conn.close()
+            return jsonify({
+                'recommendations': json.loads(stored['recommendations']),
+                'topic': topic,
+                'generated_at': stored['generated_at'],
+                'message': 'Recommendations generated successfully'
+            }), 200
+
+        cursor.execute(SOLVED_PROBLEMS_SQL, (user_id,))
         solved_problems = cursor.fetchall()
+        weak_topics = [] if recommendation_topic(topic) else weakest_topics(cursor, user_id)
 
         cursor.close()
         conn.close()
 
-        solved_list = [
-            f"{p['number']} - {p['name']} ({p['difficulty']}, {p['topic']})"
-            for p in solved_problems
-        ]
-        solved_problem_list = "\n".join(solved_list) if solved_list else "No problems solved yet."
-
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-
-        if topic and topic.lower() != 'none':
-            prompt = f"""You are an expert DSA tutor helping users improve coding problem coverage.
-
-The user has already solved the following problems (from their practice tracker):
-{solved_problem_list}
-
-They want new recommendations specifically for the topic: {topic}
-
-Recommend 5 unsolved LeetCode-style problems from the {topic} topic, balanced across easy, medium, and hard difficulties. Ensure these problems are NOT in the solved list above.
-
-Format your response STRICTLY as a JSON array (no markdown, no extra text):
-[
-  {{"problem_name": "Two Sum", "topic": "Arrays", "difficulty": "Easy", "reason": "Classic problem for hash maps"}},
-  {{"problem_name": "...", "topic": "...", "difficulty": "...", "reason": "..."}}
-]
-"""
-        else:
-            prompt = f"""You are an expert DSA tutor helping users improve coding problem coverage.
-
-The user has already solved the following problems (from their practice tracker):
-{solved_problem_list}
-
-They want general recommendations (no specific topic).
-
-Recommend 5 problems total:
-- 3 problems that are similar to the solved ones (based on topic/difficulty patterns, but slightly harder or related)
-- 2 problems that are new topics but relevant to their learning curve
+        recommendations, recommendations_text = generate_recommendations(solved_problems, topic,
+                                                                         weak_topics=weak_topics)
 
-Ensure these problems are NOT in the solved list above.
-
-Format your response STRICTLY as a JSON array (no markdown, no extra text):
-[
-  {{"problem_name": "Two Sum", "topic": "Arrays", "difficulty": "Easy", "reason": "Classic problem for hash maps"}},
-  {{"problem_name": "...", "topic": "...", "difficulty": "...", "reason": "..."}}
-]
-"""
-
-        response = model.generate_content(prompt)
-        recommendations_text = response.text.strip()
-
-        # Strip markdown fences if present
-        if recommendations_text.startswith('```'):
-            parts = recommendations_text.split('```')
-            if len(parts) > 1:
-                recommendations_text = parts[1]
-            if recommendations_text.strip().startswith('json'):
-                recommendations_text = recommendations_text[4:]
-            recommendations_text = recommendations_text.strip()
-
-        try:
-            recommendations = json.loads(recommendations_text)
-        except json.JSONDecodeError:
+        if recommendations is None:
             return jsonify({
                 'recommendations': [],
                 'raw_text': recommendations_text,
                 'message': 'Could not parse recommendations as JSON'
             }), 200
 
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(STORE_RECOMMENDATIONS_SQL,
+                       (user_id, recommendation_topic(topic), json.dumps(recommendations)))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
         return jsonify({
             'recommendations': recommendations,
             'topic': topic,
             'message': 'Recommendations generated successfully'
         }), 200
 
+    except LLMUnavailable as e:
+        return llm_unavailable_response(e)
     except Exception as e:
         return jsonify({'error': f'Recommendation error: {str(e)}'}), 500
 
+
+def refresh_recommendation_batch(batch, exclusions):
+    """Generate one batch and store each user's general set; returns a report dict."""
+    start = time.perf_counter()
+    response = gemini_generate('batch_recommendations', BATCH_RECOMMENDER_SYSTEM_PROMPT,
+                               build_batch_recommendation_prompt(batch))
+    elapsed = time.perf_counter() - start
+    results, _ = parse_recommendations(response.text)
+    if not isinstance(results, dict):
+        results = {}
+
+    rows = [
+        (int(key[1:]), '', json.dumps(filter_solved_recommendations(results[key], exclusions[key])))
+        for key, _ in batch
+        if isinstance(results.get(key), list)
+    ]
+    if rows:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.executemany(STORE_RECOMMENDATIONS_SQL, rows)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    usage = getattr(response, 'usage_metadata', None)
+    input_tokens = getattr(usage, 'prompt_token_count', 0) or 0
+    output_tokens = getattr(usage, 'candidates_token_count', 0) or 0
+    return {
+        'users': len(batch),
+        'stored': len(rows),
+        'input_tokens': input_tokens,
+        'output_tokens': output_tokens,
+        'cost': (input_tokens * GEMINI_PRICE_INPUT_PER_M + output_tokens * GEMINI_PRICE_OUTPUT_PER_M) / 1e6,
+        'seconds': elapsed,
+    }
+
+
+@app.cli.command('refresh-recommendations')
+@click.option('--batch-size', default=RECOMMENDATION_BATCH_SIZE, show_default=True,
+              help='Users packed into one Gemini request.')
+@click.option('--max-chars', default=RECOMMENDATION_BATCH_MAX_CHARS, show_default=True,
+              help='Upper bound on the user summaries in one request.')
+@click.option('--stale-only/--all', default=True, show_default=True,
+              help='Only users whose general recommendations are missing, stale or expired.')
+@click.option('--limit', type=int, default=None, help='Stop after this many users.')
+def refresh_recommendations_command(batch_size, max_chars, stale_only, limit):
+    """Bulk-refresh general recommendations, several users per Gemini call."""
+    if not GEMINI_API_KEY:
+        raise click.ClickException('Gemini API key not configured')
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    if stale_only:
+        cursor.execute(
+            '''SELECT u.id FROM users u
+               LEFT JOIN problem_recommendations r ON r.user_id = u.id AND r.topic = ''
+               WHERE r.user_id IS NULL OR r.stale OR r.generated_at < NOW() - INTERVAL %s HOUR
+               ORDER BY u.id''',
+            (RECOMMENDATION_MAX_AGE_HOURS,)
+        )
+    else:
+        cursor.execute('SELECT id FROM users ORDER BY id')
+    user_ids = [row['id'] for row in cursor.fetchall()][:limit]
+
+    totals = Counter()
+    batches = 0
+    chunk = batch_size * 10
+    for offset in range(0, len(user_ids), chunk):
+        ids = user_ids[offset:offset + chunk]
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(
+            f'''SELECT user_id, number, name, difficulty, topic FROM problems
+                WHERE user_id IN ({placeholders}) ORDER BY created_at DESC, id DESC''',
+            ids
+        )
+        solved = {user_id: [] for user_id in ids}
+        for row in cursor.fetchall():
+            solved[row['user_id']].append(row)
+        summaries = [(f'u{user_id}', summarize_solved(solved[user_id])) for user_id in ids]
+        exclusions = {f'u{user_id}': solved_exclusion_set(solved[user_id]) for user_id in ids}
+
+        for batch in pack_recommendation_batches(summaries, batch_size, max_chars):
+            batches += 1
+            try:
+                report = refresh_recommendation_batch(batch, exclusions)
+            except LLMUnavailable as e:
+                click.echo(f'batch {batches}: {len(batch)} users skipped ({e})')
+                continue
+            totals.update(report)
+            click.echo(
+                f"batch {batches}: {report['users']} users, {report['stored']} stored, "
+                f"{report['input_tokens']} in / {report['output_tokens']} out tokens, "
+                f"~${report['cost']:.4f}, {report['seconds'] * 1000:.0f}ms"
+            )
+
+    cursor.close()
+    conn.close()
+    click.echo(
+        f"{totals['stored']}/{len(user_ids)} users refreshed in {batches} Gemini requests "
+        f"(vs {len(user_ids)} one per user), ~${totals['cost']:.4f}, {totals['seconds']:.1f}s in Gemini"
+    )
+
 # ================== GUIDED PROBLEM SOLVER ==================
 
 @app.route('/api/solve-problem', methods=['POST'])
+@rate_limited('solve_problem')
 def solve_problem():
     """
     Step-by-step guided DSA problem solver.
@@ -852,118 +4137,66 @@ def solve_problem():
         if not problem:
             return jsonify({'error': 'Problem statement missing'}), 400
 
-        base_system_prompt = (
-            "You are an expert DSA mentor. "
-            "You help students solve coding problems step-by-step. "
-            "Your tone is encouraging and structured. "
-            "You always respond in clean Markdown (use bullet points, code blocks where needed). "
-            "IMPORTANT: When giving hints, be progressive. If you've given hints before, make the next one more specific. "
-            "CRITICAL: When you see conversation history, anything marked [YOU (MENTOR) SAID] was YOUR previous response - do not praise the student for it. "
-            "Only praise the student for their own thoughts marked as [STUDENT SAID]."
-        )
-
-        context = ""
-        if conversation_history:
-            context = "\n\nPrevious conversation (for your context - you are the Mentor):\n"
-            context += "=" * 60 + "\n"
-            for msg in conversation_history:
-                role = msg.get('role', '')
-                content = msg.get('content', '')
-                if role == 'user':
-                    context += f"[STUDENT SAID]: {content}\n\n"
-                elif role == 'assistant':
-                    context += f"[YOU (MENTOR) SAID]: {content}\n\n"
-            context += "=" * 60 + "\n"
-            context += "Remember: Everything marked [YOU (MENTOR) SAID] was YOUR previous response, not the student's work.\n"
-
-        if stage == 'explain':
-            user_prompt = (
-                f"Explain the following problem in simple, beginner-friendly language:\n\n{problem}"
-            )
-        elif stage == 'hint':
-            hint_count = sum(
-                1 for msg in conversation_history
-                if msg.get('role') == 'user' and 'hint' in msg.get('content', '').lower()
-            )
-
-            if hint_count == 0:
-                hint_instruction = (
-                    "Give the FIRST hint - be vague and high-level. "
-                    "Just point towards the general approach or data structure without specifics."
-                )
-            elif hint_count == 1:
-                hint_instruction = (
-                    "Give the SECOND hint - be more specific. "
-                    "Mention the exact approach or algorithm, but don't reveal implementation details."
-                )
-            elif hint_count == 2:
-                hint_instruction = (
-                    "Give the THIRD hint - be very direct. "
-                    "Provide key implementation details, edge cases, or the main logic flow."
-                )
-            else:
-                hint_instruction = (
-                    "Give a FINAL hint - at this point, provide almost the complete approach "
-                    "with pseudocode if needed."
-                )
-
-            user_prompt = (
-                f"{hint_instruction}\n\n"
-                f"Problem:\n{problem}\n"
-                f"{context}"
-            )
-        elif stage == 'feedback':
-            user_prompt = (
-                "You are evaluating a student's partial idea. "
-                "Give constructive feedback — tell what's good and what can improve. "
-                "Do not give the full solution yet.\n\n"
-                f"Student's thought:\n{user_input}\n\n"
-                f"Problem:\n{problem}\n"
-                f"{context}"
-            )
-        elif stage == 'solution':
-            user_prompt = (
-                "Now provide the full optimal solution with step-by-step explanation, "
-                "time and space complexity, and possible alternative approaches.\n\n"
-                f"Problem:\n{problem}\n"
-                f"{context}"
-            )
-        else:
+        prompts = build_solver_prompt(problem, stage, user_input, conversation_history)
+        if prompts is None:
             return jsonify({'error': 'Invalid stage'}), 400
 
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        response = model.generate_content(f"{base_system_prompt}\n\n{user_prompt}")
+        problem_prefix, stage_prompt = prompts
+        response = gemini_generate('solve_problem', SOLVER_SYSTEM_PROMPT,
+                                   stage_prompt, prefix=problem_prefix)
 
         output = response.text.strip() if response and hasattr(response, 'text') else 'No response.'
 
         return jsonify({'response': output}), 200
 
+    except LLMUnavailable as e:
+        return llm_unavailable_response(e)
     except Exception as e:
         print('Error in /api/solve-problem:', e)
         return jsonify({'error': 'Something went wrong processing your request.'}), 500
 
 # ================== LEADERBOARD ==================
 
+_leaderboard_cache = {}
+
+
+def invalidate_leaderboard():
+    _leaderboard_cache.clear()
+    # A replica may not have the change behind this yet, so refills read the primary for a while
+    _leaderboard_cache['primary_until'] = time.monotonic() + DB_READ_YOUR_WRITES_SECONDS
+
+
+def load_leaderboard():
+    """Query the top 10 and cache it for LEADERBOARD_CACHE_SECONDS."""
+    conn = get_db_connection(readonly=time.monotonic() >= _leaderboard_cache.get('primary_until', 0))
+    cursor = conn.cursor()
+
+    cursor.execute(
+        '''SELECT u.name, u.email, SUM(p.points) as total_points, COUNT(p.id) as total_problems
+           FROM users u
+           LEFT JOIN problems p ON u.id = p.user_id
+           GROUP BY u.id
+           ORDER BY total_points DESC, total_problems DESC
+           LIMIT 10'''
+    )
+    leaderboard = cursor.fetchall()
+
+    cursor.close()
+    conn.close()
+
+    _leaderboard_cache['top'] = (leaderboard, time.monotonic() + LEADERBOARD_CACHE_SECONDS)
+    return leaderboard
+
+
 @app.route('/api/leaderboard', methods=['GET'])
 def get_leaderboard():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            '''SELECT u.name, u.email, SUM(p.points) as total_points, COUNT(p.id) as total_problems
-               FROM users u
-               LEFT JOIN problems p ON u.id = p.user_id
-               GROUP BY u.id
-               ORDER BY total_points DESC, total_problems DESC
-               LIMIT 10'''
-        )
-        leaderboard = cursor.fetchall()
+        # Cleared by the change-event consumer when points move; the TTL bounds other workers' copies
+        cached = _leaderboard_cache.get('top')
+        if cached and cached[1] > time.monotonic():
+            return jsonify(cached[0]), 200
 
-        cursor.close()
-        conn.close()
-
-        return jsonify(leaderboard), 200
+        return jsonify(load_leaderboard()), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -974,7 +4207,7 @@ def get_leaderboard():
 def create_group():
     try:
         data = request.json or {}
-        user_id = data.get('user_id')
+        user_id = resolve_user_id(data.get('user_id'))
         name = data.get('name')
         description = data.get('description', '')
         max_members = data.get('max_members', 10)
@@ -1053,7 +4286,7 @@ def create_group():
 def join_group():
     try:
         data = request.json or {}
-        user_id = data.get('user_id')
+        user_id = resolve_user_id(data.get('user_id'))
         invite_code = data.get('invite_code')
 
         if not user_id or not invite_code:
@@ -1107,11 +4340,14 @@ def join_group():
             'INSERT INTO group_members (group_id, user_id, role) VALUES (%s, %s, %s)',
             (group['id'], user_id, 'member')
         )
+        record_change(cursor, 'member_joined', user_id, {'role': 'member'}, group_id=group['id'])
         conn.commit()
 
         cursor.close()
         conn.close()
 
+        change_event_consumer.notify()
+
         return jsonify({
             'success': True,
             'group': {
@@ -1130,11 +4366,11 @@ def join_group():
 @app.route('/api/groups/my', methods=['GET'])
 def list_my_groups():
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(request.args.get('user_id'))
         if not user_id:
             return jsonify({'success': False, 'error': 'user_id required'}), 400
 
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cursor = conn.cursor()
 
         if not user_exists(cursor, user_id):
@@ -1166,7 +4402,7 @@ def list_my_groups():
 @app.route('/api/groups/<int:group_id>', methods=['GET'])
 def get_group_details(group_id):
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(request.args.get('user_id'))
         if not user_id:
             return jsonify({'success': False, 'error': 'user_id required'}), 400
 
@@ -1214,11 +4450,11 @@ def get_group_details(group_id):
 @app.route('/api/groups/<int:group_id>/members', methods=['GET'])
 def list_group_members(group_id):
     try:
-        user_id = request.args.get('user_id')
+        user_id = resolve_user_id(request.args.get('user_id'))
         if not user_id:
             return jsonify({'success': False, 'error': 'user_id required'}), 400
 
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cursor = conn.cursor()
 
         cursor.execute(
@@ -1255,7 +4491,7 @@ def list_group_members(group_id):
 def leave_group(group_id):
     try:
         data = request.json or {}
-        user_id = data.get('user_id')
+        user_id = resolve_user_id(data.get('user_id'))
         if not user_id:
             return jsonify({'success': False, 'error': 'user_id required'}), 400
 
@@ -1289,46 +4525,721 @@ def leave_group(group_id):
                 }), 400
 
             cursor.execute('DELETE FROM groups WHERE id = %s', (group_id,))
+            record_change(cursor, 'group_deleted', user_id, {}, group_id=group_id)
             conn.commit()
 
             cursor.close()
             conn.close()
 
+            change_event_consumer.notify()
+
             return jsonify({'success': True, 'message': 'Group deleted'}), 200
 
         cursor.execute(
             'DELETE FROM group_members WHERE group_id = %s AND user_id = %s',
             (group_id, user_id)
         )
+        record_change(cursor, 'member_left', user_id, {}, group_id=group_id)
         conn.commit()
 
         cursor.close()
         conn.close()
 
+        change_event_consumer.notify()
+
         return jsonify({'success': True, 'message': 'Left group successfully'}), 200
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# ================== GROUP EVENTS ==================
+
+GROUP_EVENTS_RESYNC = {'type': 'resync'}
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+class ThreadSubscriber:
+    """One SSE stream served by a worker thread, with a bounded buffer."""
+
+    def __init__(self, group_id, size):
+        self.group_id = group_id
+        self.queue = queue.Queue(maxsize=size)
+
+    def offer(self, event):
+        """Buffer an event without blocking; a full buffer is dropped and replaced by a resync."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(GROUP_EVENTS_RESYNC)
+            return False
+
+
+class GroupEventHub:
+    """Fans group events out to the SSE subscribers in this process.
+
+    Publishers never block: a subscriber that falls a full buffer behind loses
+    its backlog and is told to resync (refetch) instead. The last few events per
+    group are kept so a reconnecting client can catch up from Last-Event-ID.
+    """
+
+    def __init__(self, queue_size, max_subscribers):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.recent = {}
+        self.count = 0
+        self.started_id = 0
+        self.stats = Counter()
+
+    def has_capacity(self):
+        with self.lock:
+            return self.count < self.max_subscribers
+
+    def subscribe(self, subscriber, last_event_id=None):
+        """Register a subscriber; returns the events it missed, or None if it must resync."""
+        with self.lock:
+            self.subscribers.setdefault(subscriber.group_id, set()).add(subscriber)
+            self.count += 1
+            recent = list(self.recent.get(subscriber.group_id, ()))
+        self.stats['subscribed'] += 1
+
+        if last_event_id is None:
+            return []
+        if last_event_id < self.started_id - 1 or \
+                (len(recent) == self.queue_size and recent[0]['id'] > last_event_id):
+            return None
+        return [event for event in recent if event['id'] > last_event_id]
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            group = self.subscribers.get(subscriber.group_id)
+            if group and subscriber in group:
+                group.discard(subscriber)
+                self.count -= 1
+                if not group:
+                    del self.subscribers[subscriber.group_id]
+
+    def deliver(self, event):
+        with self.lock:
+            self.recent.setdefault(event['group_id'], deque(maxlen=self.queue_size)).append(event)
+            subscribers = list(self.subscribers.get(event['group_id'], ()))
+        self.stats['delivered'] += len(subscribers)
+        for subscriber in subscribers:
+            if not subscriber.offer(event):
+                self.stats['resynced'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {'subscribers': self.count, 'groups': len(self.subscribers), **self.stats}
+
+
+class MemoryEventBroker:
+    """Delivers straight to this process's hub (single worker, or the ASGI app)."""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.lock = threading.Lock()
+        # Time-based ids keep increasing across restarts, so stale Last-Event-IDs are detected
+        self.last_id = time.time_ns() // 1000
+        hub.started_id = self.last_id + 1
+
+    def publish(self, group_id, event):
+        with self.lock:
+            self.last_id = max(self.last_id + 1, time.time_ns() // 1000)
+            event_id = self.last_id
+        self.hub.deliver({**event, 'id': event_id, 'group_id': group_id})
+
+    def ensure_started(self):
+        pass
+
+
+class SQLiteEventBroker:
+    """Events go through a local SQLite file that each worker tails, so a
+    subscriber on any worker on the host sees events published by another."""
+
+    def __init__(self, hub, path, poll_interval=0.25, retention_seconds=600):
+        self.hub = hub
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.thread = None
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS group_events '
+                     '(id INTEGER PRIMARY KEY AUTOINCREMENT, group_id INTEGER, payload TEXT, created REAL)')
+        self.last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM group_events').fetchone()[0]
+        hub.started_id = self.last_id + 1
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self.local.conn = conn
+        return conn
+
+    def publish(self, group_id, event):
+        self._conn().execute('INSERT INTO group_events (group_id, payload, created) VALUES (?, ?, ?)',
+                             (group_id, json.dumps(event, default=str), time.time()))
+
+    def ensure_started(self):
+        """Start tailing the file on the first subscription in this process."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._tail, name='group-events', daemon=True)
+                self.thread.start()
+
+    def _tail(self):
+        conn = self._conn()
+        last_prune = time.monotonic()
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                rows = conn.execute('SELECT id, group_id, payload FROM group_events WHERE id > ? ORDER BY id',
+                                    (self.last_id,)).fetchall()
+                for event_id, group_id, payload in rows:
+                    self.last_id = event_id
+                    self.hub.deliver({**json.loads(payload), 'id': event_id, 'group_id': group_id})
+
+                if time.monotonic() - last_prune > 60:
+                    conn.execute('DELETE FROM group_events WHERE created < ?',
+                                 (time.time() - self.retention_seconds,))
+                    last_prune = time.monotonic()
+            except Exception as e:
+                print(f"Group event tail error: {e}")
+
+
+group_event_hub = GroupEventHub(GROUP_EVENTS_QUEUE_SIZE, GROUP_EVENTS_MAX_SUBSCRIBERS)
+group_event_broker = MemoryEventBroker(group_event_hub) if GROUP_EVENTS_BROKER == 'memory' \
+    else SQLiteEventBroker(group_event_hub, GROUP_EVENTS_BROKER)
+
+
+def publish_group_event(group_ids, event_type, **data):
+    """Broadcast to each group's live feed; a failure never fails the write that triggered it."""
+    for group_id in group_ids:
+        try:
+            group_event_broker.publish(group_id, {'type': event_type,
+                                                  'at': datetime.now(timezone.utc).isoformat(), **data})
+        except Exception as e:
+            print(f"Group event publish failed: {e}")
+
+
+def format_sse(event):
+    lines = [f"id: {event['id']}"] if 'id' in event else []
+    lines += [f"event: {event['type']}", f"data: {json.dumps(event, default=str)}"]
+    return '\n'.join(lines) + '\n\n'
+
+
+def last_event_id_from(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def ends_stream(event, user_id):
+    """The subscriber left (or the group went away): close their stream after this event."""
+    return event['type'] == 'group_deleted' or \
+        (event['type'] == 'member_left' and str(event.get('user_id')) == str(user_id))
+
+
+@app.route('/api/groups/<int:group_id>/events/token', methods=['POST'])
+def group_events_token(group_id):
+    """Short-lived ?stream_token= for this group's event stream; needs the bearer token."""
+    user_id = g.get('auth_user_id')
+    if user_id is None:
+        return jsonify({'success': False, 'error': 'Authentication required'}), 401
+    return jsonify({
+        'success': True,
+        'stream_token': issue_stream_token(user_id, group_id),
+        'expires_in': STREAM_TOKEN_MAX_AGE
+    }), 200
+
+
+@app.route('/api/groups/<int:group_id>/events', methods=['GET'])
+def group_events(group_id):
+    """Server-sent events for a group's live feed: problem additions, joins and leaves."""
+    try:
+        user_id = resolve_user_id(request.args.get('user_id'))
+        if not user_id:
+            return jsonify({'success': False, 'error': 'user_id required'}), 400
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id FROM group_members WHERE group_id = %s AND user_id = %s',
+            (group_id, user_id)
+        )
+        membership = cursor.fetchone()
+        # Nothing below touches the database: don't hold a connection for the life of the stream
+        cursor.close()
+        conn.close()
+
+        if not membership:
+            return jsonify({'success': False, 'error': 'User is not a member of this group'}), 403
+
+        if not group_event_hub.has_capacity():
+            response = jsonify({'success': False, 'error': 'Too many live connections, please retry shortly'})
+            response.headers['Retry-After'] = str(int(GROUP_EVENTS_HEARTBEAT))
+            return response, 503
+
+        group_event_broker.ensure_started()
+        subscriber = ThreadSubscriber(group_id, GROUP_EVENTS_QUEUE_SIZE)
+        missed = group_event_hub.subscribe(
+            subscriber,
+            last_event_id_from(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+        )
+
+        def stream():
+            try:
+                yield 'retry: 3000\n\n'
+                for event in (missed if missed is not None else [GROUP_EVENTS_RESYNC]):
+                    yield format_sse(event)
+
+                deadline = time.monotonic() + GROUP_EVENTS_MAX_SECONDS
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        event = subscriber.queue.get(timeout=min(GROUP_EVENTS_HEARTBEAT, remaining))
+                    except queue.Empty:
+                        # Keeps proxies from timing the stream out and surfaces dead clients
+                        yield ': heartbeat\n\n'
+                        continue
+                    yield format_sse(event)
+                    if ends_stream(event, user_id):
+                        break
+            finally:
+                group_event_hub.unsubscribe(subscriber)
+
+        return Response(stream(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ================== CHANGE EVENTS ==================
+
+def record_change(cursor, event_type, user_id, payload, group_id=None):
+    """Append to the outbox inside the caller's transaction; committed (or rolled back) with the mutation."""
+    cursor.execute(
+        'INSERT INTO change_events (event_type, user_id, group_id, payload) VALUES (%s, %s, %s, %s)',
+        (event_type, user_id, group_id, json.dumps(payload, default=str))
+    )
+
+
+# Handlers may see an event more than once (at-least-once delivery), so each one
+# recomputes from the source rows or only invalidates: replaying is harmless.
+# Side effects outside the database are returned as a callable, run once the batch commits.
+
+def handle_activity_rollup(cursor, event, payload):
+    if event['event_type'] == 'problems_updated' and not POINTS_FIELDS & set(payload['fields']):
+        return
+    zone = user_zone(cursor, event['user_id'])
+    days = {activity_day(datetime.fromisoformat(created_at), zone) for created_at in payload['created_at']}
+    refresh_daily_activity(cursor, event['user_id'], days, zone)
+
+
+def handle_topic_mastery(cursor, event, payload):
+    if event['event_type'] == 'problems_updated' and not POINTS_FIELDS & set(payload['fields']):
+        return
+    # A new problem only moves its own topic; edits and deletes may span several
+    refresh_topic_mastery(cursor, event['user_id'],
+                          payload['topic'] if event['event_type'] == 'problem_added' else None)
+
+
+def handle_points_rescored(cursor, event, payload):
+    # The bulk recompute touched rows across the user's whole history
+    rebuild_daily_activity(cursor, event['user_id'], user_zone(cursor, event['user_id']))
+
+
+def handle_recommendations(cursor, event, payload):
+    if event['event_type'] == 'problems_updated' and not PROBLEM_HISTORY_FIELDS & set(payload['fields']):
+        return
+    mark_recommendations_stale(cursor, event['user_id'])
+    return lambda: schedule_recommendations(event['user_id'], payload.get('topic'))
+
+
+def handle_leaderboard(cursor, event, payload):
+    if event['event_type'] == 'problems_updated' and not POINTS_FIELDS & set(payload['fields']):
+        return
+    return invalidate_leaderboard
+
+
+def handle_group_feed(cursor, event, payload):
+    if event['group_id'] is not None:
+        group_ids = [event['group_id']]
+    else:
+        cursor.execute('SELECT group_id FROM group_members WHERE user_id = %s', (event['user_id'],))
+        group_ids = [row['group_id'] for row in cursor.fetchall()]
+    data = {key: value for key, value in payload.items() if key in ('problem', 'role')}
+    return lambda: publish_group_event(group_ids, event['event_type'], user_id=event['user_id'],
+                                       change_id=event['id'], **data)
+
+
+CHANGE_EVENT_HANDLERS = {
+    'problem_added': [handle_activity_rollup, handle_topic_mastery, handle_recommendations, handle_leaderboard,
+                      handle_group_feed],
+    'problems_updated': [handle_activity_rollup, handle_topic_mastery, handle_recommendations, handle_leaderboard],
+    'problems_deleted': [handle_activity_rollup, handle_topic_mastery, handle_recommendations, handle_leaderboard],
+    'points_rescored': [handle_points_rescored, handle_topic_mastery, handle_leaderboard],
+    'member_joined': [handle_group_feed],
+    'member_left': [handle_group_feed],
+    'group_deleted': [handle_group_feed],
+}
+
+PENDING_CHANGES_SQL = '''
+    SELECT id, event_type, user_id, group_id, payload, attempts
+    FROM change_events
+    WHERE processed_at IS NULL
+    ORDER BY id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+'''
+CHANGE_FAILED_SQL = '''
+    UPDATE change_events
+    SET attempts = attempts + 1, last_error = %s,
+        processed_at = IF(attempts >= %s, NOW(), NULL)
+    WHERE id = %s
+'''
+
+
+def consume_change_batch(batch_size=CHANGE_EVENTS_BATCH_SIZE):
+    """
+    Apply one batch of pending events in id order and mark them processed.
+    Returns (events claimed, events failed).
+
+    The batch's rows stay locked until commit and SKIP LOCKED keeps other
+    consumers off them. The batch also locks its users' rows before any handler
+    reads, so two consumers holding different events for the same user apply
+    them one after the other: the second waits for the first to commit and then
+    recomputes rollups from fresh data rather than overwriting them with totals
+    from an older snapshot. Database-side effects commit together with processed_at;
+    the callables handlers return (feed publishes, cache invalidation, scheduled
+    regeneration) run only after that commit. An event whose handler fails is
+    rolled back to its savepoint and retried on a later batch.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(PENDING_CHANGES_SQL, (batch_size,))
+        events = cursor.fetchall()
+
+        # In id order so consumers with overlapping users queue instead of deadlocking
+        user_ids = sorted({event['user_id'] for event in events if event['user_id'] is not None})
+        if user_ids:
+            placeholders = ', '.join(['%s'] * len(user_ids))
+            cursor.execute(f'SELECT id FROM users WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE',
+                           user_ids)
+            cursor.fetchall()
+
+        done, failed, after_commit = [], 0, []
+        for event in events:
+            cursor.execute('SAVEPOINT change_event')
+            try:
+                payload = json.loads(event['payload'])
+                deferred = [handler(cursor, event, payload)
+                            for handler in CHANGE_EVENT_HANDLERS.get(event['event_type'], [])]
+                cursor.execute('RELEASE SAVEPOINT change_event')
+                done.append(event['id'])
+                after_commit += [effect for effect in deferred if effect is not None]
+            except Exception as e:
+                cursor.execute('ROLLBACK TO SAVEPOINT change_event')
+                # SET is applied left to right: the IF sees attempts after the increment
+                cursor.execute(CHANGE_FAILED_SQL, (str(e)[:500], CHANGE_EVENTS_MAX_ATTEMPTS, event['id']))
+                print(f"Change event {event['id']} ({event['event_type']}) failed: {e}")
+                failed += 1
+
+        if done:
+            placeholders = ', '.join(['%s'] * len(done))
+            cursor.execute(
+                f'''UPDATE change_events SET processed_at = NOW(), attempts = attempts + 1
+                    WHERE id IN ({placeholders})''',
+                done
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    for effect in after_commit:
+        try:
+            effect()
+        except Exception as e:
+            print(f"Change event side effect failed: {e}")
+    return len(events), failed
+
+
+def prune_change_events(days=CHANGE_EVENTS_RETENTION_DAYS):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        'DELETE FROM change_events WHERE processed_at < NOW() - INTERVAL %s DAY LIMIT 10000',
+        (days,)
+    )
+    conn.commit()
+    pruned = cursor.rowcount
+    cursor.close()
+    conn.close()
+    return pruned
+
+
+class ChangeEventConsumer:
+    """Drains the outbox on a background thread in each worker.
+
+    Writers call notify() after committing so their events are applied within
+    milliseconds; the poll interval picks up events committed by other workers
+    or left behind by a crash.
+    """
+
+    def __init__(self, poll_interval, batch_size):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_prune = 0.0
+
+    def notify(self):
+        if not CHANGE_EVENTS_CONSUMER:
+            return
+        with self.lock:
+            # Started lazily so the thread exists in each forked Gunicorn worker
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True, name='change-events')
+                self.thread.start()
+        self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+            try:
+                while True:
+                    claimed, failed = consume_change_batch(self.batch_size)
+                    # A full batch means more may be waiting; failures wait for the next poll
+                    if claimed < self.batch_size or failed == claimed:
+                        break
+                if time.monotonic() - self.last_prune > 3600:
+                    prune_change_events()
+                    self.last_prune = time.monotonic()
+            except Exception as e:
+                print(f"Change event consumer error: {e}")
+
+
+change_event_consumer = ChangeEventConsumer(CHANGE_EVENTS_POLL_SECONDS, CHANGE_EVENTS_BATCH_SIZE)
+
+
+@app.cli.command('consume-changes')
+@click.option('--follow', is_flag=True, help='Keep polling instead of exiting once the outbox is drained.')
+@click.option('--batch-size', default=CHANGE_EVENTS_BATCH_SIZE, show_default=True)
+def consume_changes_command(follow, batch_size):
+    """Apply pending change events (e.g. with CHANGE_EVENTS_CONSUMER=false on the web workers)."""
+    applied = failed = 0
+    while True:
+        claimed, batch_failed = consume_change_batch(batch_size)
+        applied += claimed - batch_failed
+        failed += batch_failed
+        if claimed < batch_size or batch_failed == claimed:
+            if not follow:
+                break
+            time.sleep(CHANGE_EVENTS_POLL_SECONDS)
+    click.echo(f'{applied} change events applied, {failed} failed')
+    click.echo(f'{prune_change_events()} processed events older than {CHANGE_EVENTS_RETENTION_DAYS} days pruned')
+
 # ================== HEALTH CHECK ==================
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()}), 200
+    """Liveness: answers while the process can serve requests. /api/ready checks dependencies."""
+    health = {'status': 'healthy', 'timestamp': datetime.now().isoformat()}
+    if replica_router is not None:
+        health['read_replicas'] = replica_router.snapshot()
+    return jsonify(health), 200
 
-@app.route("/debug/db")
-def debug_db():
+
+def timed_check(check):
+    """Run one readiness check: {'ok', 'ms'} plus whatever the check reports, or its error."""
+    start = time.perf_counter()
     try:
-        conn = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            port=3306
-        )
-        return {"status": "connected"}
+        result = {'ok': True, **(check() or {})}
     except Exception as e:
-        return {"status": "error", "details": str(e)}
+        result = {'ok': False, 'error': str(e)[:200]}
+    result['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def check_database():
+    # Own short-lived connection: a pooled one would wait DB_CONNECT_TIMEOUT to connect and has no read timeout
+    timeout = {'connect_timeout': READY_PROBE_TIMEOUT, 'read_timeout': READY_PROBE_TIMEOUT,
+               'write_timeout': READY_PROBE_TIMEOUT}
+    conn = pymysql.connect(**{**DB_CONFIG, **timeout})
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1')
+        cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return {'pool': connection_pool(DB_CONFIG).snapshot()}
+
+
+_s3_probe_client = None
+
+
+def check_s3():
+    global _s3_probe_client
+    if not S3_BUCKET:
+        raise RuntimeError('S3_BUCKET_NAME not set')
+    if _s3_probe_client is None:
+        # Own client so a slow S3 costs the probe READY_PROBE_TIMEOUT, not boto's 60s default
+        _s3_probe_client = make_s3_client(BotoConfig(connect_timeout=READY_PROBE_TIMEOUT,
+                                                     read_timeout=READY_PROBE_TIMEOUT,
+                                                     retries={'max_attempts': 1}))
+    _s3_probe_client.head_bucket(Bucket=S3_BUCKET)
+
+
+def check_gemini():
+    # Configuration and breaker state only: a real call would spend quota on every probe
+    if not GEMINI_API_KEY:
+        raise RuntimeError('GEMINI_API_KEY not set')
+    if gemini_breaker.state == 'open':
+        raise RuntimeError(f'circuit open, retry in {gemini_breaker.retry_after()}s')
+    return {'model': GEMINI_MODEL, 'breaker': gemini_breaker.state}
+
+
+class WarmUp:
+    """Per-worker start-up work, run once before the worker takes traffic.
+
+    Gunicorn runs it from post_worker_init (gunicorn.conf.py) and the ASGI app
+    from its startup hook. Under any other server the first readiness probe
+    starts it in the background. A failing step is logged and reported by
+    /api/ready but doesn't stop the worker from starting.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.state = 'pending'
+        self.steps = {}
+
+    def fill_pool(self):
+        conns = [get_db_connection() for _ in range(min(WARMUP_CONNECTIONS, DB_POOL_SIZE))]
+        for conn in conns:
+            conn.close()
+        if replica_router is not None:
+            # Also starts the lag probe, so replicas are eligible sooner
+            replica_router.pick()
+
+    def prime_caches(self):
+        load_leaderboard()
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        active_points_rules(cursor)
+        cursor.close()
+        conn.close()
+        # The first login would otherwise pay for a full password hash to learn the parameters
+        password_hash_prefix()
+
+    def build_models(self):
+        if not GEMINI_API_KEY:
+            return
+        for system_instruction in (NAME_SYSTEM_PROMPT, RESUME_SYSTEM_PROMPT, RECOMMENDER_SYSTEM_PROMPT,
+                                   BATCH_RECOMMENDER_SYSTEM_PROMPT, SOLVER_SYSTEM_PROMPT):
+            get_model(system_instruction)
+
+    def run(self):
+        with self.lock:
+            if self.pid == os.getpid() and self.state == 'done':
+                return self.steps
+            self.state = 'running'
+            self.steps = {
+                'db_pool': timed_check(self.fill_pool),
+                'caches': timed_check(self.prime_caches),
+                'gemini_models': timed_check(self.build_models),
+            }
+            # Background consumers otherwise start on the first write
+            change_event_consumer.notify()
+            self.pid, self.state = os.getpid(), 'done'
+        print(f"Worker {os.getpid()} warmed up: " + ', '.join(
+            f"{name} {'ok' if step['ok'] else 'FAILED: ' + step['error']} ({step['ms']}ms)"
+            for name, step in self.steps.items()))
+        return self.steps
+
+    def ensure_started(self):
+        if self.pid != os.getpid() and self.state != 'running':
+            threading.Thread(target=self.run, daemon=True, name='warm-up').start()
+
+    def snapshot(self):
+        return {'ok': self.pid == os.getpid() and self.state == 'done', 'state': self.state, 'steps': self.steps}
+
+
+warm_up = WarmUp()
+
+
+class ReadinessProbe:
+    """Dependency checks cached for ttl seconds; only one probe runs at a time per worker."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.result = None
+        self.expires = 0.0
+
+    def check(self):
+        """(result, served from cache)."""
+        if self.result is not None and self.expires > time.monotonic():
+            return self.result, True
+        # While another request is probing, answer with the previous result instead of piling on
+        if not self.lock.acquire(blocking=self.result is None):
+            return self.result, True
+        try:
+            if self.result is not None and self.expires > time.monotonic():
+                return self.result, True
+            checks = {
+                'database': timed_check(check_database),
+                's3': timed_check(check_s3),
+                'gemini': timed_check(check_gemini),
+            }
+            # S3 and Gemini back single features and are shared by every worker: pulling this
+            # worker out of rotation wouldn't help, so they only mark it degraded
+            if not checks['database']['ok']:
+                status = 'not_ready'
+            elif all(check['ok'] for check in checks.values()):
+                status = 'ready'
+            else:
+                status = 'degraded'
+            self.result = {'status': status, 'checks': checks,
+                           'checked_at': datetime.now(timezone.utc).replace(tzinfo=None)}
+            self.expires = time.monotonic() + self.ttl
+            return self.result, False
+        finally:
+            self.lock.release()
+
+
+readiness_probe = ReadinessProbe(READY_CACHE_SECONDS)
+
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """Readiness: 503 until this worker has warmed up and while the database is unreachable."""
+    warm_up.ensure_started()
+    result, cached = readiness_probe.check()
+    warmup = warm_up.snapshot()
+    status = result['status'] if warmup['ok'] else 'not_ready'
+    return jsonify({**result, 'status': status, 'cached': cached, 'warmup': warmup}), \
+        503 if status == 'not_ready' else 200
 
 
 # ================== MAIN (LOCAL DEV ONLY) ==================
@@ -0,0 +1,690 @@
+"""ASGI serving mode.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+
+The I/O-bound routes (resume upload/analysis, recommendations, the guided
+solver and the live group feed) are served by async handlers on the event loop, using aiomysql, aioboto3
+and Gemini's async client, so one worker can keep hundreds of LLM calls in
+flight. Every other route falls through to the existing Flask app, which runs
+in a thread pool exactly as it does under Gunicorn.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+from functools import partial, wraps
+
+import aioboto3
+import aiomysql
+from asgiref.wsgi import WsgiToAsgi
+from botocore.exceptions import ClientError
+from itsdangerous import BadSignature, SignatureExpired
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse as StarletteJSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as sync_api
+
+ASYNC_DB_POOL_MIN = int(os.getenv('ASYNC_DB_POOL_MIN', 1))
+ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', 10))
+
+db_pool = None
+
+
+class JSONResponse(StarletteJSONResponse):
+    """Encoded like the Flask app's responses (orjson when available, UTC datetimes, numeric Decimals)."""
+
+    def render(self, content):
+        return sync_api.app.json.encode(content)
+
+s3_session = aioboto3.Session(
+    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+    region_name=os.getenv('AWS_REGION')
+)
+
+# ================== HELPERS ==================
+
+def open_s3_client():
+    """Async context manager yielding an aioboto3 S3 client."""
+    return s3_session.client('s3', endpoint_url=sync_api.S3_ENDPOINT_URL)
+
+
+async def fetch_all(query, args=None):
+    async with db_pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(query, args)
+            rows = await cursor.fetchall()
+        # End the read's implicit transaction: the pool closes connections released inside one
+        await conn.rollback()
+        return rows
+
+
+async def execute(query, args=None):
+    """Run a write and commit it, returning lastrowid."""
+    async with db_pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, args)
+            await conn.commit()
+            return cursor.lastrowid
+
+
+async def hedged_call(label, call, timeout):
+    """Async twin of app.hedged_call: race a second attempt once the first passes p95."""
+    threshold = sync_api.gemini_latency.p95(label)
+    if threshold is None or threshold >= timeout:
+        return await asyncio.wait_for(call(timeout), timeout)
+
+    first = asyncio.ensure_future(call(timeout))
+    done, _ = await asyncio.wait([first], timeout=threshold)
+    if done:
+        return first.result()
+
+    sync_api.count_llm_event(label, 'hedged')
+    remaining = timeout - threshold
+    pending = {first, asyncio.ensure_future(call(remaining))}
+    error = asyncio.TimeoutError(f'{label} exceeded {timeout:.1f}s')
+    deadline = time.monotonic() + remaining
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_resilience(label, call):
+    """Async twin of app.call_with_resilience; shares its breaker and latency window."""
+    breaker = sync_api.gemini_breaker
+    if not breaker.allow():
+        sync_api.count_llm_event(label, 'rejected')
+        raise sync_api.LLMUnavailable('AI service temporarily unavailable', breaker.retry_after())
+
+    deadline = time.monotonic() + sync_api.GEMINI_DEADLINE
+    attempt = 0
+    while True:
+        timeout = min(sync_api.GEMINI_TIMEOUT, deadline - time.monotonic())
+        start = time.perf_counter()
+        try:
+            if sync_api.GEMINI_HEDGE:
+                response = await hedged_call(label, call, timeout)
+            else:
+                response = await asyncio.wait_for(call(timeout), timeout)
+        except (asyncio.TimeoutError, *sync_api.TRANSIENT_LLM_ERRORS) as e:
+            breaker.record_failure()
+            attempt += 1
+            delay = sync_api.backoff_delay(attempt)
+            if attempt > sync_api.GEMINI_MAX_RETRIES or time.monotonic() + delay >= deadline \
+                    or not breaker.allow():
+                print(f"Gemini {label} failed after {attempt} attempt(s): {e!r}")
+                sync_api.count_llm_event(label, 'failed')
+                raise sync_api.LLMUnavailable('AI service temporarily unavailable', max(1, delay)) from e
+            sync_api.count_llm_event(label, 'retried')
+            await asyncio.sleep(delay)
+            continue
+        except Exception:
+            breaker.record_success()
+            raise
+
+        breaker.record_success()
+        sync_api.gemini_latency.add(label, time.perf_counter() - start)
+        return response
+
+
+async def generate(label, system_instruction, prompt, prefix=None):
+    """Async twin of app.gemini_generate, sharing its model registry and caches."""
+    if sync_api.prefix_cacheable(prefix):
+        # Creating a context cache is a blocking call; keep it off the event loop
+        model, lead = await run_in_threadpool(sync_api.model_for, system_instruction, prefix)
+    else:
+        model, lead = sync_api.model_for(system_instruction, prefix)
+    contents = sync_api.prompt_contents(lead, prompt)
+
+    def attempt(timeout):
+        options = sync_api.gemini_request_options(timeout)
+        if sync_api.GEMINI_API_ENDPOINT:
+            # The SDK's async client only speaks gRPC; a REST endpoint override needs the sync call
+            return run_in_threadpool(model.generate_content, contents, request_options=options)
+        return model.generate_content_async(contents, request_options=options)
+
+    start = time.perf_counter()
+    response = await call_with_resilience(label, attempt)
+    sync_api.record_llm_usage(label, response, time.perf_counter() - start)
+    return response
+
+
+async def extract_candidate_name(text):
+    try:
+        name_prompt = sync_api.build_name_prompt(text)
+        if not name_prompt:
+            return "the candidate"
+
+        response = await generate('candidate_name', sync_api.NAME_SYSTEM_PROMPT, name_prompt)
+        return sync_api.clean_candidate_name(response.text)
+
+    except Exception as e:
+        print(f"Error extracting name: {e}")
+        return "the candidate"
+
+
+def authenticate(request, claimed=None, stream_group=None):
+    """Return (user_id, error response), mirroring app.authenticate_request.
+
+    stream_group: the group whose event stream this is; a ?stream_token= scoped to it is accepted.
+    """
+    token = sync_api.bearer_token(request.headers.get('authorization'))
+    verify = sync_api.verify_auth_token
+    if token is None and stream_group is not None:
+        token = request.query_params.get('stream_token')
+        verify = partial(sync_api.verify_stream_token, group_id=stream_group)
+    if token is None:
+        if sync_api.AUTH_REQUIRED:
+            return None, JSONResponse({'error': 'Authentication required'}, status_code=401)
+        return claimed, None
+
+    try:
+        user_id = verify(token)
+    except SignatureExpired:
+        return None, JSONResponse({'error': 'Token expired'}, status_code=401)
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None, JSONResponse({'error': 'Invalid token'}, status_code=401)
+
+    if claimed not in (None, '') and str(claimed) != str(user_id):
+        return None, JSONResponse({'error': 'user_id does not match token'}, status_code=403)
+    return user_id, None
+
+
+def rate_limited(name):
+    """Async twin of app.rate_limited, sharing its buckets and in-flight gate.
+
+    Authenticates first, as app.authenticate_request does before any Flask view,
+    so tokenless calls are rejected before they can drain a bucket keyed on a
+    shared client IP.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapped(request):
+            user_id, auth_error = authenticate(request)
+            if auth_error:
+                return auth_error
+            # Never key on the client's user_id: anyone could spread their calls across other users' buckets
+            user_key = user_id or (request.client.host if request.client else 'unknown')
+            # The bucket store may be SQLite-backed; keep its I/O off the event loop
+            rejection = await run_in_threadpool(sync_api.check_rate_limit, name, user_key)
+            if rejection:
+                message, retry_after = rejection
+                return JSONResponse({'error': message}, status_code=429,
+                                    headers={'Retry-After': str(retry_after)})
+            try:
+                return await handler(request)
+            finally:
+                if sync_api.RATE_LIMIT_ENABLED:
+                    sync_api.release_rate_limit(name)
+        return wrapped
+    return decorator
+
+
+def llm_unavailable(error):
+    return JSONResponse({'error': str(error)}, status_code=503,
+                        headers={'Retry-After': str(error.retry_after)})
+
+
+async def read_upload(file, max_bytes, chunk_size=64 * 1024):
+    """Async twin of app.read_upload for Starlette uploads."""
+    digest = hashlib.sha256()
+    data = bytearray()
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        data += chunk
+        if len(data) > max_bytes:
+            return None
+    return bytes(data), digest.hexdigest()
+
+
+def uploaded_file(form):
+    file = form.get('file')
+    return file if hasattr(file, 'filename') else None
+
+# ================== RESUME UPLOAD ==================
+
+async def upload_resume(request):
+    try:
+        form = await request.form()
+        user_id, auth_error = authenticate(request, form.get('user_id'))
+        if auth_error:
+            return auth_error
+
+        file = uploaded_file(form)
+        if file is None:
+            return JSONResponse({'error': 'No file provided'}, status_code=400)
+
+        if not user_id:
+            return JSONResponse({'error': 'user_id required'}, status_code=400)
+
+        upload_error = sync_api.pdf_upload_error(file)
+        if upload_error:
+            return JSONResponse({'error': upload_error}, status_code=400)
+
+        upload = await read_upload(file, sync_api.RESUME_MAX_BYTES)
+        upload_error = sync_api.pdf_content_error(upload)
+        if upload_error:
+            return JSONResponse({'error': upload_error}, status_code=400)
+        data, content_hash = upload
+
+        # Same steps as app.upload_resume on a pooled connection: no transaction spans the S3 upload
+        async with db_pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                s3_key = None
+                await cursor.execute(sync_api.RESUME_OBJECT_LOOKUP_SQL, (user_id, content_hash))
+                existing = await cursor.fetchone()
+                if existing:
+                    await cursor.execute(sync_api.RESUME_OBJECT_ACQUIRE_SQL, (existing['id'],))
+                    if cursor.rowcount:
+                        s3_key = existing['s3_key']
+
+                deduplicated = s3_key is not None
+                new_key = None
+                if not deduplicated:
+                    await conn.rollback()
+                    new_key = sync_api.new_resume_key(user_id, file.filename)
+                    async with open_s3_client() as s3:
+                        await s3.upload_fileobj(
+                            io.BytesIO(data),
+                            sync_api.S3_BUCKET,
+                            new_key,
+                            ExtraArgs={'ContentType': 'application/pdf'}
+                        )
+
+                committed = False
+                try:
+                    if new_key:
+                        await cursor.execute(sync_api.RESUME_OBJECT_INSERT_SQL,
+                                             (new_key, user_id, content_hash, len(data)))
+                        s3_key = new_key
+                        if cursor.rowcount != 1:
+                            await cursor.execute(sync_api.RESUME_OBJECT_LOOKUP_SQL, (user_id, content_hash))
+                            s3_key = (await cursor.fetchone())['s3_key']
+
+                    # Presigning is a local computation, no need for the async client
+                    file_url = sync_api.s3_client.generate_presigned_url(
+                        'get_object',
+                        Params={'Bucket': sync_api.S3_BUCKET, 'Key': s3_key},
+                        ExpiresIn=3600
+                    )
+
+                    await cursor.execute(sync_api.INSERT_RESUME_SQL,
+                                         (user_id, file.filename, s3_key, file_url, content_hash))
+                    resume_id = cursor.lastrowid
+                    await conn.commit()
+                    committed = True
+                finally:
+                    if new_key and (not committed or s3_key != new_key):
+                        async with open_s3_client() as s3:
+                            await s3.delete_objects(Bucket=sync_api.S3_BUCKET,
+                                                    Delete={'Objects': [{'Key': new_key}]})
+
+        # PDF parsing is CPU-bound; the shared executor keeps it off the event loop and the request
+        sync_api.resume_text_executor.submit(sync_api.store_resume_text, resume_id, data, content_hash)
+
+        return JSONResponse({
+            'message': 'Resume uploaded successfully',
+            'resume_id': resume_id,
+            'file_url': file_url,
+            'text_status': 'pending',
+            'deduplicated': deduplicated
+        }, status_code=201)
+
+    except ClientError as e:
+        return JSONResponse({'error': f'AWS S3 error: {str(e)}'}, status_code=500)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+# ================== GEMINI RESUME ANALYSIS ==================
+
+@rate_limited('analyze_resume')
+async def analyze_resume(request):
+    try:
+        if not sync_api.GEMINI_API_KEY:
+            return JSONResponse({'error': 'Gemini API key not configured'}, status_code=500)
+
+        if request.headers.get('content-type', '').startswith('application/json'):
+            form = await request.json()
+        else:
+            form = await request.form()
+        user_id, auth_error = authenticate(request, form.get('user_id'))
+        if auth_error:
+            return auth_error
+
+        resume_id = form.get('resume_id')
+        mode = form.get('mode') or 'auto'
+        if mode not in sync_api.RESUME_ANALYSIS_MODES:
+            return JSONResponse({'error': f"mode must be one of {', '.join(sync_api.RESUME_ANALYSIS_MODES)}"},
+                                status_code=400)
+
+        if resume_id:
+            if not user_id:
+                return JSONResponse({'error': 'user_id required'}, status_code=400)
+
+            rows = await fetch_all(
+                '''SELECT s3_key, content_hash, extracted_text, text_status
+                   FROM resumes WHERE id = %s AND user_id = %s''',
+                (resume_id, user_id)
+            )
+            if not rows:
+                return JSONResponse({'error': 'Resume not found'}, status_code=404)
+
+            resume = rows[0]
+            pdf_text = resume['extracted_text']
+            if resume['text_status'] == 'pending':
+                async with open_s3_client() as s3:
+                    obj = await s3.get_object(Bucket=sync_api.S3_BUCKET, Key=resume['s3_key'])
+                    data = await obj['Body'].read()
+                pdf_text = await run_in_threadpool(
+                    sync_api.store_resume_text, resume_id, data,
+                    resume['content_hash'] or hashlib.sha256(data).hexdigest()
+                )
+        else:
+            file = uploaded_file(form)
+            upload_error = sync_api.pdf_upload_error(file)
+            if upload_error:
+                return JSONResponse({'error': upload_error}, status_code=400)
+            upload = await read_upload(file, sync_api.RESUME_MAX_BYTES)
+            upload_error = sync_api.pdf_content_error(upload)
+            if upload_error:
+                return JSONResponse({'error': upload_error}, status_code=400)
+
+            pdf_text = await run_in_threadpool(sync_api.extract_text_from_pdf, io.BytesIO(upload[0]))
+
+        if not pdf_text:
+            return JSONResponse({'error': 'Could not extract text from PDF'}, status_code=400)
+
+        sections = sync_api.split_resume_sections(pdf_text)
+        previous = None
+        if user_id:
+            rows = await fetch_all(sync_api.LATEST_RESUME_ANALYSIS_SQL, (user_id,))
+            previous = rows[0] if rows else None
+
+        mode, to_review, reused = sync_api.plan_resume_analysis(sections, previous, mode)
+        if mode == 'cached':
+            return JSONResponse({
+                'analysis': previous['analysis'],
+                'candidate_name': previous['candidate_name'],
+                'mode': mode,
+                'reviewed_sections': [],
+                'reused_sections': list(reused),
+                'message': 'Resume unchanged since the last analysis'
+            })
+
+        if mode == 'incremental' and ('Header' in reused or 'Resume' in reused):
+            candidate_name = previous['candidate_name']
+        else:
+            candidate_name = await extract_candidate_name(pdf_text)
+
+        previous_overall = previous['overall'] if mode == 'incremental' else None
+        prompt = sync_api.build_resume_prompt(candidate_name, to_review, list(reused), previous_overall)
+        label = 'analyze_resume' if mode == 'full' else 'analyze_resume_incremental'
+        response = await generate(label, sync_api.RESUME_SYSTEM_PROMPT, prompt)
+        analysis, overall, stored = sync_api.merge_resume_analysis(sections, response.text, reused,
+                                                                   previous_overall)
+
+        if user_id:
+            await execute(sync_api.INSERT_RESUME_ANALYSIS_SQL,
+                          (user_id, resume_id, candidate_name, json.dumps(stored), overall,
+                           analysis, mode, len(prompt)))
+
+        return JSONResponse({
+            'analysis': analysis,
+            'candidate_name': candidate_name,
+            'mode': mode,
+            'reviewed_sections': [name for name, _ in to_review],
+            'reused_sections': list(reused),
+            'message': 'Resume analyzed successfully'
+        })
+
+    except sync_api.LLMUnavailable as e:
+        return llm_unavailable(e)
+    except Exception as e:
+        return JSONResponse({'error': f'Analysis error: {str(e)}'}, status_code=500)
+
+# ================== AI PROBLEM RECOMMENDATIONS ==================
+
+@rate_limited('suggest_problems')
+async def suggest_problems(request):
+    try:
+        if not sync_api.GEMINI_API_KEY:
+            return JSONResponse({'error': 'Gemini API key not configured'}, status_code=500)
+
+        data = await request.json()
+        user_id, auth_error = authenticate(request, data.get('user_id'))
+        if auth_error:
+            return auth_error
+        topic = data.get('topic')
+
+        if not user_id:
+            return JSONResponse({'error': 'user_id required'}, status_code=400)
+
+        topic_key = sync_api.recommendation_topic(topic)
+        stored = await fetch_all(sync_api.STORED_RECOMMENDATIONS_SQL,
+                                 (sync_api.RECOMMENDATION_MAX_AGE_HOURS, user_id, topic_key))
+        if stored and not stored[0]['expired']:
+            return JSONResponse({
+                'recommendations': json.loads(stored[0]['recommendations']),
+                'topic': topic,
+                'generated_at': stored[0]['generated_at'],
+                'message': 'Recommendations generated successfully'
+            })
+
+        solved_problems = await fetch_all(sync_api.SOLVED_PROBLEMS_SQL, (user_id,))
+        weak_topics = [] if topic_key else [
+            row['topic'] for row in await fetch_all(sync_api.WEAKEST_TOPICS_SQL,
+                                                    (user_id, sync_api.MASTERY_WEAK_TOPICS))]
+
+        history, request_prompt = sync_api.build_recommendation_prompt(solved_problems, topic_key or None,
+                                                                       weak_topics)
+        response = await generate('suggest_problems', sync_api.RECOMMENDER_SYSTEM_PROMPT,
+                                  request_prompt, prefix=history)
+        recommendations, recommendations_text = sync_api.parse_recommendations(response.text)
+        if isinstance(recommendations, list):
+            recommendations = sync_api.filter_solved_recommendations(
+                recommendations, sync_api.solved_exclusion_set(solved_problems))
+
+        if recommendations is None:
+            return JSONResponse({
+                'recommendations': [],
+                'raw_text': recommendations_text,
+                'message': 'Could not parse recommendations as JSON'
+            })
+
+        await execute(sync_api.STORE_RECOMMENDATIONS_SQL,
+                      (user_id, topic_key, json.dumps(recommendations)))
+
+        return JSONResponse({
+            'recommendations': recommendations,
+            'topic': topic,
+            'message': 'Recommendations generated successfully'
+        })
+
+    except sync_api.LLMUnavailable as e:
+        return llm_unavailable(e)
+    except Exception as e:
+        return JSONResponse({'error': f'Recommendation error: {str(e)}'}, status_code=500)
+
+# ================== GUIDED PROBLEM SOLVER ==================
+
+@rate_limited('solve_problem')
+async def solve_problem(request):
+    try:
+        if not sync_api.GEMINI_API_KEY:
+            return JSONResponse({'error': 'Gemini API key not configured'}, status_code=500)
+
+        _, auth_error = authenticate(request)
+        if auth_error:
+            return auth_error
+
+        data = await request.json()
+        problem = data.get('problem', '').strip()
+        stage = data.get('stage', 'explain')
+        user_input = data.get('user_input', '').strip()
+        conversation_history = data.get('conversation_history', [])
+
+        if not problem:
+            return JSONResponse({'error': 'Problem statement missing'}, status_code=400)
+
+        prompts = sync_api.build_solver_prompt(problem, stage, user_input, conversation_history)
+        if prompts is None:
+            return JSONResponse({'error': 'Invalid stage'}, status_code=400)
+
+        problem_prefix, stage_prompt = prompts
+        response = await generate('solve_problem', sync_api.SOLVER_SYSTEM_PROMPT,
+                                  stage_prompt, prefix=problem_prefix)
+        output = response.text.strip() if response and hasattr(response, 'text') else 'No response.'
+
+        return JSONResponse({'response': output})
+
+    except sync_api.LLMUnavailable as e:
+        return llm_unavailable(e)
+    except Exception as e:
+        print('Error in /api/solve-problem:', e)
+        return JSONResponse({'error': 'Something went wrong processing your request.'}, status_code=500)
+
+# ================== GROUP EVENTS ==================
+
+class AsyncSubscriber:
+    """SSE stream on the event loop; events published from worker threads are
+    handed over with call_soon_threadsafe."""
+
+    def __init__(self, group_id, size):
+        self.group_id = group_id
+        self.queue = asyncio.Queue(maxsize=size)
+        self.loop = asyncio.get_running_loop()
+
+    def offer(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+        return not self.queue.full()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(sync_api.GROUP_EVENTS_RESYNC)
+
+
+async def group_events(request):
+    group_id = request.path_params['group_id']
+    try:
+        user_id, auth_error = authenticate(request, request.query_params.get('user_id'), stream_group=group_id)
+        if auth_error:
+            return auth_error
+        if not user_id:
+            return JSONResponse({'success': False, 'error': 'user_id required'}, status_code=400)
+
+        rows = await fetch_all('SELECT id FROM group_members WHERE group_id = %s AND user_id = %s',
+                               (group_id, user_id))
+        if not rows:
+            return JSONResponse({'success': False, 'error': 'User is not a member of this group'},
+                                status_code=403)
+
+        hub = sync_api.group_event_hub
+        if not hub.has_capacity():
+            return JSONResponse({'success': False, 'error': 'Too many live connections, please retry shortly'},
+                                status_code=503,
+                                headers={'Retry-After': str(int(sync_api.GROUP_EVENTS_HEARTBEAT))})
+
+        sync_api.group_event_broker.ensure_started()
+        subscriber = AsyncSubscriber(group_id, sync_api.GROUP_EVENTS_QUEUE_SIZE)
+        missed = hub.subscribe(subscriber, sync_api.last_event_id_from(
+            request.headers.get('last-event-id') or request.query_params.get('last_event_id')))
+
+        async def stream():
+            try:
+                yield 'retry: 3000\n\n'
+                for event in (missed if missed is not None else [sync_api.GROUP_EVENTS_RESYNC]):
+                    yield sync_api.format_sse(event)
+
+                deadline = time.monotonic() + sync_api.GROUP_EVENTS_MAX_SECONDS
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        event = await asyncio.wait_for(subscriber.queue.get(),
+                                                       min(sync_api.GROUP_EVENTS_HEARTBEAT, remaining))
+                    except asyncio.TimeoutError:
+                        yield ': heartbeat\n\n'
+                        continue
+                    yield sync_api.format_sse(event)
+                    if sync_api.ends_stream(event, user_id):
+                        break
+            finally:
+                hub.unsubscribe(subscriber)
+
+        return StreamingResponse(stream(), media_type='text/event-stream', headers=sync_api.SSE_HEADERS)
+
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+# ================== APP ==================
+
+async def startup():
+    global db_pool
+    config = sync_api.DB_CONFIG
+    db_pool = await aiomysql.create_pool(
+        host=config['host'],
+        port=config['port'],
+        user=config['user'],
+        password=config['password'],
+        db=config['database'],
+        init_command=config['init_command'],
+        minsize=ASYNC_DB_POOL_MIN,
+        maxsize=ASYNC_DB_POOL_SIZE
+    )
+    # Uvicorn accepts connections only once startup returns, so nothing below is paid by a request
+    try:
+        conns = [await db_pool.acquire() for _ in range(min(sync_api.WARMUP_CONNECTIONS, ASYNC_DB_POOL_SIZE))]
+        for conn in conns:
+            db_pool.release(conn)
+    except Exception as e:
+        print(f"Async pool warm-up failed: {e}")
+    await run_in_threadpool(sync_api.warm_up.run)
+
+
+async def shutdown():
+    if db_pool is not None:
+        db_pool.close()
+        await db_pool.wait_closed()
+
+
+application = Starlette(
+    routes=[
+        Route('/api/upload-resume', upload_resume, methods=['POST']),
+        Route('/api/analyze-resume', analyze_resume, methods=['POST']),
+        Route('/api/suggest-problems', suggest_problems, methods=['POST']),
+        Route('/api/solve-problem', solve_problem, methods=['POST']),
+        Route('/api/groups/{group_id:int}/events', group_events, methods=['GET']),
+        Mount('/', app=WsgiToAsgi(sync_api.app)),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+    ],
+    on_startup=[startup],
+    on_shutdown=[shutdown],
+)
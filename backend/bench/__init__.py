@@ -0,0 +1,8 @@
+"""Load-test and benchmark harness for the AlgoAxis API.
+
+Run from the backend directory:
+
+    python -m bench.seed --users 10000 --problems 1000000
+    python -m bench.run --duration 60 --concurrency 16
+    python -m bench.tail_latency --requests 300 --stall-rate 0.03
+"""
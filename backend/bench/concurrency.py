@@ -0,0 +1,94 @@
+"""Compare how many concurrent LLM requests each serving mode can absorb.
+
+    python -m bench.concurrency --levels 8,32,128,256 --duration 15
+
+For each mode a server is started with bench.serve (Gunicorn sync workers vs a
+single uvicorn worker running asgi.py), then the solver/resume routes are
+driven over HTTP at each concurrency level. With a fake Gemini median of
+--gemini-ms, a sync worker can finish at most 1000 / gemini-ms requests per
+second, so throughput flattens at workers * that rate while the ASGI worker
+keeps scaling until the event loop saturates.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+import types
+import urllib.request
+
+from bench.run import HttpDriver, Workload, print_report, run
+
+LLM_MIX = {'solve_problem': 3, 'analyze_resume': 1}
+
+
+def wait_for_health(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'{url}/api/health', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server at {url} did not become healthy')
+
+
+def bench_mode(mode, port, args):
+    command = [sys.executable, '-m', 'bench.serve', '--mode', mode, '--port', str(port),
+               '--workers', str(args.workers), '--gemini-ms', str(args.gemini_ms),
+               '--database', args.database]
+    server = subprocess.Popen(command)
+    url = f'http://127.0.0.1:{port}'
+    results = {}
+    try:
+        wait_for_health(url)
+        # No DB-backed routes in the mix; seeded user 1 logs in once for the bearer token
+        ctx = types.SimpleNamespace(max_user_id=1, max_problem_id=1, user_ids=[1], tokens={},
+                                    memberships=[], invite_codes=[])
+        for level in args.levels:
+            run_args = types.SimpleNamespace(requests=None, warmup=args.warmup, duration=args.duration,
+                                             concurrency=level, seed=args.seed)
+            print(f'\n== {mode} @ concurrency {level} ==')
+            report = run(HttpDriver(url), ctx, run_args)
+            print_report(report)
+            results[level] = report
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', default='8,32,128,256')
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--workers', type=int, default=4, help='Gunicorn sync workers')
+    parser.add_argument('--gemini-ms', type=float, default=800)
+    parser.add_argument('--database', default='interviewmate_bench')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write both modes\' reports to this file')
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.levels.split(',')]
+
+    Workload.MIX = LLM_MIX
+    results = {
+        'sync': bench_mode('sync', 5100, args),
+        'asgi': bench_mode('asgi', 5101, args),
+    }
+
+    print(f"\n{'concurrency':>11} {'sync rps':>10} {'sync p95':>10} {'asgi rps':>10} {'asgi p95':>10}")
+    for level in args.levels:
+        sync, asgi = results['sync'][level], results['asgi'][level]
+        print(f"{level:>11} {sync['rps']:>10.1f} {sync['p95_ms']:>9.0f}ms "
+              f"{asgi['rps']:>10.1f} {asgi['p95_ms']:>9.0f}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Fake Gemini REST server with a controllable latency tail.
+
+    python -m bench.fake_gemini --port 8089 --median-ms 400 --stall-rate 0.05 --error-rate 0.02
+
+Point the app at it with GEMINI_API_ENDPOINT=http://127.0.0.1:8089 (any
+GEMINI_API_KEY). Latency is log-normal around --median-ms; a --stall-rate
+fraction of calls instead hang for --stall-ms and an --error-rate fraction
+answer 503. All draws come from one seeded RNG, so a sequential run always
+sees the same sequence of slow, stalled and failed calls.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.fakes import fake_response_text
+
+
+class FakeGeminiConfig:
+    def __init__(self, median_ms=400, sigma=0.35, stall_rate=0.0, stall_ms=10000,
+                 error_rate=0.0, seed=0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def next_outcome(self):
+        """('ok' | 'stall' | 'error', seconds to wait)."""
+        with self.lock:
+            self.requests += 1
+            roll = self.rng.random()
+            latency = self.median_ms * self.rng.lognormvariate(0, self.sigma) / 1000
+        if roll < self.error_rate:
+            return 'error', latency / 4
+        if roll < self.error_rate + self.stall_rate:
+            return 'stall', self.stall_ms / 1000
+        return 'ok', latency
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+
+            if not self.path.split('?')[0].endswith(':generateContent'):
+                # e.g. cachedContents: report unsupported so the app falls back to inline prefixes
+                self._send(400, {'error': {'code': 400, 'message': 'not supported by fake', 'status': 'INVALID_ARGUMENT'}})
+                return
+
+            outcome, wait = config.next_outcome()
+            time.sleep(wait)
+            if outcome == 'error':
+                self._send(503, {'error': {'code': 503, 'message': 'fake overload', 'status': 'UNAVAILABLE'}})
+                return
+
+            prompt = '\n'.join(part.get('text', '')
+                               for content in request.get('contents', [])
+                               for part in content.get('parts', []))
+            system = '\n'.join(part.get('text', '')
+                               for part in (request.get('systemInstruction') or {}).get('parts', []))
+            self._send(200, {
+                'candidates': [{
+                    'content': {'role': 'model', 'parts': [{'text': fake_response_text(prompt, system)}]},
+                    'finishReason': 'STOP',
+                    'index': 0,
+                }],
+                'usageMetadata': {
+                    'promptTokenCount': (len(prompt) + len(system)) // 4,
+                    'candidatesTokenCount': 20,
+                    'totalTokenCount': (len(prompt) + len(system)) // 4 + 20,
+                },
+            })
+
+    return Handler
+
+
+def start_server(config, host='127.0.0.1', port=0):
+    """Start in a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--median-ms', type=float, default=400)
+    parser.add_argument('--sigma', type=float, default=0.35)
+    parser.add_argument('--stall-rate', type=float, default=0.0)
+    parser.add_argument('--stall-ms', type=float, default=10000)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeGeminiConfig(args.median_ms, args.sigma, args.stall_rate, args.stall_ms,
+                              args.error_rate, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f'Fake Gemini listening on http://{args.host}:{args.port}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""In-process stand-ins for S3 and Gemini so benchmarks never leave the box."""
+
+import json
+import random
+import re
+import threading
+import time
+import types
+
+
+class FakeS3Client:
+    """Keeps uploaded objects in memory and hands out fake presigned URLs."""
+
+    def __init__(self, latency_ms=5):
+        self.latency_ms = latency_ms
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self._sleep()
+        data = fileobj.read()
+        with self._lock:
+            self.objects[(bucket, key)] = data
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._sleep()
+        with self._lock:
+            self.objects[(Bucket, Key)] = Body if isinstance(Body, bytes) else Body.read()
+        return {}
+
+    def get_object(self, Bucket, Key):
+        self._sleep()
+        with self._lock:
+            data = self.objects.get((Bucket, Key), b'')
+        return {'Body': types.SimpleNamespace(read=lambda: data)}
+
+    def delete_objects(self, Bucket, Delete):
+        self._sleep()
+        with self._lock:
+            for obj in Delete.get('Objects', []):
+                self.objects.pop((Bucket, obj['Key']), None)
+        return {'Deleted': Delete.get('Objects', [])}
+
+    def head_bucket(self, Bucket):
+        return {}
+
+    def generate_presigned_url(self, operation, Params=None, ExpiresIn=3600):
+        return f"http://fake-s3.local/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+
+class FakeAsyncS3Client:
+    """Async counterpart used by the ASGI handlers; shares the sync fake's store."""
+
+    def __init__(self, sync_fake):
+        self.sync_fake = sync_fake
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        import asyncio
+        await asyncio.sleep(self.sync_fake.latency_ms / 1000)
+        with self.sync_fake._lock:
+            self.sync_fake.objects[(bucket, key)] = fileobj.read()
+
+    async def delete_objects(self, Bucket, Delete):
+        return self.sync_fake.delete_objects(Bucket, Delete)
+
+    async def get_object(self, Bucket, Key):
+        data = self.sync_fake.get_object(Bucket, Key)['Body'].read()
+
+        async def read():
+            return data
+        return {'Body': types.SimpleNamespace(read=read)}
+
+
+FAKE_RECOMMENDATIONS = [
+    {'problem_name': 'Two Sum', 'topic': 'Arrays', 'difficulty': 'Easy',
+     'reason': 'Hash map warm-up'},
+    {'problem_name': 'Group Anagrams', 'topic': 'Strings', 'difficulty': 'Medium',
+     'reason': 'Builds on hashing'},
+    {'problem_name': 'Course Schedule', 'topic': 'Graphs', 'difficulty': 'Medium',
+     'reason': 'Topological sort practice'},
+    {'problem_name': 'Merge k Sorted Lists', 'topic': 'Heaps', 'difficulty': 'Hard',
+     'reason': 'Heap fundamentals'},
+    {'problem_name': 'Coin Change', 'topic': 'Dynamic Programming', 'difficulty': 'Medium',
+     'reason': 'Classic DP'},
+]
+
+
+class FakeGeminiLatency:
+    """Log-normal latency around a median, seeded for reproducible tails."""
+
+    def __init__(self, median_ms=800, sigma=0.35, seed=0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        if not self.median_ms:
+            return 0.0
+        with self._lock:
+            factor = self._rng.lognormvariate(0, self.sigma)
+        return self.median_ms * factor / 1000
+
+
+def fake_response_text(prompt, system_instruction=None):
+    """Canned answer shaped like what each endpoint expects to parse."""
+    text = prompt if isinstance(prompt, str) else json.dumps(prompt, default=str)
+    text = f"{system_instruction or ''}\n{text}"
+    if "candidate's full name" in text:
+        return 'Jane Doe'
+    if 'section by section' in text:
+        headings = re.findall(r'^## (.+)$', text, re.MULTILINE)
+        return '\n\n'.join(f'## {name}\n- Feedback on {name}' for name in headings + ['Overall'])
+    batch_keys = re.findall(r'^User (u\d+):', text, re.MULTILINE)
+    if batch_keys:
+        return json.dumps({key: FAKE_RECOMMENDATIONS for key in batch_keys})
+    if 'JSON' in text:
+        return json.dumps(FAKE_RECOMMENDATIONS)
+    return '## Response\n\n- Point one\n- Point two\n\n```python\nprint("ok")\n```'
+
+
+class FakeGenerativeModel:
+    latency = FakeGeminiLatency()
+
+    def __init__(self, model_name='models/fake', system_instruction=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.kwargs = kwargs
+
+    def _response(self, contents):
+        text = fake_response_text(contents, self.system_instruction)
+        # Rough 4-chars-per-token estimate so LLM metrics have something to show
+        usage = types.SimpleNamespace(prompt_token_count=len(str(contents)) // 4,
+                                      candidates_token_count=len(text) // 4,
+                                      cached_content_token_count=0)
+        return types.SimpleNamespace(text=text, usage_metadata=usage)
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self.latency.sample())
+        return self._response(contents)
+
+    async def generate_content_async(self, contents, **kwargs):
+        import asyncio
+        await asyncio.sleep(self.latency.sample())
+        return self._response(contents)
+
+
+def install_fakes(app_module, gemini_median_ms=800, s3_latency_ms=5, seed=0, asgi_module=None):
+    """Point the Flask module's S3 client and Gemini bindings at the fakes."""
+    FakeGenerativeModel.latency = FakeGeminiLatency(gemini_median_ms, seed=seed)
+    app_module.s3_client = FakeS3Client(latency_ms=s3_latency_ms)
+    if asgi_module is not None:
+        asgi_module.open_s3_client = lambda: FakeAsyncS3Client(app_module.s3_client)
+    app_module.S3_BUCKET = app_module.S3_BUCKET or 'bench-bucket'
+    app_module.GEMINI_API_KEY = app_module.GEMINI_API_KEY or 'bench'
+    app_module.genai = types.SimpleNamespace(
+        GenerativeModel=FakeGenerativeModel,
+        configure=lambda **kwargs: None,
+    )
+    return app_module.s3_client
+
+
+def make_pdf(lines):
+    """Build a tiny single-page PDF whose text PyPDF2 can extract."""
+    text_ops = ['BT', '/F1 12 Tf', '14 TL', '72 720 Td']
+    for line in lines:
+        escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        text_ops.append(f'({escaped}) Tj T*')
+    text_ops.append('ET')
+    stream = '\n'.join(text_ops).encode('latin-1')
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+        b'/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>',
+        b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+    xref_at = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode()
+    out += (f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n'
+            f'startxref\n{xref_at}\n%%EOF\n').encode()
+    return bytes(out)
+
+
+SAMPLE_RESUME_LINES = [
+    'Jane Doe',
+    'jane@example.com | github.com/janedoe',
+    'EXPERIENCE',
+    'Software Engineer, Example Corp (2021 - present)',
+    'Built data pipelines processing 2B events per day in Python and Go.',
+    'EDUCATION',
+    'B.S. Computer Science, State University',
+    'SKILLS',
+    'Python, Go, SQL, AWS, Docker, Kubernetes',
+    'PROJECTS',
+    'AlgoAxis - practice tracker with AI recommendations.',
+]
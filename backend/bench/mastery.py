@@ -0,0 +1,60 @@
+"""Compare per-user Python scoring of topic mastery with the vectorized engine.
+
+    python -m bench.mastery --users 20000 --problems-per-user 150
+
+Generates synthetic problem columns (no database needed) and scores every
+(user, topic) pair twice: a dict-accumulating loop over rows, as a per-user
+SQL/Python implementation would, and app.compute_topic_mastery. Reports the
+time for each and the largest relative difference between them.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--problems-per-user', type=int, default=150)
+    parser.add_argument('--topics', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    import app as app_module
+
+    rng = np.random.default_rng(args.seed)
+    n = args.users * args.problems_per_user
+    difficulty = rng.integers(0, 3, n)
+    columns = {
+        'user_id': rng.integers(1, args.users + 1, n),
+        'topic': rng.integers(0, args.topics, n),
+        'difficulty': difficulty,
+        'points': np.array([10.0, 25.0, 50.0])[difficulty],
+        'seconds': rng.uniform(0, 3 * 365 * 86400, n),
+    }
+
+    start = time.perf_counter()
+    mastery = app_module.compute_topic_mastery(columns, args.topics)
+    vectorized = time.perf_counter() - start
+
+    weights = list(app_module.MASTERY_DIFFICULTY_WEIGHTS.values())
+    half_life = app_module.MASTERY_HALF_LIFE_DAYS * 86400
+    start = time.perf_counter()
+    scores = {}
+    for user_id, topic, diff, points, seconds in zip(*(columns[key].tolist() for key in
+                                                       ('user_id', 'topic', 'difficulty', 'points', 'seconds'))):
+        key = (user_id, topic)
+        scores[key] = scores.get(key, 0.0) + weights[diff] * points * 2 ** (seconds / half_life)
+    looped = time.perf_counter() - start
+
+    reference = np.array([scores[(u, t)] for u, t in zip(mastery['user_id'].tolist(), mastery['topic'].tolist())])
+    difference = np.max(np.abs(mastery['score'] - reference) / reference)
+    print(f'{n:,} problems, {len(mastery["score"]):,} user/topic scores')
+    print(f'python loop {looped:.2f}s, vectorized {vectorized:.2f}s ({looped / vectorized:.0f}x), '
+          f'max relative difference {difference:.1e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Check read/write splitting against a real primary and replica(s).
+
+    python -m bench.replicas --replicas 127.0.0.1:3307 --writes 200
+
+Start two local MySQL instances with replication from the DB_* primary to the
+replica (e.g. two containers, the second running CHANGE REPLICATION SOURCE TO
+... / START REPLICA), seed the primary with bench.seed, then run this. It
+interleaves problem writes with reads through the Flask test client and reports:
+
+    - where reads went (replica, primary fallback, read-your-writes pins)
+    - read-your-writes violations: a user's fresh problem missing from their
+      next GET /api/problems (should stay 0)
+    - read latency per route
+
+Run `STOP REPLICA SQL_THREAD` on the replica halfway through to watch reads fall
+back to the primary once the probe notices; START REPLICA brings them back.
+"""
+
+import argparse
+import os
+import random
+import time
+
+from bench.run import percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replicas', required=True, help='comma-separated host[:port] list')
+    parser.add_argument('--database', default='interviewmate_bench')
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--reads-per-write', type=int, default=5)
+    parser.add_argument('--max-lag', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['DB_REPLICA_HOSTS'] = args.replicas
+    os.environ['DB_REPLICA_MAX_LAG_SECONDS'] = str(args.max_lag)
+    os.environ['DB_REPLICA_CHECK_INTERVAL'] = '1'
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    os.environ.setdefault('RECOMMENDATION_PRECOMPUTE', 'false')
+    import app as app_module
+
+    app_module.DB_CONFIG['database'] = args.database
+    conn = app_module.get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT MAX(id) AS max_id FROM users')
+    max_user_id = cursor.fetchone()['max_id']
+    cursor.close()
+    conn.close()
+
+    rng = random.Random(args.seed)
+    # Let the first probe finish so replicas are eligible from the start
+    app_module.replica_router.pick()
+    time.sleep(app_module.DB_REPLICA_CHECK_INTERVAL + 0.5)
+
+    def auth(user_id):
+        return {'Authorization': f'Bearer {app_module.issue_auth_token(user_id)}'}
+
+    latencies = {'problems': [], 'summary': [], 'leaderboard': []}
+    violations = 0
+    for i in range(args.writes):
+        user_id = rng.randint(1, max_user_id)
+        writer = app_module.app.test_client()
+        response = writer.post('/api/problems', json={
+            'user_id': user_id, 'number': 10000 + i, 'name': f'Replica check {i}',
+            'difficulty': rng.choice(['Easy', 'Medium', 'Hard']), 'topic': 'Arrays'
+        }, headers=auth(user_id))
+        problem_id = response.get_json()['id']
+
+        # Same client (carries the write cookie): must see its own write
+        start = time.perf_counter()
+        problems = writer.get(f'/api/problems?user_id={user_id}', headers=auth(user_id)).get_json()
+        latencies['problems'].append((time.perf_counter() - start) * 1000)
+        if not any(p['id'] == problem_id for p in problems):
+            violations += 1
+
+        reader = app_module.app.test_client()
+        for _ in range(args.reads_per_write):
+            other = rng.randint(1, max_user_id)
+            route, url = rng.choice([('summary', f'/api/analytics/summary?user_id={other}'),
+                                     ('leaderboard', '/api/leaderboard')])
+            start = time.perf_counter()
+            reader.get(url, headers=auth(other))
+            latencies[route].append((time.perf_counter() - start) * 1000)
+
+    snapshot = app_module.replica_router.snapshot()
+    print(f"replica reads {snapshot.get('replica_reads', 0)}, primary fallbacks {snapshot.get('primary_fallback', 0)}, "
+          f"read-your-writes pins {snapshot.get('read_your_writes', 0)}")
+    print(f'read-your-writes violations: {violations} / {args.writes}')
+    for route, values in latencies.items():
+        if values:
+            values.sort()
+            print(f'{route:>12} n={len(values):<5} p50={percentile(values, 50):.1f}ms p95={percentile(values, 95):.1f}ms')
+    for replica in snapshot['replicas']:
+        print(f"{replica['host']}:{replica['port']} healthy={replica['healthy']} lag={replica['lag']} "
+              f"error={replica['error']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,605 @@
+"""Drive a mixed workload against every API route and report latency.
+
+    python -m bench.run --duration 60 --concurrency 16
+    python -m bench.run --url http://127.0.0.1:5000 --json after.json --baseline before.json
+
+By default the Flask app is imported in-process with S3 and Gemini replaced by
+the fakes in bench.fakes and SQL profiling switched on, so per-route query
+counts are reported too. With --url the same workload is sent over HTTP to an
+already running server (start it with SQL_DEBUG=true SQL_LOG_STATEMENTS=false
+to get query counts from the X-SQL-Query-Count header).
+
+Every call is made as a user from a sample of --users seeded accounts, each
+logged in once before the clock starts; its bearer token is sent on every call
+(the app requires one unless AUTH_REQUIRED=false).
+
+Exit status is 1 when --baseline is given and any route's p95 latency or the
+overall throughput regressed by more than --tolerance, or a route's share of
+4xx responses moved by more than --max-4xx-shift (e.g. calls now rejected
+with 401 instead of served).
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import pymysql
+
+from bench.fakes import SAMPLE_RESUME_LINES, install_fakes, make_pdf
+from bench.seed import BENCH_PASSWORD, DIFFICULTIES, TOPICS, server_config
+
+RESUME_PDF = make_pdf(SAMPLE_RESUME_LINES)
+
+
+class Call:
+    """One request, made as user_id (sent as that user's bearer token) unless it is None."""
+
+    def __init__(self, label, method, path, json_body=None, form=None, file_bytes=None, user_id=None):
+        self.label = label
+        self.method = method
+        self.path = path
+        self.json_body = json_body
+        self.form = form
+        self.file_bytes = file_bytes
+        self.user_id = user_id
+        self.token = None
+
+
+class Result:
+    def __init__(self, status, body, sql_queries=None):
+        self.status = status
+        self.body = body
+        self.sql_queries = sql_queries
+
+
+# ------------------------------------------------------------------ drivers
+
+class InProcessDriver:
+    """Calls the Flask app through its test client; one client per thread."""
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self.local = threading.local()
+
+    def send(self, call):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+
+        kwargs = {'method': call.method}
+        if call.token:
+            kwargs['headers'] = {'Authorization': f'Bearer {call.token}'}
+        if call.json_body is not None:
+            kwargs['json'] = call.json_body
+        if call.file_bytes is not None:
+            data = dict(call.form or {})
+            data['file'] = (io.BytesIO(call.file_bytes), 'resume.pdf')
+            kwargs['data'] = data
+            kwargs['content_type'] = 'multipart/form-data'
+
+        response = client.open(call.path, **kwargs)
+        queries = response.headers.get('X-SQL-Query-Count')
+        return Result(response.status_code, response.get_data(),
+                      int(queries) if queries is not None else None)
+
+
+class HttpDriver:
+    """Sends calls over keep-alive HTTP connections; one connection per thread."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self.local.conn = cls(self.host, self.port, timeout=120)
+        return conn
+
+    def send(self, call):
+        headers = {'Authorization': f'Bearer {call.token}'} if call.token else {}
+        body = None
+        if call.json_body is not None:
+            body = json.dumps(call.json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif call.file_bytes is not None:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for key, value in (call.form or {}).items():
+                parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"'
+                             f'\r\n\r\n{value}\r\n'.encode())
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+                         f'filename="resume.pdf"\r\nContent-Type: application/pdf\r\n\r\n'.encode()
+                         + call.file_bytes + b'\r\n')
+            parts.append(f'--{boundary}--\r\n'.encode())
+            body = b''.join(parts)
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+
+        conn = self._connection()
+        try:
+            conn.request(call.method, call.path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self.local.conn = None
+            raise
+        queries = response.getheader('X-SQL-Query-Count')
+        return Result(response.status, data, int(queries) if queries is not None else None)
+
+
+# ------------------------------------------------------------------ workload
+
+class BenchContext:
+    """Ids sampled from the seeded database so calls hit real rows."""
+
+    def __init__(self, database, users=1000, seed=42):
+        conn = pymysql.connect(**server_config(), database=database,
+                               cursorclass=pymysql.cursors.DictCursor)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) AS max_id FROM users')
+        self.max_user_id = cursor.fetchone()['max_id']
+        cursor.execute('SELECT COALESCE(MAX(id), 0) AS max_id FROM problems')
+        self.max_problem_id = cursor.fetchone()['max_id']
+        cursor.execute('SELECT group_id, user_id FROM group_members ORDER BY id LIMIT 5000')
+        memberships = [(row['group_id'], row['user_id']) for row in cursor.fetchall()]
+        cursor.execute('SELECT invite_code FROM groups ORDER BY id LIMIT 5000')
+        self.invite_codes = [row['invite_code'] for row in cursor.fetchall()]
+        cursor.close()
+        conn.close()
+
+        if not self.max_user_id:
+            raise SystemExit(f"{database} has no users; run python -m bench.seed first")
+
+        # Seeded ids are contiguous; every call acts as one of these users
+        self.user_ids = sorted(random.Random(seed).sample(range(1, self.max_user_id + 1),
+                                                          min(users, self.max_user_id)))
+        sampled = set(self.user_ids)
+        self.memberships = [member for member in memberships if member[1] in sampled]
+        self.tokens = {}  # user_id -> bearer token, filled by log_in_users
+
+
+def log_in_users(driver, ctx, concurrency):
+    """Log each of ctx.user_ids in once (outside the measurement) and cache their tokens."""
+    pending = [user_id for user_id in ctx.user_ids if user_id not in ctx.tokens]
+    lock = threading.Lock()
+    failures = []
+
+    def log_in():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                user_id = pending.pop()
+            result = driver.send(Call('POST /api/login', 'POST', '/api/login', json_body={
+                'email': f'bench{user_id}@example.com', 'password': BENCH_PASSWORD,
+            }))
+            if result.status != 200:
+                failures.append((user_id, result.status))
+                continue
+            with lock:
+                ctx.tokens[user_id] = json.loads(result.body)['token']
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=log_in, daemon=True) for _ in range(max(1, concurrency))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if failures:
+        raise SystemExit(f"{len(failures)} bench users could not log in (first: user {failures[0][0]}, "
+                         f"HTTP {failures[0][1]}); reseed with python -m bench.seed")
+    print(f"{len(ctx.tokens)} users logged in in {time.perf_counter() - started:.1f}s")
+
+
+class Workload:
+    """Weighted mix of calls covering every route. Deterministic per seed."""
+
+    MIX = {
+        'get_problems': 15, 'add_problem': 8, 'update_problem': 4, 'delete_problem': 3,
+        'analytics_difficulty': 5, 'analytics_topic': 5, 'analytics_points': 5,
+        'analytics_summary': 5, 'leaderboard': 5,
+        'get_notes': 4, 'save_notes': 3, 'delete_notes': 1,
+        'get_resumes': 3, 'upload_resume': 1, 'analyze_resume': 1,
+        'suggest_problems': 2, 'solve_problem': 3,
+        'groups_my': 4, 'group_details': 2, 'group_members': 3,
+        'create_and_leave_group': 0.5, 'join_group': 0.5,
+        'login': 2, 'register': 0.5, 'health': 1,
+    }
+
+    def __init__(self, ctx, seed, mix=None):
+        self.ctx = ctx
+        self.rng = random.Random(seed)
+        self.mix = mix or self.MIX
+        self.names = list(self.mix)
+        self.weights = [self.mix[name] for name in self.names]
+        self.created = []  # (user_id, problem_id) added by this worker
+
+    def user(self):
+        return self.rng.choice(self.ctx.user_ids)
+
+    def problem(self):
+        return self.rng.randint(1, max(1, self.ctx.max_problem_id))
+
+    def next_calls(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        return getattr(self, name)()
+
+    def get_problems(self):
+        user_id = self.user()
+        return [Call('GET /api/problems', 'GET', f'/api/problems?user_id={user_id}', user_id=user_id)]
+
+    def add_problem(self):
+        user_id = self.user()
+        difficulty = self.rng.choice(DIFFICULTIES)
+        return [Call('POST /api/problems', 'POST', '/api/problems', json_body={
+            'user_id': user_id, 'number': str(self.rng.randint(1, 3000)),
+            'name': f'Bench Problem {uuid.uuid4().hex[:8]}', 'difficulty': difficulty,
+            'topic': self.rng.choice(TOPICS), 'summary': 'benchmark', 'notes': '',
+        }, user_id=user_id)]
+
+    def _own_problem(self, pop=False):
+        if not self.created:
+            return None
+        index = self.rng.randrange(len(self.created))
+        return self.created.pop(index) if pop else self.created[index]
+
+    def update_problem(self):
+        own = self._own_problem()
+        if not own:
+            return self.add_problem()
+        return [Call('PUT /api/problems/<id>', 'PUT', f'/api/problems/{own[1]}', json_body={
+            'difficulty': self.rng.choice(DIFFICULTIES), 'topic': self.rng.choice(TOPICS),
+        }, user_id=own[0])]
+
+    def delete_problem(self):
+        own = self._own_problem(pop=True)
+        if not own:
+            return self.add_problem()
+        return [Call('DELETE /api/problems/<id>', 'DELETE', f'/api/problems/{own[1]}', user_id=own[0])]
+
+    def _analytics(self, kind):
+        user_id = self.user()
+        return [Call(f'GET /api/analytics/{kind}', 'GET', f'/api/analytics/{kind}?user_id={user_id}',
+                     user_id=user_id)]
+
+    def analytics_difficulty(self):
+        return self._analytics('difficulty')
+
+    def analytics_topic(self):
+        return self._analytics('topic')
+
+    def analytics_points(self):
+        return self._analytics('points')
+
+    def analytics_summary(self):
+        return self._analytics('summary')
+
+    def leaderboard(self):
+        return [Call('GET /api/leaderboard', 'GET', '/api/leaderboard', user_id=self.user())]
+
+    def get_notes(self):
+        user_id = self.user()
+        return [Call('GET /api/notes/<id>', 'GET', f'/api/notes/{self.problem()}?user_id={user_id}',
+                     user_id=user_id)]
+
+    def save_notes(self):
+        own = self._own_problem()
+        user_id, problem_id = own if own else (self.user(), self.problem())
+        return [Call('POST /api/notes', 'POST', '/api/notes', json_body={
+            'problem_id': problem_id, 'user_id': user_id, 'approach': 'Two pointers',
+            'solution_code': 'def solve(nums): return sorted(nums)',
+            'time_complexity': 'O(n log n)', 'space_complexity': 'O(n)',
+        }, user_id=user_id)]
+
+    def delete_notes(self):
+        own = self._own_problem()
+        user_id, problem_id = own if own else (self.user(), self.problem())
+        return [Call('DELETE /api/notes/<id>', 'DELETE', f'/api/notes/{problem_id}?user_id={user_id}',
+                     user_id=user_id)]
+
+    def get_resumes(self):
+        user_id = self.user()
+        return [Call('GET /api/resumes', 'GET', f'/api/resumes?user_id={user_id}', user_id=user_id)]
+
+    def upload_resume(self):
+        user_id = self.user()
+        return [Call('POST /api/upload-resume', 'POST', '/api/upload-resume',
+                     form={'user_id': user_id}, file_bytes=RESUME_PDF, user_id=user_id)]
+
+    def analyze_resume(self):
+        user_id = self.user()
+        return [Call('POST /api/analyze-resume', 'POST', '/api/analyze-resume',
+                     form={'user_id': user_id}, file_bytes=RESUME_PDF, user_id=user_id)]
+
+    def suggest_problems(self):
+        user_id = self.user()
+        topic = self.rng.choice([None, self.rng.choice(TOPICS)])
+        return [Call('POST /api/suggest-problems', 'POST', '/api/suggest-problems',
+                     json_body={'user_id': user_id, 'topic': topic}, user_id=user_id)]
+
+    def solve_problem(self):
+        stage = self.rng.choice(['explain', 'hint', 'feedback', 'solution'])
+        return [Call('POST /api/solve-problem', 'POST', '/api/solve-problem', json_body={
+            'problem': 'Given an array of integers, return indices of two numbers adding to target.',
+            'stage': stage, 'user_input': 'Maybe a hash map?',
+            'conversation_history': [{'role': 'user', 'content': 'hint please'},
+                                     {'role': 'assistant', 'content': 'Think about lookups.'}],
+        }, user_id=self.user())]
+
+    def _membership(self):
+        if not self.ctx.memberships:
+            return None
+        return self.rng.choice(self.ctx.memberships)
+
+    def groups_my(self):
+        user_id = self.user()
+        return [Call('GET /api/groups/my', 'GET', f'/api/groups/my?user_id={user_id}', user_id=user_id)]
+
+    def group_details(self):
+        member = self._membership()
+        if not member:
+            return self.groups_my()
+        return [Call('GET /api/groups/<id>', 'GET', f'/api/groups/{member[0]}?user_id={member[1]}',
+                     user_id=member[1])]
+
+    def group_members(self):
+        member = self._membership()
+        if not member:
+            return self.groups_my()
+        return [Call('GET /api/groups/<id>/members', 'GET',
+                     f'/api/groups/{member[0]}/members?user_id={member[1]}', user_id=member[1])]
+
+    def create_and_leave_group(self):
+        # The leave call needs the created id, so it is issued from the response
+        user_id = self.user()
+        return [Call('POST /api/groups/create', 'POST', '/api/groups/create', json_body={
+            'user_id': user_id, 'name': f'bench-{uuid.uuid4().hex[:12]}', 'max_members': 5,
+        }, user_id=user_id)]
+
+    def join_group(self):
+        if not self.ctx.invite_codes:
+            return self.groups_my()
+        user_id = self.user()
+        return [Call('POST /api/groups/join', 'POST', '/api/groups/join', json_body={
+            'user_id': user_id, 'invite_code': self.rng.choice(self.ctx.invite_codes),
+        }, user_id=user_id)]
+
+    def login(self):
+        user_id = self.user()
+        return [Call('POST /api/login', 'POST', '/api/login', json_body={
+            'email': f'bench{user_id}@example.com', 'password': BENCH_PASSWORD,
+        })]
+
+    def register(self):
+        tag = uuid.uuid4().hex[:12]
+        return [Call('POST /api/register', 'POST', '/api/register', json_body={
+            'name': f'Bench Signup {tag}', 'email': f'signup-{tag}@example.com',
+            'password': BENCH_PASSWORD,
+        })]
+
+    def health(self):
+        return [Call('GET /api/health', 'GET', '/api/health')]
+
+    def follow_up(self, call, result):
+        """Record ids and tokens from responses and return any dependent call."""
+        if result.status >= 300:
+            return None
+        try:
+            payload = json.loads(result.body)
+        except ValueError:
+            return None
+        if call.label == 'POST /api/login' and payload.get('token'):
+            # A fresh login replaces the user's cached token, as the frontend would
+            self.ctx.tokens[payload['user']['id']] = payload['token']
+        if call.label == 'POST /api/problems' and 'id' in payload:
+            self.created.append((call.user_id, payload['id']))
+        if call.label in ('POST /api/groups/create', 'POST /api/groups/join') and payload.get('group'):
+            return Call('DELETE /api/groups/<id>/leave', 'DELETE',
+                        f"/api/groups/{payload['group']['id']}/leave",
+                        json_body={'user_id': call.user_id}, user_id=call.user_id)
+        return None
+
+
+# ------------------------------------------------------------------ runner
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)  # label -> [(seconds, status, queries)]
+
+    def add(self, label, seconds, status, queries):
+        with self.lock:
+            self.samples[label].append((seconds, status, queries))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def worker(driver, workload, recorder, deadline, warmup_until, remaining):
+    while time.perf_counter() < deadline:
+        if remaining is not None:
+            with remaining['lock']:
+                if remaining['count'] <= 0:
+                    return
+                remaining['count'] -= 1
+
+        pending = workload.next_calls()
+        while pending:
+            call = pending.pop(0)
+            if call.user_id is not None:
+                call.token = workload.ctx.tokens.get(call.user_id)
+            started = time.perf_counter()
+            try:
+                result = driver.send(call)
+            except Exception as e:
+                result = Result(599, str(e).encode())
+            elapsed = time.perf_counter() - started
+            if started >= warmup_until:
+                recorder.add(call.label, elapsed, result.status, result.sql_queries)
+            follow = workload.follow_up(call, result)
+            if follow:
+                pending.append(follow)
+
+
+def summarize(recorder, wall_seconds):
+    routes = {}
+    total = 0
+    for label, samples in sorted(recorder.samples.items()):
+        latencies = sorted(s[0] for s in samples)
+        queries = [s[2] for s in samples if s[2] is not None]
+        total += len(samples)
+        routes[label] = {
+            'requests': len(samples),
+            'rps': len(samples) / wall_seconds,
+            'errors_5xx': sum(1 for s in samples if s[1] >= 500),
+            'responses_4xx': sum(1 for s in samples if 400 <= s[1] < 500),
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'avg_sql_queries': (sum(queries) / len(queries)) if queries else None,
+        }
+    all_latencies = sorted(s[0] for samples in recorder.samples.values() for s in samples)
+    return {
+        'wall_seconds': wall_seconds,
+        'requests': total,
+        'rps': total / wall_seconds if wall_seconds else 0,
+        'p50_ms': percentile(all_latencies, 50) * 1000,
+        'p95_ms': percentile(all_latencies, 95) * 1000,
+        'p99_ms': percentile(all_latencies, 99) * 1000,
+        'routes': routes,
+    }
+
+
+def print_report(report):
+    header = f"{'route':36} {'reqs':>7} {'rps':>8} {'5xx':>5} {'4xx':>5} " \
+             f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'sql/req':>8}"
+    print(header)
+    print('-' * len(header))
+    for label, r in report['routes'].items():
+        queries = f"{r['avg_sql_queries']:.1f}" if r['avg_sql_queries'] is not None else '-'
+        print(f"{label:36} {r['requests']:>7} {r['rps']:>8.1f} {r['errors_5xx']:>5} "
+              f"{r['responses_4xx']:>5} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {queries:>8}")
+    print('-' * len(header))
+    print(f"{'TOTAL':36} {report['requests']:>7} {report['rps']:>8.1f} {'':>5} {'':>5} "
+          f"{report['p50_ms']:>9.1f} {report['p95_ms']:>9.1f} {report['p99_ms']:>9.1f}")
+
+
+def compare(report, baseline, tolerance, max_4xx_shift=0.05):
+    """Return a list of human-readable regressions against a baseline report."""
+    regressions = []
+    if baseline['rps'] and report['rps'] < baseline['rps'] * (1 - tolerance):
+        regressions.append(f"throughput {report['rps']:.1f} rps < baseline {baseline['rps']:.1f} rps")
+    for label, base in baseline['routes'].items():
+        current = report['routes'].get(label)
+        if not current or base['requests'] < 20 or current['requests'] < 20:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{label} p95 {current['p95_ms']:.1f}ms > baseline {base['p95_ms']:.1f}ms")
+        # Fast rejections (e.g. 401s) would otherwise pass as a latency win
+        current_4xx = current['responses_4xx'] / current['requests']
+        base_4xx = base['responses_4xx'] / base['requests']
+        if abs(current_4xx - base_4xx) > max_4xx_shift:
+            regressions.append(f"{label} 4xx share {current_4xx:.1%} vs baseline {base_4xx:.1%}")
+    return regressions
+
+
+def build_in_process_driver(args):
+    # Profile queries without printing every statement
+    os.environ.setdefault('SQL_DEBUG', 'true')
+    os.environ.setdefault('SQL_LOG_STATEMENTS', 'false')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    import app as app_module
+
+    app_module.DB_CONFIG['database'] = args.database
+    install_fakes(app_module, gemini_median_ms=args.gemini_ms, s3_latency_ms=args.s3_ms, seed=args.seed)
+    return InProcessDriver(app_module.app)
+
+
+def run(driver, ctx, args):
+    log_in_users(driver, ctx, args.concurrency)
+    recorder = Recorder()
+    remaining = {'count': args.requests, 'lock': threading.Lock()} if args.requests else None
+    started = time.perf_counter()
+    warmup_until = started + args.warmup
+    deadline = warmup_until + args.duration
+
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(driver, Workload(ctx, args.seed + i), recorder, deadline, warmup_until, remaining),
+            daemon=True,
+        )
+        for i in range(args.concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return summarize(recorder, max(1e-9, time.perf_counter() - warmup_until))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='interviewmate_bench')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before measuring')
+    parser.add_argument('--requests', type=int, help='stop after this many workload steps')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=1000, help='seeded users to log in and act as')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--gemini-ms', type=float, default=800, help='median fake Gemini latency')
+    parser.add_argument('--s3-ms', type=float, default=5, help='fake S3 latency')
+    parser.add_argument('--mix', help='JSON object overriding route weights, e.g. \'{"health": 1}\'')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--baseline', help='report JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='allowed fractional regression vs --baseline')
+    parser.add_argument('--max-4xx-shift', type=float, default=0.05,
+                        help="allowed change in a route's share of 4xx responses vs --baseline")
+    args = parser.parse_args()
+
+    if args.mix:
+        Workload.MIX = json.loads(args.mix)
+
+    ctx = BenchContext(args.database, args.users, args.seed)
+    driver = HttpDriver(args.url) if args.url else build_in_process_driver(args)
+    report = run(driver, ctx, args)
+    report['config'] = {k: v for k, v in vars(args).items() if k not in ('baseline', 'json')}
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.max_4xx_shift)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
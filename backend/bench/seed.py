@@ -0,0 +1,217 @@
+"""Create a throwaway benchmark database from db_setup.sql and fill it with
+synthetic users, problems, notes and groups.
+
+    python -m bench.seed --users 10000 --problems 1000000 --groups 500
+
+Connection settings come from the usual DB_* environment variables; the data
+always goes into --database (default interviewmate_bench), never DB_NAME.
+"""
+
+import argparse
+import os
+import random
+import re
+import secrets
+import time
+from datetime import datetime, timedelta
+
+import pymysql
+from dotenv import load_dotenv
+from werkzeug.security import generate_password_hash
+
+load_dotenv()
+
+BENCH_PASSWORD = 'benchpass'
+DIFFICULTIES = ['Easy', 'Medium', 'Hard']
+DIFFICULTY_WEIGHTS = [0.45, 0.40, 0.15]
+POINTS = {'Easy': 10, 'Medium': 25, 'Hard': 50}
+TOPICS = [
+    'Arrays', 'Strings', 'Hash Table', 'Two Pointers', 'Sliding Window',
+    'Binary Search', 'Linked List', 'Stack', 'Heap', 'Trees', 'Graphs',
+    'Dynamic Programming', 'Greedy', 'Backtracking', 'Bit Manipulation',
+    'Math', 'Tries', 'Intervals',
+]
+NAME_WORDS = [
+    'Two', 'Sum', 'Longest', 'Substring', 'Merge', 'Intervals', 'Valid',
+    'Parentheses', 'Binary', 'Tree', 'Maximum', 'Path', 'Word', 'Search',
+    'Course', 'Schedule', 'Coin', 'Change', 'Rotate', 'Matrix', 'Kth',
+    'Largest', 'Element', 'Minimum', 'Window', 'Palindrome', 'Partition',
+]
+
+
+def server_config():
+    return {
+        'host': os.getenv('DB_HOST', '127.0.0.1'),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASSWORD', ''),
+        'port': int(os.getenv('DB_PORT', 3306)),
+        'init_command': "SET time_zone = '+00:00'",
+    }
+
+
+def schema_statements(database):
+    """Split db_setup.sql into statements, retargeted at the bench database."""
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'db_setup.sql')
+    with open(path) as f:
+        sql = '\n'.join(line for line in f if not line.strip().startswith('--'))
+    sql = re.sub(r'\binterviewmate\b', database, sql)
+    return [stmt.strip() for stmt in sql.split(';') if stmt.strip()]
+
+
+def insert_batches(conn, sql, rows, batch_size, label):
+    cursor = conn.cursor()
+    total = 0
+    started = time.perf_counter()
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(sql, batch)
+            conn.commit()
+            total += len(batch)
+            batch = []
+            print(f"  {label}: {total} rows ({time.perf_counter() - started:.1f}s)", end='\r')
+    if batch:
+        cursor.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+    cursor.close()
+    print(f"  {label}: {total} rows in {time.perf_counter() - started:.1f}s")
+    return total
+
+
+def generate_users(n_users):
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    for i in range(1, n_users + 1):
+        yield (f"Bench User {i}", f"bench{i}@example.com", password_hash)
+
+
+def generate_problems(rng, n_users, n_problems, days):
+    now = datetime.utcnow().replace(microsecond=0)
+    for _ in range(n_problems):
+        # Skewed towards a minority of heavy users, like real trackers
+        user_id = min(n_users, int(rng.paretovariate(1.2))) if rng.random() < 0.3 \
+            else rng.randint(1, n_users)
+        difficulty = rng.choices(DIFFICULTIES, DIFFICULTY_WEIGHTS)[0]
+        number = rng.randint(1, 3000)
+        name = ' '.join(rng.sample(NAME_WORDS, 3))
+        created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+        yield (user_id, str(number), name, difficulty, rng.choice(TOPICS),
+               f"Solved {name.lower()} with a {rng.choice(TOPICS).lower()} approach.",
+               '', POINTS[difficulty], created_at)
+
+
+def generate_groups(rng, n_users, n_groups):
+    """Yield (group row, member rows) pairs; nobody ends up in more than two groups."""
+    memberships = {}
+    candidates = list(range(1, n_users + 1))
+    rng.shuffle(candidates)
+    cursor = 0
+    for group_id in range(1, n_groups + 1):
+        max_members = rng.randint(3, 10)
+        members = []
+        while len(members) < max_members - 1 and cursor < len(candidates) * 2:
+            user_id = candidates[cursor % len(candidates)]
+            cursor += 1
+            if memberships.get(user_id, 0) < 2 and user_id not in members:
+                members.append(user_id)
+                memberships[user_id] = memberships.get(user_id, 0) + 1
+        if not members:
+            break
+        group = (f"Bench Group {group_id}", 'Synthetic benchmark group', members[0],
+                 secrets.token_urlsafe(12)[:20], max_members)
+        rows = [(group_id, members[0], 'admin')] + [(group_id, u, 'member') for u in members[1:]]
+        yield group, rows
+
+
+def seed(database, n_users, n_problems, n_groups, notes_ratio, days, seed_value, batch_size):
+    rng = random.Random(seed_value)
+    config = server_config()
+
+    conn = pymysql.connect(**config, autocommit=True)
+    cursor = conn.cursor()
+    print(f"Recreating database {database}")
+    cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+    for statement in schema_statements(database):
+        cursor.execute(statement)
+    cursor.close()
+    conn.close()
+
+    conn = pymysql.connect(**config, database=database)
+    insert_batches(
+        conn,
+        'INSERT INTO users (name, email, password) VALUES (%s, %s, %s)',
+        generate_users(n_users), batch_size, 'users'
+    )
+    insert_batches(
+        conn,
+        '''INSERT INTO problems (user_id, number, name, difficulty, topic, summary, notes, points, created_at)
+           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)''',
+        generate_problems(rng, n_users, n_problems, days), batch_size, 'problems'
+    )
+
+    if notes_ratio > 0:
+        every = max(1, round(1 / notes_ratio))
+        cursor = conn.cursor()
+        cursor.execute(
+            '''INSERT INTO problem_notes
+               (problem_id, user_id, approach, solution_code, time_complexity,
+                space_complexity, key_insights, mistakes_made, related_problems)
+               SELECT id, user_id, CONCAT('Approach for ', name), 'def solve(): pass',
+                      'O(n)', 'O(1)', 'Use a hash map', 'Off-by-one', ''
+               FROM problems WHERE id %% %s = 0''',
+            (every,)
+        )
+        conn.commit()
+        print(f"  problem_notes: {cursor.rowcount} rows")
+        cursor.close()
+
+    # Seeded users are all UTC, so the rollup is a plain GROUP BY over the whole table
+    cursor = conn.cursor()
+    cursor.execute(
+        '''INSERT INTO user_daily_activity (user_id, activity_date, problems_solved, points)
+           SELECT user_id, DATE(created_at), COUNT(*), SUM(points)
+           FROM problems GROUP BY user_id, DATE(created_at)'''
+    )
+    conn.commit()
+    print(f"  user_daily_activity: {cursor.rowcount} rows")
+    cursor.close()
+
+    groups = list(generate_groups(rng, n_users, n_groups))
+    insert_batches(
+        conn,
+        '''INSERT INTO groups (name, description, created_by, invite_code, max_members)
+           VALUES (%s, %s, %s, %s, %s)''',
+        (group for group, _ in groups), batch_size, 'groups'
+    )
+    insert_batches(
+        conn,
+        'INSERT INTO group_members (group_id, user_id, role) VALUES (%s, %s, %s)',
+        (row for _, rows in groups for row in rows), batch_size, 'group_members'
+    )
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='interviewmate_bench')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--problems', type=int, default=1000000)
+    parser.add_argument('--groups', type=int, default=500)
+    parser.add_argument('--notes-ratio', type=float, default=0.1,
+                        help='fraction of problems that get a problem_notes row')
+    parser.add_argument('--days', type=int, default=365,
+                        help='spread problem created_at over this many days')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.database == os.getenv('DB_NAME'):
+        parser.error('refusing to seed into DB_NAME; pick a dedicated --database')
+
+    seed(args.database, args.users, args.problems, args.groups, args.notes_ratio,
+         args.days, args.seed, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Measure JSON encoding time and bytes on the wire for the heaviest payloads.
+
+    python -m bench.serialization --problems 5000 --repeat 50
+
+Builds rows shaped like what pymysql returns for a heavy user (datetimes,
+Decimals from SUM()), then for each encoder times encoding the response body
+and reports its size raw, gzipped and (if installed) brotli-compressed at the
+levels the app uses:
+
+    flask     Flask's stock DefaultJSONProvider
+    stdlib    the app's FastJSONProvider with orjson disabled
+    orjson    the app's FastJSONProvider
+"""
+
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+
+def problem_rows(count, rng):
+    start = datetime(2023, 1, 1)
+    topics = ['Arrays', 'Graphs', 'Dynamic Programming', 'Trees', 'Strings']
+    return [{
+        'id': i, 'user_id': 1, 'number': rng.randint(1, 3000),
+        'name': f'Problem {i} ' + ' '.join(rng.choice(['Sum', 'Path', 'Window', 'Tree']) for _ in range(3)),
+        'difficulty': rng.choice(['Easy', 'Medium', 'Hard']), 'topic': rng.choice(topics),
+        'summary': 'Two pointers over the sorted array, shrinking from the larger side.',
+        'notes': '', 'points': rng.choice([10, 25, 50]),
+        'created_at': start + timedelta(minutes=37 * i),
+    } for i in range(count)]
+
+
+def resume_rows(count):
+    return [{'id': i, 'filename': f'resume_v{i}.pdf', 'file_url': f'https://bucket.s3.amazonaws.com/resumes/1_{i}.pdf',
+             'uploaded_at': datetime(2025, 1, 1) + timedelta(days=i), 'page_count': 2, 'text_status': 'ready'}
+            for i in range(count)]
+
+
+def points_rows(days):
+    total = 0
+    rows = []
+    for i in range(days):
+        total += 25
+        rows.append({'date': date(2023, 1, 1) + timedelta(days=i), 'points': Decimal(total)})
+    return rows
+
+
+def time_encoder(encode, payload, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(payload)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--problems', type=int, default=5000)
+    parser.add_argument('--resumes', type=int, default=200)
+    parser.add_argument('--days', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    import app as app_module
+
+    rng = random.Random(args.seed)
+    payloads = {
+        'get_problems': problem_rows(args.problems, rng),
+        'get_resumes': resume_rows(args.resumes),
+        'analytics_points': points_rows(args.days),
+    }
+
+    stock = DefaultJSONProvider(Flask('stock'))
+    stdlib = app_module.FastJSONProvider(app_module.app, use_orjson=False)
+    fast = app_module.FastJSONProvider(app_module.app, use_orjson=True)
+    encoders = {
+        # What jsonify produced before: stock provider, compact separators, ASCII-escaped
+        'flask': lambda obj: json.dumps(obj, default=stock.default, sort_keys=True,
+                                        separators=(',', ':')).encode(),
+        'stdlib': stdlib.encode,
+    }
+    if fast.use_orjson:
+        encoders['orjson'] = fast.encode
+    else:
+        print('orjson is not installed; skipping it')
+
+    print(f"{'payload':>16} {'encoder':>7} {'encode':>9} {'raw':>10} {'gzip':>10} {'br':>10}")
+    for name, payload in payloads.items():
+        for encoder_name, encode in encoders.items():
+            ms, body = time_encoder(encode, payload, args.repeat)
+            gz = len(gzip.compress(body, compresslevel=app_module.COMPRESS_GZIP_LEVEL))
+            br = len(app_module.brotli.compress(body, quality=app_module.COMPRESS_BROTLI_QUALITY)) \
+                if app_module.brotli else None
+            print(f"{name:>16} {encoder_name:>7} {ms:>7.2f}ms {len(body):>9,}B {gz:>9,}B "
+                  f"{(f'{br:,}B' if br else 'n/a'):>10}")
+
+
+if __name__ == '__main__':
+    main()
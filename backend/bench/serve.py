@@ -0,0 +1,66 @@
+"""Run the API with the S3/Gemini fakes installed, for HTTP benchmarks.
+
+    python -m bench.serve --mode sync --workers 4 --port 5000   # Gunicorn sync workers
+    python -m bench.serve --mode asgi --port 5001               # one uvicorn worker
+
+Fakes are installed before the server starts (and before Gunicorn forks), so
+every worker answers LLM calls after the configured fake latency instead of
+calling Gemini.
+"""
+
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['sync', 'asgi'], default='sync')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=4, help='Gunicorn sync workers (sync mode)')
+    parser.add_argument('--database', default='interviewmate_bench')
+    parser.add_argument('--gemini-ms', type=float, default=800)
+    parser.add_argument('--s3-ms', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SQL_DEBUG', 'true')
+    os.environ.setdefault('SQL_LOG_STATEMENTS', 'false')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    os.environ.setdefault('ASYNC_DB_POOL_MIN', '0')
+
+    import app as app_module
+    from bench.fakes import install_fakes
+
+    app_module.DB_CONFIG['database'] = args.database
+
+    if args.mode == 'asgi':
+        import uvicorn
+        import asgi
+
+        install_fakes(app_module, args.gemini_ms, args.s3_ms, args.seed, asgi_module=asgi)
+        uvicorn.run(asgi.application, host=args.host, port=args.port,
+                    log_level='warning', backlog=4096)
+        return
+
+    from gunicorn.app.base import BaseApplication
+
+    install_fakes(app_module, args.gemini_ms, args.s3_ms, args.seed)
+
+    class BenchGunicorn(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{args.host}:{args.port}')
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('worker_class', 'sync')
+            self.cfg.set('timeout', 120)
+            self.cfg.set('backlog', 4096)
+            self.cfg.set('loglevel', 'warning')
+
+        def load(self):
+            return app_module.app
+
+    BenchGunicorn().run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Measure how timeouts, retries and hedging change the Gemini latency tail.
+
+    python -m bench.tail_latency --requests 300 --concurrency 8 --stall-rate 0.03 --error-rate 0.02
+
+Starts bench.fake_gemini in-process and points the app's REST transport at it,
+then sends the same seeded stream of /api/solve-problem requests through the
+Flask test client under three policies:
+
+    baseline  no per-attempt timeout, no retries
+    retry     GEMINI_TIMEOUT + jittered retries within GEMINI_DEADLINE
+    hedge     retry policy plus a hedged second request past the observed p95
+
+and prints p50/p95/p99 latency, the error rate and how many upstream calls
+each policy spent (hedges and retries cost extra requests).
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.fake_gemini import FakeGeminiConfig, start_server
+from bench.run import percentile
+
+PROBLEM = 'Given an array of integers, return indices of the two numbers that add up to a target.'
+
+
+def configure_policy(app_module, name, args):
+    app_module.GEMINI_DEADLINE = args.deadline
+    app_module.GEMINI_HEDGE = name == 'hedge'
+    if name == 'baseline':
+        app_module.GEMINI_TIMEOUT = args.stall_ms / 1000 * 2
+        app_module.GEMINI_MAX_RETRIES = 0
+        app_module.GEMINI_DEADLINE = args.stall_ms / 1000 * 2
+    else:
+        app_module.GEMINI_TIMEOUT = args.timeout
+        app_module.GEMINI_MAX_RETRIES = args.retries
+    # Fresh breaker and latency window so policies don't inherit each other's state
+    app_module.gemini_breaker = app_module.CircuitBreaker(args.breaker_failures,
+                                                          app_module.GEMINI_BREAKER_COOLDOWN)
+    app_module.gemini_latency = app_module.LatencyTracker()
+
+
+def run_policy(app_module, fake, name, args):
+    configure_policy(app_module, name, args)
+    fake.rng = random.Random(args.seed)
+    fake.requests = 0
+    client = app_module.app.test_client()
+    headers = {'Authorization': f'Bearer {app_module.issue_auth_token(1)}'}
+    rng = random.Random(args.seed)
+    payloads = [{'problem': PROBLEM, 'stage': rng.choice(['explain', 'hint'])}
+                for _ in range(args.requests)]
+
+    def one(payload):
+        start = time.perf_counter()
+        response = client.post('/api/solve-problem', json=payload, headers=headers)
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    # Prime the p95 window outside the measurement so hedging is active from the first request
+    for payload in payloads[:app_module.GEMINI_HEDGE_MIN_SAMPLES]:
+        one(payload)
+    fake.requests = 0
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, payloads))
+
+    latencies = sorted(ms for _, ms in results)
+    errors = sum(1 for status, _ in results if status != 200)
+    return {
+        'policy': name,
+        'requests': len(results),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': latencies[-1],
+        'error_rate': errors / len(results),
+        'upstream_calls': fake.requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--median-ms', type=float, default=300)
+    parser.add_argument('--sigma', type=float, default=0.35)
+    parser.add_argument('--stall-rate', type=float, default=0.03)
+    parser.add_argument('--stall-ms', type=float, default=5000)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--timeout', type=float, default=1.5, help='per-attempt timeout (s)')
+    parser.add_argument('--deadline', type=float, default=6, help='overall deadline (s)')
+    parser.add_argument('--retries', type=int, default=2)
+    parser.add_argument('--breaker-failures', type=int, default=50)
+    parser.add_argument('--policies', default='baseline,retry,hedge')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    fake = FakeGeminiConfig(args.median_ms, args.sigma, args.stall_rate, args.stall_ms,
+                            args.error_rate, args.seed)
+    server, url = start_server(fake)
+
+    os.environ['GEMINI_API_ENDPOINT'] = url
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.environ.setdefault('GEMINI_CONTEXT_CACHE', 'false')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    import app as app_module
+
+    results = []
+    try:
+        for name in args.policies.split(','):
+            print(f'== {name} ==')
+            results.append(run_policy(app_module, fake, name, args))
+    finally:
+        server.shutdown()
+
+    print(f"\n{'policy':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'errors':>7} {'calls':>6}")
+    for r in results:
+        print(f"{r['policy']:>9} {r['p50_ms']:>6.0f}ms {r['p95_ms']:>6.0f}ms {r['p99_ms']:>6.0f}ms "
+              f"{r['max_ms']:>6.0f}ms {r['error_rate']:>6.1%} {r['upstream_calls']:>6}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ CREATE TABLE IF NOT EXISTS users (
     name VARCHAR(100) NOT NULL,
     email VARCHAR(255) UNIQUE NOT NULL,
     password VARCHAR(255) NOT NULL,
+    timezone VARCHAR(64) NOT NULL DEFAULT 'UTC',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_email (email)
 );
@@ -23,11 +24,14 @@ CREATE TABLE IF NOT EXISTS problems (
     summary TEXT,
     notes TEXT,
     points INT NOT NULL DEFAULT 0,
+    points_version INT NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_user_id (user_id),
+    INDEX idx_user_created (user_id, created_at),
     INDEX idx_difficulty (difficulty),
-    INDEX idx_topic (topic)
+    INDEX idx_topic (topic),
+    FULLTEXT INDEX ft_problems_search (name, summary, notes)
 );
 
 -- Resumes table
@@ -37,9 +41,14 @@ CREATE TABLE IF NOT EXISTS resumes (
     filename VARCHAR(255) NOT NULL,
     s3_key VARCHAR(500) NOT NULL,
     file_url TEXT,
+    extracted_text MEDIUMTEXT,
+    page_count INT,
+    content_hash CHAR(64),
+    text_status ENUM('pending', 'ready', 'failed') NOT NULL DEFAULT 'pending',
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    INDEX idx_user_id (user_id)
+    INDEX idx_user_id (user_id),
+    INDEX idx_content_hash (content_hash)
 );
 
 -- Groups table
@@ -67,3 +76,162 @@ CREATE TABLE IF NOT EXISTS group_members (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     UNIQUE KEY unique_membership (group_id, user_id)
 );
+
+-- Problem notes table
+CREATE TABLE IF NOT EXISTS problem_notes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    problem_id INT NOT NULL,
+    user_id INT NOT NULL,
+    approach TEXT,
+    solution_code TEXT,
+    time_complexity VARCHAR(100),
+    space_complexity VARCHAR(100),
+    key_insights TEXT,
+    mistakes_made TEXT,
+    related_problems TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_problem_user (problem_id, user_id),
+    FULLTEXT INDEX ft_notes_search (approach, solution_code, key_insights, mistakes_made)
+);
+
+-- Precomputed AI recommendations per user and topic ('' = general)
+CREATE TABLE IF NOT EXISTS problem_recommendations (
+    user_id INT NOT NULL,
+    topic VARCHAR(100) NOT NULL DEFAULT '',
+    recommendations TEXT NOT NULL,
+    stale BOOLEAN DEFAULT FALSE,
+    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, topic),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Spaced-repetition (SM-2) review state, one row per logged problem
+CREATE TABLE IF NOT EXISTS problem_reviews (
+    problem_id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    ease_factor DECIMAL(4,2) NOT NULL DEFAULT 2.50,
+    interval_days INT NOT NULL DEFAULT 0,
+    repetitions INT NOT NULL DEFAULT 0,
+    last_grade TINYINT,
+    last_reviewed_at TIMESTAMP NULL,
+    next_review_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_user_next_review (user_id, next_review_at)
+);
+
+-- Per-user, per-local-day activity rollup (maintained on problem writes)
+CREATE TABLE IF NOT EXISTS user_daily_activity (
+    user_id INT NOT NULL,
+    activity_date DATE NOT NULL,
+    problems_solved INT NOT NULL DEFAULT 0,
+    points INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, activity_date),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- S3 resume objects, shared by a user's identical uploads and reference counted
+CREATE TABLE IF NOT EXISTS resume_objects (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    s3_key VARCHAR(500) NOT NULL UNIQUE,
+    user_id INT NOT NULL,
+    content_hash CHAR(64),
+    size_bytes INT,
+    ref_count INT NOT NULL DEFAULT 1,
+    orphaned_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_user_content (user_id, content_hash),
+    INDEX idx_orphaned (ref_count, orphaned_at)
+);
+
+-- Resume analyses with per-section hashes and feedback, so revisions re-review only what changed
+CREATE TABLE IF NOT EXISTS resume_analyses (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    resume_id INT,
+    candidate_name VARCHAR(100),
+    sections MEDIUMTEXT NOT NULL,
+    overall TEXT,
+    analysis MEDIUMTEXT NOT NULL,
+    mode ENUM('full', 'incremental') NOT NULL,
+    prompt_chars INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (resume_id) REFERENCES resumes(id) ON DELETE SET NULL,
+    INDEX idx_user_analyses (user_id, id)
+);
+
+-- Transactional outbox: written in the same transaction as each mutation and applied
+-- to rollups, recommendation staleness, caches and the live group feed by a consumer.
+-- No foreign keys: events outlive the users and groups they describe.
+CREATE TABLE IF NOT EXISTS change_events (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    event_type VARCHAR(50) NOT NULL,
+    user_id INT,
+    group_id INT,
+    payload TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    last_error VARCHAR(500),
+    INDEX idx_pending (processed_at, id),
+    INDEX idx_type_user_pending (event_type, user_id, processed_at)
+);
+
+-- Per-user, per-topic mastery (recency-decayed, difficulty-weighted points), scored in
+-- batches by `flask compute-mastery` and per user by the change-event consumer.
+-- score is anchored at a fixed epoch, so ordering by it ranks users as of any date.
+CREATE TABLE IF NOT EXISTS topic_mastery (
+    user_id INT NOT NULL,
+    topic VARCHAR(100) NOT NULL,
+    score DOUBLE NOT NULL,
+    problems INT NOT NULL,
+    points INT NOT NULL,
+    last_solved_at TIMESTAMP NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, topic),
+    INDEX idx_topic_score (topic, score),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Versioned points rules: base points per difficulty plus optional per-topic bonuses.
+-- One version is active; problems.points_version records the version that scored each row.
+CREATE TABLE IF NOT EXISTS points_rule_versions (
+    version INT AUTO_INCREMENT PRIMARY KEY,
+    description VARCHAR(255),
+    active BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    activated_at TIMESTAMP NULL
+);
+
+CREATE TABLE IF NOT EXISTS points_rules (
+    version INT NOT NULL,
+    kind ENUM('difficulty', 'topic') NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    points INT NOT NULL,
+    PRIMARY KEY (version, kind, name),
+    FOREIGN KEY (version) REFERENCES points_rule_versions(version) ON DELETE CASCADE
+);
+
+INSERT IGNORE INTO points_rule_versions (version, description, active, activated_at)
+VALUES (1, 'Easy 10, Medium 25, Hard 50', TRUE, NOW());
+INSERT IGNORE INTO points_rules (version, kind, name, points)
+VALUES (1, 'difficulty', 'Easy', 10), (1, 'difficulty', 'Medium', 25), (1, 'difficulty', 'Hard', 50);
+
+-- Checkpoints of `flask recompute-points`: an interrupted job resumes after last_id
+CREATE TABLE IF NOT EXISTS points_recompute_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    version INT NOT NULL,
+    last_id INT NOT NULL DEFAULT 0,
+    rows_scanned BIGINT NOT NULL DEFAULT 0,
+    rows_updated BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL,
+    -- Set when a newer run (e.g. --restart) supersedes the job before it finishes
+    cancelled_at TIMESTAMP NULL,
+    INDEX idx_version_open (version, finished_at, cancelled_at)
+);
@@ -0,0 +1,31 @@
+"""Gunicorn settings, read automatically when gunicorn starts in this directory.
+
+Each worker warms up (database pool, leaderboard and points-rules caches,
+Gemini models) after it is forked and before it accepts connections, so a
+new or restarted worker doesn't serve its first requests cold.
+
+Workers are threaded: an open group feed (SSE) holds a thread for up to
+GROUP_EVENTS_MAX_SECONDS, which with sync workers would take a whole worker
+per open group page. Feeds may use at most half of a worker's threads, so API
+calls always have the rest; serve asgi.py instead for many concurrent feeds.
+"""
+
+import os
+
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+# Read by app.py on import, which happens after this file in both normal and --preload mode
+os.environ.setdefault('GROUP_EVENTS_MAX_SUBSCRIBERS', str(max(1, threads // 2)))
+
+
+def on_starting(server):
+    # Feed events are delivered by whichever worker consumes them: with a per-process
+    # broker, most subscribers would never see most events
+    if server.cfg.workers > 1 and os.getenv('GROUP_EVENTS_BROKER') == 'memory':
+        raise RuntimeError(f'GROUP_EVENTS_BROKER=memory cannot serve {server.cfg.workers} workers; '
+                           'unset it to use the shared SQLite file, or set another SQLite path')
+
+
+def post_worker_init(worker):
+    from app import warm_up
+    warm_up.run()
@@ -0,0 +1,5 @@
+-- Full-text indexes for /api/search on databases created before they were added to db_setup.sql
+USE interviewmate;
+
+ALTER TABLE problems ADD FULLTEXT INDEX ft_problems_search (name, summary, notes);
+ALTER TABLE problem_notes ADD FULLTEXT INDEX ft_notes_search (approach, solution_code, key_insights, mistakes_made);
@@ -0,0 +1,14 @@
+-- Time zones and the daily activity rollup; run `flask --app app rebuild-activity` afterwards
+USE interviewmate;
+
+ALTER TABLE users ADD COLUMN timezone VARCHAR(64) NOT NULL DEFAULT 'UTC' AFTER password;
+ALTER TABLE problems ADD INDEX idx_user_created (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS user_daily_activity (
+    user_id INT NOT NULL,
+    activity_date DATE NOT NULL,
+    problems_solved INT NOT NULL DEFAULT 0,
+    points INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, activity_date),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
@@ -0,0 +1,23 @@
+-- One notes row per (problem, user) so saves can use INSERT ... ON DUPLICATE KEY UPDATE.
+-- Keeps the most recently updated row of any duplicates before adding the key.
+USE interviewmate;
+
+DELETE older FROM problem_notes older
+JOIN problem_notes newer
+  ON newer.problem_id = older.problem_id
+ AND newer.user_id = older.user_id
+ AND (newer.updated_at > older.updated_at
+      OR (newer.updated_at = older.updated_at AND newer.id > older.id));
+
+ALTER TABLE problem_notes ADD UNIQUE KEY unique_problem_user (problem_id, user_id);
+
+-- The unique key covers the old (problem_id, user_id) index, which only databases created
+-- from a db_setup.sql that had it carry; drop it when present.
+SET @drop_old_index = (
+    SELECT IF(COUNT(*) > 0, 'ALTER TABLE problem_notes DROP INDEX idx_problem_user', 'DO 0')
+    FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'problem_notes' AND index_name = 'idx_problem_user'
+);
+PREPARE drop_old_index FROM @drop_old_index;
+EXECUTE drop_old_index;
+DEALLOCATE PREPARE drop_old_index;
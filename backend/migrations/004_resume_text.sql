@@ -0,0 +1,10 @@
+-- Resume text extracted once at upload. Existing rows stay 'pending' and are
+-- extracted from S3 the first time they are analyzed.
+USE interviewmate;
+
+ALTER TABLE resumes
+    ADD COLUMN extracted_text MEDIUMTEXT AFTER file_url,
+    ADD COLUMN page_count INT AFTER extracted_text,
+    ADD COLUMN content_hash CHAR(64) AFTER page_count,
+    ADD COLUMN text_status ENUM('pending', 'ready', 'failed') NOT NULL DEFAULT 'pending' AFTER content_hash,
+    ADD INDEX idx_content_hash (content_hash);
@@ -0,0 +1,19 @@
+-- Reference-counted resume objects; existing resumes each get a row for their S3 key.
+USE interviewmate;
+
+CREATE TABLE IF NOT EXISTS resume_objects (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    s3_key VARCHAR(500) NOT NULL UNIQUE,
+    user_id INT NOT NULL,
+    content_hash CHAR(64),
+    size_bytes INT,
+    ref_count INT NOT NULL DEFAULT 1,
+    orphaned_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_user_content (user_id, content_hash),
+    INDEX idx_orphaned (ref_count, orphaned_at)
+);
+
+-- Pre-existing rows have no content_hash (NULLs never collide in the unique key)
+INSERT IGNORE INTO resume_objects (s3_key, user_id, content_hash, ref_count)
+SELECT s3_key, MIN(user_id), NULL, COUNT(*) FROM resumes GROUP BY s3_key;
@@ -0,0 +1,19 @@
+-- Stored resume analyses for section-diff re-analysis. Users start with no
+-- history, so their next analysis is a full one.
+USE interviewmate;
+
+CREATE TABLE IF NOT EXISTS resume_analyses (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    resume_id INT,
+    candidate_name VARCHAR(100),
+    sections MEDIUMTEXT NOT NULL,
+    overall TEXT,
+    analysis MEDIUMTEXT NOT NULL,
+    mode ENUM('full', 'incremental') NOT NULL,
+    prompt_chars INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (resume_id) REFERENCES resumes(id) ON DELETE SET NULL,
+    INDEX idx_user_analyses (user_id, id)
+);
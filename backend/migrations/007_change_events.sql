@@ -0,0 +1,16 @@
+-- Outbox for change events. Existing rollups are already current, so the
+-- table starts empty; writes record events from the next deploy on.
+USE interviewmate;
+
+CREATE TABLE IF NOT EXISTS change_events (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    event_type VARCHAR(50) NOT NULL,
+    user_id INT,
+    group_id INT,
+    payload TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    last_error VARCHAR(500),
+    INDEX idx_pending (processed_at, id)
+);
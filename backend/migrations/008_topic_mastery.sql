@@ -0,0 +1,17 @@
+-- Topic mastery scores. Backfill existing users once after applying:
+--     flask compute-mastery
+-- From then on the change-event consumer keeps each user's rows current.
+USE interviewmate;
+
+CREATE TABLE IF NOT EXISTS topic_mastery (
+    user_id INT NOT NULL,
+    topic VARCHAR(100) NOT NULL,
+    score DOUBLE NOT NULL,
+    problems INT NOT NULL,
+    points INT NOT NULL,
+    last_solved_at TIMESTAMP NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, topic),
+    INDEX idx_topic_score (topic, score),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
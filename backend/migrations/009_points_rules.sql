@@ -0,0 +1,45 @@
+-- Versioned points rules. Existing rows were scored with the hard-coded
+-- Easy 10 / Medium 25 / Hard 50 scheme, which becomes the active version 1,
+-- so points_version defaults to 1 and nothing needs rescoring.
+USE interviewmate;
+
+ALTER TABLE problems ADD COLUMN points_version INT NOT NULL DEFAULT 1 AFTER points, ALGORITHM=INSTANT;
+
+-- recompute-points only queues a user's points_rescored event when none is pending yet
+ALTER TABLE change_events ADD INDEX idx_type_user_pending (event_type, user_id, processed_at);
+
+CREATE TABLE IF NOT EXISTS points_rule_versions (
+    version INT AUTO_INCREMENT PRIMARY KEY,
+    description VARCHAR(255),
+    active BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    activated_at TIMESTAMP NULL
+);
+
+CREATE TABLE IF NOT EXISTS points_rules (
+    version INT NOT NULL,
+    kind ENUM('difficulty', 'topic') NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    points INT NOT NULL,
+    PRIMARY KEY (version, kind, name),
+    FOREIGN KEY (version) REFERENCES points_rule_versions(version) ON DELETE CASCADE
+);
+
+INSERT IGNORE INTO points_rule_versions (version, description, active, activated_at)
+VALUES (1, 'Easy 10, Medium 25, Hard 50', TRUE, NOW());
+INSERT IGNORE INTO points_rules (version, kind, name, points)
+VALUES (1, 'difficulty', 'Easy', 10), (1, 'difficulty', 'Medium', 25), (1, 'difficulty', 'Hard', 50);
+
+CREATE TABLE IF NOT EXISTS points_recompute_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    version INT NOT NULL,
+    last_id INT NOT NULL DEFAULT 0,
+    rows_scanned BIGINT NOT NULL DEFAULT 0,
+    rows_updated BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL,
+    -- Set when a newer run (e.g. --restart) supersedes the job before it finishes
+    cancelled_at TIMESTAMP NULL,
+    INDEX idx_version_open (version, finished_at, cancelled_at)
+);
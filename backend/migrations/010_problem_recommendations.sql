@@ -0,0 +1,14 @@
+-- Stored Gemini problem recommendations, one set per user and topic ('' is the general set).
+-- Starts empty: sets are generated on the next request, or in bulk with
+--     flask refresh-recommendations
+USE interviewmate;
+
+CREATE TABLE IF NOT EXISTS problem_recommendations (
+    user_id INT NOT NULL,
+    topic VARCHAR(100) NOT NULL DEFAULT '',
+    recommendations TEXT NOT NULL,
+    stale BOOLEAN DEFAULT FALSE,
+    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, topic),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
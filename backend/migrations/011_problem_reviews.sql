@@ -0,0 +1,18 @@
+-- Spaced-repetition (SM-2) review state, one row per logged problem. New problems get a row
+-- when they are logged; create rows for existing problems once after applying:
+--     flask backfill-reviews
+USE interviewmate;
+
+CREATE TABLE IF NOT EXISTS problem_reviews (
+    problem_id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    ease_factor DECIMAL(4,2) NOT NULL DEFAULT 2.50,
+    interval_days INT NOT NULL DEFAULT 0,
+    repetitions INT NOT NULL DEFAULT 0,
+    last_grade TINYINT,
+    last_reviewed_at TIMESTAMP NULL,
+    next_review_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_user_next_review (user_id, next_review_at)
+);
@@ -38,6 +38,7 @@ export default function Navbar() {
     localStorage.removeItem('user_id');
     localStorage.removeItem('user_name');
     localStorage.removeItem('user_email');
+    localStorage.removeItem('auth_token');
     router.push('/login');
   };
 
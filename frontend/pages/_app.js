@@ -1,6 +1,33 @@
 import 'bootstrap/dist/css/bootstrap.min.css';
 import '../styles/globals.css';
 import { useEffect } from 'react';
+import axios from 'axios';
+
+// Send the token issued at login with every API call
+axios.interceptors.request.use((config) => {
+  if (typeof window !== 'undefined') {
+    const token = localStorage.getItem('auth_token');
+    if (token) {
+      config.headers.Authorization = `Bearer ${token}`;
+    }
+  }
+  return config;
+});
+
+// A missing or expired token (e.g. a session from before tokens were required): sign in again
+axios.interceptors.response.use(
+  (response) => response,
+  (error) => {
+    if (typeof window !== 'undefined' && error.response?.status === 401
+        && !error.config?.url?.includes('/api/login')) {
+      ['user_id', 'user_name', 'user_email', 'auth_token'].forEach((key) => localStorage.removeItem(key));
+      if (window.location.pathname !== '/login') {
+        window.location.assign('/login');
+      }
+    }
+    return Promise.reject(error);
+  }
+);
 
 function MyApp({ Component, pageProps }) {
   useEffect(() => {
@@ -15,6 +15,7 @@ export default function GroupDetails() {
   const [errorMessage, setErrorMessage] = useState('');
   const [leaveLoading, setLeaveLoading] = useState(false);
   const [copyStatus, setCopyStatus] = useState('');
+  const [activity, setActivity] = useState([]);
 
   useEffect(() => {
     if (!router.isReady) return;
@@ -27,6 +28,71 @@ export default function GroupDetails() {
     fetchMembers(userId);
   }, [router.isReady]);
 
+  // Live feed: the server pushes member activity, so nothing here needs polling
+  useEffect(() => {
+    if (!router.isReady) return;
+    const userId = localStorage.getItem('user_id');
+    if (!userId) return;
+
+    let source = null;
+    let stopped = false;
+    let lastEventId = null;
+
+    const connect = async () => {
+      // EventSource can't send headers: trade the bearer token for a short-lived one scoped to this group
+      let streamToken;
+      try {
+        const response = await axios.post(getApiUrl(`/api/groups/${id}/events/token`));
+        streamToken = response.data.stream_token;
+      } catch (error) {
+        return;
+      }
+      if (stopped) return;
+
+      const params = new URLSearchParams({ user_id: userId, stream_token: streamToken });
+      if (lastEventId) params.set('last_event_id', lastEventId);
+      source = new EventSource(getApiUrl(`/api/groups/${id}/events?${params}`));
+
+      const addActivity = (event) => {
+        lastEventId = event.lastEventId || lastEventId;
+        const data = JSON.parse(event.data);
+        setActivity((previous) => [data, ...previous].slice(0, 20));
+        return data;
+      };
+
+      source.addEventListener('problem_added', addActivity);
+      source.addEventListener('member_joined', (event) => {
+        addActivity(event);
+        fetchMembers(userId);
+      });
+      source.addEventListener('member_left', (event) => {
+        addActivity(event);
+        setMembers((previous) => previous.filter((m) => String(m.user_id) !== String(JSON.parse(event.data).user_id)));
+      });
+      source.addEventListener('group_deleted', () => {
+        stopped = true;
+        source.close();
+        router.push('/groups');
+      });
+      // We fell behind (or reconnected too late to catch up): reload the snapshot
+      source.addEventListener('resync', () => fetchMembers(userId));
+
+      // The browser reconnects by itself, but not once the stream is refused (e.g. the
+      // stream token expired): fetch a fresh token and resume after the last event seen
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED && !stopped) {
+          setTimeout(connect, 3000);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      stopped = true;
+      if (source) source.close();
+    };
+  }, [router.isReady, id]);
+
   const fetchGroupDetails = async (userId) => {
     try {
       setLoadingGroup(true);
@@ -91,6 +157,20 @@ export default function GroupDetails() {
     }
   };
 
+  const memberName = (userId) => {
+    const member = members.find((m) => String(m.user_id) === String(userId));
+    return member?.name || `User ${userId}`;
+  };
+
+  const describeActivity = (item) => {
+    if (item.type === 'problem_added') {
+      return `${memberName(item.user_id)} solved #${item.problem.number} ${item.problem.name} (${item.problem.difficulty}, +${item.problem.points})`;
+    }
+    if (item.type === 'member_joined') return `${memberName(item.user_id)} joined the group`;
+    if (item.type === 'member_left') return `${memberName(item.user_id)} left the group`;
+    return item.type;
+  };
+
   const formatRole = (role) => {
     if (!role) return 'Member';
     return role.charAt(0).toUpperCase() + role.slice(1);
@@ -239,6 +319,24 @@ export default function GroupDetails() {
               </div>
             </div>
 
+            <div className="feature-card fade-in-up mb-5">
+              <h3 className="card-title">Live Activity</h3>
+              {activity.length === 0 ? (
+                <p className="card-text">New activity from group members will show up here as it happens.</p>
+              ) : (
+                <ul className="list-unstyled mb-0">
+                  {activity.map((item) => (
+                    <li key={item.id} className="py-1">
+                      <span className="text-muted small me-2">
+                        {new Date(item.at).toLocaleTimeString()}
+                      </span>
+                      {describeActivity(item)}
+                    </li>
+                  ))}
+                </ul>
+              )}
+            </div>
+
             <div className="feature-card fade-in-up">
               <h3 className="card-title">Contests</h3>
               <p className="card-text">
@@ -22,6 +22,7 @@ export default function Login() {
     try {
       const response = await axios.post(getApiUrl('/api/login'), formData);
       localStorage.setItem('user_id', response.data.user.id);
+      localStorage.setItem('auth_token', response.data.token);
       router.push('/');
     } catch (err) {
       setError(err.response?.data?.error || 'Login failed.');
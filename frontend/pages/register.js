@@ -43,6 +43,7 @@ export default function Register() {
       });
 
       localStorage.setItem('user_id', loginRes.data.user.id);
+      localStorage.setItem('auth_token', loginRes.data.token);
       localStorage.setItem('user_name', loginRes.data.user.name);
       localStorage.setItem('user_email', loginRes.data.user.email);
       router.push('/');
@@ -15,6 +15,7 @@ export default function Upload() {
   const [uploadSuccess, setUploadSuccess] = useState(false);
   const [analysis, setAnalysis] = useState('');
   const [candidateName, setCandidateName] = useState('');
+  const [reusedSections, setReusedSections] = useState([]);
   const [showAnalysis, setShowAnalysis] = useState(false);
 
   useEffect(() => {
@@ -39,6 +40,18 @@ export default function Upload() {
     }
   };
 
+  const handleDelete = async (resumeId) => {
+    if (!confirm('Delete this resume?')) return;
+    try {
+      const userId = localStorage.getItem('user_id');
+      await axios.delete(getApiUrl(`/api/resumes/${resumeId}?user_id=${userId}`));
+      fetchResumes();
+    } catch (error) {
+      console.error('Error deleting resume:', error);
+      alert('Failed to delete resume');
+    }
+  };
+
   const handleFileSelect = (e) => {
     const file = e.target.files[0];
     if (file) {
@@ -91,8 +104,8 @@ export default function Upload() {
     }
   };
 
-  const handleAnalyze = async () => {
-    if (!selectedFile) {
+  const handleAnalyze = async (resumeId = null) => {
+    if (!resumeId && !selectedFile) {
       alert('Please select a file first');
       return;
     }
@@ -103,7 +116,14 @@ export default function Upload() {
 
     try {
       const formData = new FormData();
-      formData.append('file', selectedFile);
+      if (resumeId) {
+        // Already uploaded: the server analyzes its stored text, no need to send the PDF again
+        formData.append('resume_id', resumeId);
+      } else {
+        formData.append('file', selectedFile);
+      }
+      // Lets the server diff against this user's previous analysis and re-review only changed sections
+      formData.append('user_id', localStorage.getItem('user_id'));
 
       const response = await axios.post(getApiUrl('/api/analyze-resume'), formData, {
         headers: {
@@ -113,6 +133,7 @@ export default function Upload() {
 
       setAnalysis(response.data.analysis);
       setCandidateName(response.data.candidate_name || '');
+      setReusedSections(response.data.reused_sections || []);
       setShowAnalysis(true);
     } catch (error) {
       console.error('Error analyzing resume:', error);
@@ -173,7 +194,7 @@ export default function Upload() {
                 <div className="d-flex gap-2 flex-wrap">
                   <button 
                     className="btn btn-success"
-                    onClick={handleAnalyze}
+                    onClick={() => handleAnalyze()}
                     disabled={!selectedFile || analyzing}
                     style={{ pointerEvents: 'auto' }}
                   >
@@ -207,6 +228,11 @@ export default function Upload() {
                   </h4>
                 </div>
                 <div className="card-body p-4">
+                  {reusedSections.length > 0 && (
+                    <p className="text-muted small">
+                      Unchanged since your last analysis: {reusedSections.join(', ')}
+                    </p>
+                  )}
                   <div style={{ 
                     whiteSpace: 'pre-wrap', 
                     lineHeight: '1.8',
@@ -266,6 +292,20 @@ export default function Upload() {
                                 <FaDownload style={{ marginRight: '0.3rem' }} />
                                 Download
                               </a>
+                              <button
+                                className="btn btn-sm btn-success ms-2"
+                                onClick={() => handleAnalyze(resume.id)}
+                                disabled={analyzing}
+                              >
+                                <FaMagic style={{ marginRight: '0.3rem' }} />
+                                Analyze
+                              </button>
+                              <button
+                                className="btn btn-sm btn-outline-danger ms-2"
+                                onClick={() => handleDelete(resume.id)}
+                              >
+                                Delete
+                              </button>
                             </td>
                           </tr>
                         ))}